@@ -0,0 +1,67 @@
+"""Widget-per-node rendering vs the canvas display list on large documents.
+
+For each render backend reports time to show the page, Python memory
+allocated while rendering (tracemalloc), Tk widgets and canvas items alive
+afterwards, and the average time to redraw after a scroll step.
+
+Requires a display (run under Xvfb on headless machines).
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+from browser import SimpleBrowser
+import pages
+
+DOCUMENTS = {
+    "article x2000": pages.article(2000),
+    "20k paragraphs": pages.paragraphs(20_000),
+}
+BACKENDS = ("widgets", "canvas")
+SCROLL_STEPS = 50
+
+
+def count_widgets(widget):
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())
+
+
+def run(render_backend, vdom):
+    browser = SimpleBrowser(render_backend=render_backend)
+    browser.parent.update()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    browser._show_page("http://localhost/bench", vdom)
+    browser.render_scheduler.flush()  # Time the whole render, not the first slice
+    browser.parent.update()
+    show = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    widgets = count_widgets(browser.content_canvas)
+    items = len(browser.content_canvas.find_all())
+
+    start = time.perf_counter()
+    for step in range(SCROLL_STEPS):
+        browser._on_scrollbar("moveto", step / SCROLL_STEPS)
+        browser.parent.update_idletasks()
+    frame = (time.perf_counter() - start) / SCROLL_STEPS
+    browser.parent.destroy()
+    return show, memory, widgets, items, frame
+
+
+def main():
+    print(f"{'document':<16}{'backend':<10}{'show s':>8}{'py MB':>8}{'widgets':>9}{'items':>8}{'frame ms':>10}")
+    for name, html in DOCUMENTS.items():
+        vdom = parser.parse_html(html)
+        for backend in BACKENDS:
+            show, memory, widgets, items, frame = run(backend, vdom)
+            print(f"{name:<16}{backend:<10}{show:>8.2f}{memory / 1e6:>8.1f}{widgets:>9}{items:>8}{frame * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Find-in-page latency on a multi-megabyte page.
+
+Loads a ~4MB article page (virtual backend, headless) and times:
+- building the text index, and updating it after an update that edits two
+  blocks, both redrawn by the page view and diffed as for the widget backend;
+- every keystroke of typing a few queries, in the index alone ("search")
+  and through the find bar ("find bar": search, highlighting, scrolling);
+- the same queries answered without an index by walking the tree for each
+  one ("tree scan"). A scan over widgets would also need a Tk call per widget.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser import SimpleBrowser
+from find import block_text
+from suite import changed
+import headless
+import pages
+
+SIZE_MB = 4
+QUERIES = ("section 1234", "emphasis", "no such text")
+
+
+def tree_scan(root, is_container, query):
+    query = query.lower()
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.tag == "form" or is_container(node.tag):
+            stack.extend(node.children)
+        else:
+            count += block_text(node)[0].lower().count(query)
+    return count
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def report(index, root, label):
+    before = dict(index.stats)
+    ms, _ = timed(index.update, root)
+    counts = ", ".join(f"{key} {index.stats[key] - before[key]}" for key in index.stats)
+    print(f"index update: {ms:8.1f} ms {label}: {counts}")
+
+
+def main():
+    sections = SIZE_MB * 1024 * 1024 // (len(pages.article(2)) - len(pages.article(1)))
+    html = pages.article(sections)
+    browser = SimpleBrowser(toolkit=headless, render_backend="virtual")
+    browser.update_dom(html)
+
+    bar = browser.find_bar
+    bar.show()
+    index = bar.index
+    build_ms, _ = timed(index.update, browser.current_vdom)
+    print(f"{len(html) / 1024 / 1024:.1f} MB page, {len(index.nodes)} blocks and containers, "
+          f"{len(index.text) / 1024 / 1024:.1f} MB of text")
+    print(f"index build:  {build_ms:8.1f} ms")
+    # A page view draws an updated page from scratch: blocks are found by subtree hash
+    browser.update_dom(changed(html))
+    report(index, browser.current_vdom, "after update_dom (page view redraw)")
+    # The widget backend diffs it; the differ hands back the unchanged subtrees themselves
+    new_vdom = browser.parse_html(html)
+    browser.diff_vdom(browser.current_vdom, new_vdom)
+    report(index, new_vdom, "after diff_vdom (widget backend)")
+    browser.update_vdom(new_vdom)
+    print(f"\n{'query':<15}{'matches':>8}{'search ms (1st / mean / max)':>31}{'find bar ms (mean / max)':>27}"
+          f"{'tree scan ms':>14}")
+    for query in QUERIES:
+        search_ms, bar_ms = [], []
+        for n in range(1, len(query) + 1):
+            ms, matches = timed(index.search, query[:n])
+            search_ms.append(ms)
+            bar.entry.delete(0, "end")
+            bar.entry.insert(0, query[:n])
+            bar_ms.append(timed(bar.search, query[:n])[0])
+        scan_ms, _ = timed(tree_scan, browser.current_vdom, browser._is_container, query)
+        found = f"{len(matches)}{'+' if index.capped else ''}"
+        print(f"{query:<15}{found:>8}{search_ms[0]:>13.2f} / {statistics.mean(search_ms):5.2f} / {max(search_ms):5.2f}"
+              f"{statistics.mean(bar_ms):>17.2f} / {max(bar_ms):5.2f}{scan_ms:>14.1f}")
+    browser.parent.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Auto-refreshing dashboard reloads through the HTTP cache.
+
+Three kinds of page are reloaded repeatedly: one with max-age (served with no
+network while fresh), one with an ETag and no-cache (revalidated, 304) and one
+with neither (always downloaded). Reports cache counters and bytes saved.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpcache import HTTPCache
+from local_server import LocalServer
+from transport import Transport
+import pages
+
+RELOADS = 100
+
+
+def main():
+    html = pages.article(40)
+
+    def etag_page(handler):
+        if handler.headers.get("If-None-Match") == '"dash-1"':
+            return "", {"status": 304, "ETag": '"dash-1"'}
+        return html, {"ETag": '"dash-1"', "Cache-Control": "no-cache"}
+
+    routes = {
+        "/max-age": (html, {"Cache-Control": "max-age=300"}),
+        "/etag": etag_page,
+        "/uncached": html,
+    }
+    with LocalServer(routes) as server, tempfile.TemporaryDirectory() as cache_dir:
+        print(f"{'page':<12}{'requests':>10}{'hits':>8}{'304s':>8}{'misses':>8}{'KB saved':>10}{'ms/load':>10}")
+        for path in routes:
+            transport = Transport(cache=HTTPCache(disk_dir=os.path.join(cache_dir, path.strip("/"))))
+            before = server.requests
+            start = time.perf_counter()
+            for _ in range(RELOADS):
+                transport.get(server.url(path)).text
+            elapsed = (time.perf_counter() - start) * 1000 / RELOADS
+            stats = transport.cache.stats()
+            print(f"{path:<12}{server.requests - before:>10}{stats['hits']:>8}{stats['revalidated']:>8}"
+                  f"{stats['misses']:>8}{stats['bytes_from_cache'] / 1024:>10.0f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Page-complete time of image-heavy pages: concurrent vs sequential loading.
+
+Serves pages with many PNGs from a local server that answers each request
+after a small delay, and measures the time from load_url until the page is
+drawn and every image has been swapped in. "sequential" is the same
+browser with an image loader limited to one fetch at a time, as if images
+were loaded one after another. Each run starts with an empty image cache;
+a final "cached" run reloads the page with the cache warm.
+
+Runs headless (where Tk's decoding cost is not included); pass --tk to
+use real Tk (needs a display).
+"""
+import os
+import statistics
+import struct
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser import SimpleBrowser
+from images import ImageLoader
+from local_server import LocalServer
+import headless
+
+DELAY_S = 0.05
+RUNS = 3
+
+
+def png(width, height, seed):
+    # Minimal truecolor PNG with a cheap pattern
+    base = bytes((i * seed) & 255 for i in range(width * 3 + 256))
+    rows = b"".join(b"\x00" + base[y % 256:y % 256 + width * 3] for y in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 6)) + chunk(b"IEND", b"")
+
+
+def site():
+    files = {}
+    gallery = []
+    for i in range(40):
+        files[f"/img/g{i}.png"] = png(320, 240, i + 1)
+        gallery.append(f"<div><img src='/img/g{i}.png' width='320' height='240' alt='photo {i}'></div>")
+    mixed = []
+    for i in range(12):
+        size = (1600, 1200) if i % 4 == 0 else (200, 150)
+        files[f"/img/m{i}.png"] = png(*size, i + 7)
+        mixed.append(f"<p>Figure {i}</p><img src='/img/m{i}.png' alt='figure {i}'>")
+    pages = {
+        "/gallery": "<html><body><h1>Gallery</h1>" + "".join(gallery) + "</body></html>",
+        "/article": "<html><body><h1>Article</h1>" + "".join(mixed) + "</body></html>",
+    }
+    files.update(pages)
+    return files, list(pages)
+
+
+def load(browser, url):
+    browser.url_entry.delete(0, "end")
+    browser.url_entry.insert(0, url)
+    start = time.perf_counter()
+    browser.load_url()
+    while (browser.pending_nav is not None or browser.current_vdom is None or browser.render_scheduler.active
+           or not browser.images.idle):
+        browser.parent.update()
+        time.sleep(0.0005)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    toolkit = None if "--tk" in sys.argv else headless
+    files, pages = site()
+    with LocalServer(files, delay=DELAY_S) as server:
+        print(f"{'page':<10}{'images':>7}{'sequential ms':>15}{'concurrent ms':>15}{'cached ms':>11}")
+        for path in pages:
+            url = server.url(path)
+            results = {}
+            for mode, per_host in (("sequential", 1), ("concurrent", None)):
+                times = []
+                for _ in range(RUNS):
+                    browser = SimpleBrowser(toolkit=toolkit)
+                    if per_host is not None:
+                        browser.images = ImageLoader(browser.parent, browser.toolkit, per_host=per_host, max_workers=1)
+                    times.append(load(browser, url))
+                    if mode == "concurrent":
+                        results["cached"] = load(browser, url)
+                        images = browser.images.stats["fetched"]
+                    browser.parent.destroy()
+                results[mode] = statistics.median(times)
+            print(f"{path[1:]:<10}{images:>7}{results['sequential']:>15.1f}{results['concurrent']:>15.1f}"
+                  f"{results['cached']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Input latency while a slow page loads.
+
+Serves a large page behind an artificial delay and loads it twice: once the
+old way (fetch + parse + render directly on the Tk loop) and once through the
+background navigation in SimpleBrowser.load_url. The InputLatencyMonitor
+reports how late the event loop ran a 50ms timer in each case.
+
+Requires a display (run under Xvfb on headless machines).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser import SimpleBrowser
+from local_server import LocalServer
+import pages
+
+
+def pump(browser, done, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while not done() and time.perf_counter() < deadline:
+        browser.parent.update()
+        time.sleep(0.001)
+    # Keep the loop running briefly so the monitor records the settled state
+    settle = time.perf_counter() + 0.3
+    while time.perf_counter() < settle:
+        browser.parent.update()
+        time.sleep(0.001)
+
+
+def main():
+    html = pages.paragraphs(3000)
+    with LocalServer({"/slow": html}, delay=1.0) as server:
+        url = server.url("/slow")
+        browser = SimpleBrowser()
+        browser.input_latency.start()
+
+        # Baseline: everything on the main loop
+        browser.input_latency.reset()
+        pump(browser, lambda: True)
+        start = time.perf_counter()
+        final_url, vdom, _ = browser.fetch_and_parse(url)
+        browser.render_vdom(vdom, browser.content_frame)
+        blocking = time.perf_counter() - start
+        pump(browser, lambda: True)
+        sync = browser.input_latency.summary()
+
+        # Background navigation
+        for widget in browser.content_frame.winfo_children():
+            widget.destroy()
+        browser.current_vdom = None
+        browser.input_latency.reset()
+        browser.url_entry.delete(0, "end")
+        browser.url_entry.insert(0, url)
+        start = time.perf_counter()
+        browser.load_url()
+        pump(browser, lambda: browser.pending_nav is None and browser.current_vdom is not None
+             and not browser.render_scheduler.active)
+        background = time.perf_counter() - start
+        bg = browser.input_latency.summary()
+
+        print(f"{'mode':<12}{'load s':>10}{'mean lag ms':>14}{'p95 lag ms':>13}{'max lag ms':>13}")
+        print(f"{'sync':<12}{blocking:>10.2f}{sync['mean_ms']:>14.1f}{sync['p95_ms']:>13.1f}{sync['max_ms']:>13.1f}")
+        print(f"{'background':<12}{background:>10.2f}{bg['mean_ms']:>14.1f}{bg['p95_ms']:>13.1f}{bg['max_ms']:>13.1f}")
+        browser.parent.destroy()
+
+
+if __name__ == "__main__":
+    main()
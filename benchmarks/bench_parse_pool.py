@@ -0,0 +1,121 @@
+"""Throughput of parsing many pages at once: worker threads vs worker processes.
+
+Parses a batch of pages (as when several pages or tabs load together)
+with CONCURRENCY worker threads in-process, and with a ParsePool of as
+many processes. Meanwhile the main thread runs a 1ms tick loop, standing
+in for the Tk event loop; "max stall" is its longest gap, i.e. how long the
+UI could not respond.
+
+The process pool is run with forked workers and with the pool's own start
+method (START_METHOD, a fork server where there is one). "hash ms" is the
+subtree_hash() of every page, as the first diff of each page asks for it:
+free when the worker's digests arrive intact (forked workers share our hash
+seed), a build of the whole tree plus the hashing when they are dropped.
+"build ms" is what the lazy decode defers to the UI side: building every
+node of every page on the main thread. Renderers and the differ pay it
+piecemeal, and only for the nodes they touch.
+
+Results depend on the number of cores: the processes can only parse in
+parallel when there are cores to run them.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+from browser import SimpleBrowser
+from history import tree_size
+from parse_pool import START_METHOD, ParsePool
+from simplify import simplify
+from vdom import subtree_hash
+import pages
+
+CONCURRENCY = 4
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def batch():
+    documents = [pages.blog(150), pages.article(80), pages.paragraphs(3000)]
+    for name in ("docs.html", "news.html"):
+        with open(os.path.join(CORPUS, name), encoding="utf-8") as f:
+            documents.append(f.read())
+    return documents * 4
+
+
+def parse_in_thread(html):
+    return simplify(parser.parse_html(html), SimpleBrowser._is_container)
+
+
+def build(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def run(parse, documents):
+    # Parse everything concurrently while the main thread ticks; (seconds, max stall ms, trees)
+    done = threading.Event()
+    results = []
+
+    def work():
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            results.extend(executor.map(parse, documents))
+        done.set()
+
+    start = time.perf_counter()
+    threading.Thread(target=work).start()
+    stall = 0.0
+    last = time.perf_counter()
+    while not done.is_set():
+        time.sleep(0.001)
+        now = time.perf_counter()
+        stall = max(stall, now - last)
+        last = now
+    return time.perf_counter() - start, stall * 1000, results
+
+
+def timed(function, trees):
+    start = time.perf_counter()
+    for tree in trees:
+        function(tree)
+    return f"{(time.perf_counter() - start) * 1000:.0f}"
+
+
+def main():
+    documents = batch()
+    total_mb = sum(len(html) for html in documents) / 1024 / 1024
+
+    print(f"{len(documents)} pages, {total_mb:.1f} MB, {CONCURRENCY} at a time, {os.cpu_count()} CPUs")
+    print(f"{'mode':<12}{'total s':>9}{'pages/s':>9}{'MB/s':>7}{'max stall ms':>14}{'hash ms':>9}{'build ms':>10}")
+    for mode in ("threads", "fork", START_METHOD):
+        if mode == "threads":
+            parse = parse_in_thread
+        else:
+            pool = ParsePool(processes=CONCURRENCY, start_method=mode)
+            pool.parse(documents[0], parser.DEFAULT_BACKEND, SimpleBrowser._is_container)  # Start the workers
+
+            def parse(html):
+                return pool.parse(html, parser.DEFAULT_BACKEND, SimpleBrowser._is_container)
+        seconds, stall, trees = run(parse, documents)
+        hash_ms = build_ms = ""
+        if mode != "threads":
+            pool.close()
+            hash_ms = timed(subtree_hash, trees)
+            build_ms = timed(build, trees)
+        print(f"{mode:<12}{seconds:>9.2f}{len(documents) / seconds:>9.1f}{total_mb / seconds:>7.1f}"
+              f"{stall:>14.1f}{hash_ms:>9}{build_ms:>10}")
+    wire_mb = pool.stats["wire_bytes"] / pool.stats["pages"] * len(documents) / 1024 / 1024
+    built_mb = sum(tree_size(tree) for tree in trees) / 1024 / 1024
+    print(f"wire format: {wire_mb:.1f} MB for {total_mb:.1f} MB of HTML ({built_mb:.1f} MB of VNodes once built)")
+
+
+if __name__ == "__main__":
+    main()
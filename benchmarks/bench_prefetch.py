@@ -0,0 +1,91 @@
+"""Click-to-paint latency with and without speculative prefetch.
+
+An index page links to several article pages on a local server that
+answers every request after an artificial delay. Each link is opened from
+the index: the pointer rests on it for a moment (the <Enter> binding fires,
+as hovering would), then it is clicked, and the time from the click until
+the page is fully drawn is recorded. "visible" doesn't hover and relies on
+links in the viewport being prefetched instead.
+
+Runs headless; pass --tk to use real Tk (needs a display).
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser import SimpleBrowser
+from local_server import LocalServer
+import headless
+import pages
+
+LINKS = 8
+DELAY_S = 0.15
+THINK_S = 0.4  # Pointer resting on the link before the click
+
+
+def index_page():
+    items = "".join(f"<li><a href='/article/{i}'>Article {i}</a></li>" for i in range(LINKS))
+    return f"<html><body><h1>Index</h1><ul>{items}</ul></body></html>"
+
+
+def pump(browser, seconds=0.0, until=None, timeout=30.0):
+    end = time.perf_counter() + seconds
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < end or (until is not None and not until()):
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        browser.parent.update()
+        time.sleep(0.0005)
+
+
+def drawn(browser, url):
+    return (browser.pending_nav is None and not browser.render_scheduler.active
+            and browser.current_vdom is not None and browser.url_entry.get() == url)
+
+
+def link_widget(browser, href):
+    for node, widget in browser.widget_map.items():
+        if node.tag == "a" and node.attrs.get("href") == href:
+            return widget
+
+
+def run(mode, server, toolkit):
+    browser = SimpleBrowser(toolkit=toolkit, prefetch=mode != "off")
+    index_url = server.url("/")
+    latencies = []
+    for i in range(LINKS):
+        browser.url_entry.delete(0, "end")
+        browser.url_entry.insert(0, index_url)
+        browser.load_url()
+        pump(browser, until=lambda: drawn(browser, index_url))
+        href = f"/article/{i}"
+        if mode != "visible":
+            link_widget(browser, href).event_generate("<Enter>")
+        pump(browser, THINK_S)
+        start = time.perf_counter()
+        browser.load_link(href)
+        pump(browser, until=lambda: drawn(browser, server.url(href)))
+        latencies.append((time.perf_counter() - start) * 1000)
+    stats = dict(browser.prefetcher.stats) if browser.prefetcher else {}
+    browser.parent.destroy()
+    return latencies, stats
+
+
+def main():
+    toolkit = None if "--tk" in sys.argv else headless
+    site = {"/": index_page()}
+    site.update({f"/article/{i}": pages.article(60 + i) for i in range(LINKS)})
+    with LocalServer(site, delay=DELAY_S) as server:
+        print(f"{'mode':<9}{'median ms':>11}{'mean ms':>10}{'max ms':>9}  prefetcher")
+        for mode in ("off", "hover", "visible"):
+            latencies, stats = run(mode, server, toolkit)
+            summary = ", ".join(f"{k}={v}" for k, v in sorted(stats.items()))
+            print(f"{mode:<9}{statistics.median(latencies):>11.1f}{statistics.mean(latencies):>10.1f}"
+                  f"{max(latencies):>9.1f}  {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Widget churn for list updates: index-based diff vs keyed reconciliation.
+
+For a 5k-item keyed list, counts the widgets each differ would create and
+destroy (whole subtrees for replace/insert/remove) and the widgets moved,
+for prepending one item, shuffling, and appending one item.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+import reconciler
+from browser import ATOMIC_TAGS
+import pages
+
+ITEMS = 5000
+
+
+def legacy_diff(old_node, new_node):
+    # The previous SimpleBrowser.diff_vdom: children compared strictly by index
+    diffs = []
+    if old_node.tag != new_node.tag or old_node.key != new_node.key:
+        diffs.append(("replace", old_node, new_node))
+    else:
+        attr_diff = {}
+        for key in set(old_node.attrs) | set(new_node.attrs):
+            if old_node.attrs.get(key) != new_node.attrs.get(key):
+                attr_diff[key] = new_node.attrs.get(key)
+        if attr_diff:
+            diffs.append(("attrs", old_node, attr_diff))
+        for i in range(max(len(old_node.children), len(new_node.children))):
+            old_child = old_node.children[i] if i < len(old_node.children) else None
+            new_child = new_node.children[i] if i < len(new_node.children) else None
+            if not old_child and new_child:
+                diffs.append(("add", old_node, new_child, i))
+            elif old_child and not new_child:
+                diffs.append(("remove", old_node, old_child, i))
+            elif old_child and new_child:
+                diffs.extend(legacy_diff(old_child, new_child))
+    return diffs
+
+
+def size(node):
+    return 1 + sum(size(child) for child in node.children)
+
+
+def churn(diffs):
+    created = destroyed = moved = 0
+    for action, *payload in diffs:
+        if action == "replace":
+            old, new = payload[-2:]
+            created += size(new)
+            destroyed += size(old)
+        elif action in ("add", "insert"):
+            created += size(payload[1])
+        elif action == "remove":
+            destroyed += size(payload[1])
+        elif action == "move":
+            moved += 1
+    return created, destroyed, moved
+
+
+def main():
+    order = list(range(ITEMS))
+    shuffled = order[:]
+    random.Random(1).shuffle(shuffled)
+    scenarios = {
+        "prepend": [-1] + order,
+        "shuffle": shuffled,
+        "append": order + [ITEMS],
+    }
+    old = parser.parse_html(pages.keyed_list(ITEMS))
+    print(f"{ITEMS}-item keyed list")
+    print(f"{'scenario':<10}{'differ':<8}{'created':>10}{'destroyed':>11}{'moved':>8}{'diff ms':>10}")
+    for name, new_order in scenarios.items():
+        new = parser.parse_html(pages.keyed_list(ITEMS, new_order))
+        for label, differ in (("index", legacy_diff), ("keyed", lambda a, b: reconciler.diff(a, b, ATOMIC_TAGS))):
+            start = time.perf_counter()
+            diffs = differ(old, new)
+            elapsed = (time.perf_counter() - start) * 1000
+            created, destroyed, moved = churn(diffs)
+            print(f"{name:<10}{label:<8}{created:>10}{destroyed:>11}{moved:>8}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Input latency while a large page renders: one blocking pass vs time slices.
+
+Renders the same tree once with a single recursive render_vdom call and
+once through the browser's RenderScheduler, while the InputLatencyMonitor
+measures how late the event loop runs its timer. For the scheduled render
+it also prints the scheduler's frame count, slice durations and total time.
+
+Requires a display (run under Xvfb on headless machines).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+from browser import SimpleBrowser
+import pages
+
+SECTIONS = 2000
+
+
+def pump(browser, done):
+    while not done():
+        browser.parent.update()
+        time.sleep(0.001)
+    settle = time.perf_counter() + 0.2
+    while time.perf_counter() < settle:
+        browser.parent.update()
+        time.sleep(0.001)
+
+
+def main():
+    vdom = parser.parse_html(pages.article(SECTIONS))
+    browser = SimpleBrowser()
+    browser.input_latency.start()
+    pump(browser, lambda: True)
+
+    browser.input_latency.reset()
+    start = time.perf_counter()
+    browser.render_vdom(vdom, browser.content_frame)
+    blocking = time.perf_counter() - start
+    pump(browser, lambda: True)
+    sync = browser.input_latency.summary()
+
+    browser._clear_content()
+    pump(browser, lambda: True)
+    browser.input_latency.reset()
+    browser._show_page("http://localhost/bench", vdom)
+    pump(browser, lambda: not browser.render_scheduler.active)
+    sliced = browser.input_latency.summary()
+    stats = browser.render_scheduler.stats
+
+    print(f"{'mode':<10}{'render s':>10}{'p95 lag ms':>13}{'max lag ms':>13}")
+    print(f"{'blocking':<10}{blocking:>10.2f}{sync['p95_ms']:>13.1f}{sync['max_ms']:>13.1f}")
+    print(f"{'sliced':<10}{stats['total_ms'] / 1000:>10.2f}{sliced['p95_ms']:>13.1f}{sliced['max_ms']:>13.1f}")
+    print(f"frames {stats['frames']}, units {stats['units']}, "
+          f"slice mean {stats['mean_slice_ms']:.1f} ms, max {stats['max_slice_ms']:.1f} ms")
+    browser.parent.destroy()
+
+
+if __name__ == "__main__":
+    main()
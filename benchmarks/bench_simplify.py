@@ -0,0 +1,52 @@
+"""Widget count and render time with and without the simplify pass.
+
+Renders real-world-shaped documents (nested wrapper divs, paragraphs with
+inline markup) from the raw parse and from the simplified tree the browser
+actually uses.
+
+Requires a display (run under Xvfb on headless machines).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+from browser import SimpleBrowser
+from simplify import simplify
+import pages
+
+DOCUMENTS = {
+    "blog x200": pages.blog(200),
+    "article x500": pages.article(500),
+}
+
+
+def count_widgets(widget):
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())
+
+
+def render(browser, vdom):
+    browser._clear_content()
+    browser.parent.update()
+    start = time.perf_counter()
+    browser.render_vdom(vdom, browser.content_frame)
+    browser.parent.update()
+    return time.perf_counter() - start, count_widgets(browser.content_frame)
+
+
+def main():
+    browser = SimpleBrowser()
+    print(f"{'document':<14}{'raw widgets':>12}{'simplified':>12}{'raw s':>8}{'simple s':>10}")
+    for name, html in DOCUMENTS.items():
+        raw = parser.parse_html(html)
+        simplified = simplify(raw, browser._is_container)
+        raw_time, raw_widgets = render(browser, raw)
+        simple_time, simple_widgets = render(browser, simplified)
+        print(f"{name:<14}{raw_widgets:>12}{simple_widgets:>12}{raw_time:>8.2f}{simple_time:>10.2f}")
+    browser.parent.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Time to first widget vs total load time for multi-megabyte pages.
+
+Loads synthetic documents of growing size with and without streaming.
+With streaming, the first widget should appear after roughly one chunk has
+been downloaded and parsed, independent of document size.
+
+Requires a display (run under Xvfb on headless machines).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transport
+from browser import SimpleBrowser
+from local_server import LocalServer
+import pages
+
+SIZES_MB = (1, 4, 8)
+
+
+def load(browser, url):
+    browser.url_entry.delete(0, "end")
+    browser.url_entry.insert(0, url)
+    start = time.perf_counter()
+    browser.load_url()
+    first = None
+    while browser.pending_nav is not None or browser.render_scheduler.active:
+        browser.parent.update()
+        if first is None and browser.widget_map:
+            first = time.perf_counter() - start
+        time.sleep(0.0005)
+    total = time.perf_counter() - start
+    return first if first is not None else total, total, len(browser.widget_map)
+
+
+def main():
+    # No HTTP cache: every load must really download and parse
+    transport.configure(cache=None)
+    routes = {f"/{mb}mb": pages.sized(mb * 1024 * 1024) for mb in SIZES_MB}
+    with LocalServer(routes) as server:
+        print(f"{'size':<8}{'mode':<12}{'first widget s':>16}{'total s':>10}{'widgets':>10}")
+        for mb in SIZES_MB:
+            for streaming in (False, True):
+                browser = SimpleBrowser(streaming=streaming)
+                browser.vdom_cache.max_bytes = 0  # Measure parsing, not the tree cache
+                first, total, widgets = load(browser, server.url(f"/{mb}mb"))
+                mode = "streaming" if streaming else "whole"
+                print(f"{mb:>3} MB   {mode:<12}{first:>16.3f}{total:>10.2f}{widgets:>10}")
+                browser.parent.destroy()
+
+
+if __name__ == "__main__":
+    main()
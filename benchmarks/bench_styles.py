@@ -0,0 +1,53 @@
+"""Layout cost of repeated re-renders with the shared style registry.
+
+Lays the same documents out with the canvas renderer once on empty caches
+and then several more times, as a reload or a resize back to the same
+width would. The warm passes should get nearly every font, width and
+line break from the caches.
+
+Requires a display (run under Xvfb on headless machines).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import styles
+from browser import SimpleBrowser
+from canvas_renderer import MARGIN
+import pages
+
+DOCUMENTS = {
+    "blog x200": pages.blog(200),
+    "article x500": pages.article(500),
+}
+WARM_PASSES = 5
+
+
+def layout(view, vdom):
+    view.unmount()
+    view.width = view.canvas.winfo_width()
+    start = time.perf_counter()
+    view.layout(vdom, MARGIN, MARGIN, None)
+    return time.perf_counter() - start
+
+
+def main():
+    browser = SimpleBrowser(render_backend="canvas")
+    view = browser.page_view
+    print(f"{'document':<14}{'cold ms':>9}{'warm ms':>9}{'measure hit':>13}{'wrap hit':>10}{'fonts':>7}")
+    for name, html in DOCUMENTS.items():
+        vdom = browser.parse_html(html)
+        styles.reset()
+        styles.bind(browser.content_canvas)
+        cold = layout(view, vdom)
+        warm = min(layout(view, vdom) for _ in range(WARM_PASSES))
+        stats = styles.stats()
+        print(f"{name:<14}{cold * 1000:>9.1f}{warm * 1000:>9.1f}{stats['measure_hit_rate']:>13.1%}"
+              f"{stats['wrap_hit_rate']:>10.1%}{stats['fonts']:>7}")
+    browser.parent.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Diff cost for a one-word change as the document grows.
+
+Each page differs from the previous version in a single paragraph, as when a
+form POST returns an almost identical page. With structural hashing the
+nodes visited (and the time) should stay flat while the document grows.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+import reconciler
+from browser import ATOMIC_TAGS
+import pages
+
+
+def main():
+    print(f"{'nodes':>8}{'visited':>10}{'skipped':>10}{'diff ms':>10}")
+    for sections in (100, 1000, 10000):
+        html = pages.article(sections)
+        old = parser.parse_html(html)
+        new = parser.parse_html(html.replace("in section 7.", "in section seven.", 1))
+        nodes = sum(1 for _ in walk(old))
+        stats = {}
+        start = time.perf_counter()
+        diffs = reconciler.diff(old, new, ATOMIC_TAGS, stats)
+        elapsed = (time.perf_counter() - start) * 1000
+        changed = [d[0] for d in diffs if d[0] != "retain"]
+        print(f"{nodes:>8}{stats['visited']:>10}{stats['skipped']:>10}{elapsed:>10.2f}   {changed}")
+
+
+def walk(node):
+    yield node
+    for child in node.children:
+        yield from walk(child)
+
+
+if __name__ == "__main__":
+    main()
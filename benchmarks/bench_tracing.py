@@ -0,0 +1,68 @@
+"""Cost of tracing, switched off and on.
+
+Times parse + update_dom of a changing blog page with the tracer disabled
+and enabled (headless, so only the browser's own work is measured), and
+the cost of a single disabled span. Both browsers are warmed up first, then
+their runs alternate (swapping which goes first each round) and the median
+of each is reported. Writes the enabled run's spans to
+the path given as the first argument (by default, trace.json in the
+temporary directory) for chrome://tracing or https://ui.perfetto.dev.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser import SimpleBrowser
+from tracing import Tracer
+import headless
+import pages
+
+UPDATES = 30
+ROUNDS = 7
+SPAN_CALLS = 200000
+
+
+def run(browser, documents):
+    browser.update_dom(documents[0])
+    browser.render_scheduler.flush()
+    start = time.perf_counter()
+    for html in documents[1:]:
+        browser.update_dom(html)
+    return (time.perf_counter() - start) / (len(documents) - 1) * 1000
+
+
+def main():
+    out = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "trace.json")
+    documents = [pages.blog(200 + i % 2) for i in range(UPDATES + 1)]
+    browsers = {enabled: SimpleBrowser(toolkit=headless, trace=enabled) for enabled in (False, True)}
+    for browser in browsers.values():
+        run(browser, documents)  # Warm-up: caches, imports, first allocations
+    times = {enabled: [] for enabled in browsers}
+    for i in range(ROUNDS):
+        for enabled in ((False, True) if i % 2 == 0 else (True, False)):
+            times[enabled].append(run(browsers[enabled], documents))
+    results = {enabled: statistics.median(ms) for enabled, ms in times.items()}
+    browsers[True].tracer.export(out)
+    spans = len(browsers[True].tracer.events)
+    for browser in browsers.values():
+        browser.parent.destroy()
+
+    tracer = Tracer()
+    start = time.perf_counter()
+    for _ in range(SPAN_CALLS):
+        with tracer.span("noop"):
+            pass
+    disabled_ns = (time.perf_counter() - start) / SPAN_CALLS * 1e9
+
+    print(f"update_dom, tracing off: {results[False]:8.2f} ms")
+    print(f"update_dom, tracing on:  {results[True]:8.2f} ms ({results[True] / results[False] - 1:+.1%})")
+    print(f"disabled span:           {disabled_ns:8.0f} ns")
+    print(f"{spans} spans written to {out}")
+
+
+if __name__ == "__main__":
+    main()
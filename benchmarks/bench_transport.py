@@ -0,0 +1,54 @@
+"""Repeated same-host navigations: bare requests.get vs the pooled Transport.
+
+Reports connections accepted by the local server (each one is a TCP
+handshake, plus TLS on https sites) and per-request latency.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from local_server import LocalServer
+from transport import Transport
+import pages
+
+NAVIGATIONS = 200
+
+
+def run(server, fetch):
+    before = server.connections
+    latencies = []
+    for i in range(NAVIGATIONS):
+        start = time.perf_counter()
+        response = fetch(server.url(f"/page{i % 5}"))
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return server.connections - before, latencies
+
+
+def report(name, handshakes, latencies):
+    latencies.sort()
+    print(f"{name:<10}{handshakes:>12}{statistics.mean(latencies):>12.2f}"
+          f"{latencies[len(latencies) // 2]:>12.2f}{latencies[int(len(latencies) * 0.95)]:>12.2f}")
+
+
+def main():
+    html = pages.article(20)
+    with LocalServer({f"/page{i}": html for i in range(5)}) as server:
+        bare_handshakes, bare = run(server, lambda url: requests.get(url, timeout=10))
+        transport = Transport()
+        pooled_handshakes, pooled = run(server, transport.get)
+
+        print(f"{NAVIGATIONS} navigations to {server.base_url}")
+        print(f"{'client':<10}{'handshakes':>12}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}")
+        report("requests", bare_handshakes, bare)
+        report("transport", pooled_handshakes, pooled)
+        print(f"handshakes saved: {bare_handshakes - pooled_handshakes}")
+        print(f"transport stats: {transport.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Memory held by a 50k-node VNode tree: previous VNode class vs slotted VNode.
+
+Both trees are rebuilt from the same parsed document with freshly allocated
+strings (as a parser would produce them) and measured with tracemalloc.
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+from vdom import VNode, TextNode
+import pages
+
+TARGET_NODES = 50_000
+
+
+class LegacyVNode:
+    # The VNode class as it was: per-instance __dict__, attrs dict and children list
+    def __init__(self, tag, attrs=None, children=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = children or []
+        self.key = self.attrs.get("id")
+
+
+def fresh(value):
+    if isinstance(value, list):
+        return [fresh(v) for v in value]
+    return value.encode("utf-8").decode("utf-8")
+
+
+def copy_legacy(node):
+    if node.tag == "text":
+        return LegacyVNode("text", {"content": fresh(node.content)}, [])
+    attrs = {fresh(k): fresh(v) for k, v in node.attrs.items()}
+    return LegacyVNode(fresh(node.tag), attrs, [copy_legacy(c) for c in node.children])
+
+
+def copy_slotted(node):
+    if node.tag == "text":
+        return TextNode(fresh(node.content))
+    attrs = {sys.intern(fresh(k)): fresh(v) for k, v in node.attrs.items()}
+    children = [copy_slotted(c) for c in node.children]
+    return VNode(fresh(node.tag), attrs, children or None)
+
+
+def count(node):
+    return 1 + sum(count(c) for c in node.children)
+
+
+def measure(build, source):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree = build(source)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return tree, after - before
+
+
+def main():
+    sys.setrecursionlimit(10000)
+    per_section = count(parser.parse_html(pages.article(100))) / 100
+    source = parser.parse_html(pages.article(int(TARGET_NODES / per_section)))
+    nodes = count(source)
+
+    _, legacy_bytes = measure(copy_legacy, source)
+    _, slotted_bytes = measure(copy_slotted, source)
+    print(f"{nodes} nodes")
+    print(f"{'representation':<16}{'total KB':>10}{'bytes/node':>12}")
+    print(f"{'legacy VNode':<16}{legacy_bytes / 1024:>10.0f}{legacy_bytes / nodes:>12.1f}")
+    print(f"{'slotted VNode':<16}{slotted_bytes / 1024:>10.0f}{slotted_bytes / nodes:>12.1f}")
+    print(f"saved {100 * (1 - slotted_bytes / legacy_bytes):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
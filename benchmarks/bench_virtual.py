@@ -0,0 +1,55 @@
+"""Eager widget rendering vs the virtualized view on a 20k-paragraph page.
+
+Reports time to show the page, the number of Tk widgets alive afterwards,
+and the average time to jump to a new scroll position (the virtual view
+materializes blocks on every jump; the eager view has them all already).
+
+Requires a display (run under Xvfb on headless machines).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parser
+from browser import SimpleBrowser
+import pages
+
+PARAGRAPHS = 20_000
+SCROLL_STEPS = 50
+
+
+def count_widgets(widget):
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())
+
+
+def run(render_backend, vdom):
+    browser = SimpleBrowser(render_backend=render_backend)
+    browser.parent.update()
+    start = time.perf_counter()
+    browser._show_page("http://localhost/bench", vdom)
+    browser.render_scheduler.flush()  # Time the whole render, not the first slice
+    browser.parent.update()
+    show = time.perf_counter() - start
+    widgets = count_widgets(browser.content_canvas)
+
+    start = time.perf_counter()
+    for step in range(SCROLL_STEPS):
+        browser._on_scrollbar("moveto", step / SCROLL_STEPS)
+        browser.parent.update()
+    scroll = (time.perf_counter() - start) / SCROLL_STEPS
+    browser.parent.destroy()
+    return show, widgets, scroll
+
+
+def main():
+    vdom = parser.parse_html(pages.paragraphs(PARAGRAPHS))
+    print(f"{'backend':<10}{'show s':>10}{'widgets':>10}{'scroll ms':>12}")
+    for backend in ("widgets", "virtual"):
+        show, widgets, scroll = run(backend, vdom)
+        print(f"{backend:<10}{show:>10.2f}{widgets:>10}{scroll * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
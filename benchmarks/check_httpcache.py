@@ -0,0 +1,66 @@
+"""Check that the HTTP cache never serves a response it should have dropped.
+
+A page with max-age=60 is fetched, changed by a POST and fetched again: the
+second GET must see the new body. The same goes for a same-origin page named
+in the POST response's Location or Content-Location. A redirect must not be
+answered from the cache with its target's freshness once it points elsewhere.
+Exits non-zero on any stale answer.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpcache import HTTPCache
+from local_server import LocalServer
+from transport import Transport
+
+
+def main():
+    state = {"c": 0, "d": 0, "target": "/one"}
+
+    def counter(name):
+        def page(handler):
+            if handler.command == "POST":
+                state[name] += 1
+                return "ok", {"Location": "/d", "Content-Location": "/c"} if name == "c" else {}
+            return f"{name}={state[name]}", {"Cache-Control": "max-age=60"}
+        return page
+
+    def moved(handler):
+        return "", {"status": 302, "Location": state["target"]}
+
+    routes = {
+        "/c": counter("c"),
+        "/d": counter("d"),
+        "/moved": moved,
+        "/one": ("one", {"Cache-Control": "max-age=60"}),
+        "/two": ("two", {"Cache-Control": "max-age=60"}),
+    }
+    failures = 0
+
+    def expect(label, got, want):
+        nonlocal failures
+        ok = got == want
+        failures += not ok
+        print(f"{'ok' if ok else 'STALE':<7}{label:<40}{got!r}")
+
+    with LocalServer(routes) as server, tempfile.TemporaryDirectory() as cache_dir:
+        transport = Transport(cache=HTTPCache(disk_dir=cache_dir))
+        expect("GET /c", transport.get(server.url("/c")).text, "c=0")
+        expect("GET /d", transport.get(server.url("/d")).text, "d=0")
+        state["d"] += 1  # Changed behind our back: /d stays cached until a POST names it
+        transport.post(server.url("/c"), data={"x": "1"})
+        expect("GET /c after POST /c", transport.get(server.url("/c")).text, "c=1")
+        expect("GET /d after Location: /d", transport.get(server.url("/d")).text, "d=1")
+
+        expect("GET /moved", transport.get(server.url("/moved")).text, "one")
+        state["target"] = "/two"
+        expect("GET /moved after the redirect changed", transport.get(server.url("/moved")).text, "two")
+    print(f"{failures} stale responses")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,95 @@
+"""A tiny threaded HTTP/1.1 server for benchmarks.
+
+Pages are registered as path -> body (bytes/str) or path -> callable(handler)
+returning a body. Connections are kept alive so transport-level reuse can be
+observed, and every accepted connection is counted.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalServer:
+    def __init__(self, pages=None, delay=0.0, host="127.0.0.1"):
+        self.pages = dict(pages or {})
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, 0), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._respond()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                self._respond()
+
+            def _respond(self):
+                with server._lock:
+                    server.requests += 1
+                if server.delay:
+                    time.sleep(server.delay)
+                path = self.path.split("?", 1)[0]
+                page = server.pages.get(path)
+                if page is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                headers = {}
+                if callable(page):
+                    page = page(self)
+                if isinstance(page, tuple):
+                    page, headers = page
+                body = page.encode("utf-8") if isinstance(page, str) else page
+                self.send_response(headers.pop("status", 200))
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
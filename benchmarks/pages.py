@@ -0,0 +1,62 @@
+"""Synthetic HTML documents used by the benchmarks."""
+
+
+def paragraphs(count, words=12):
+    body = "".join(
+        f"<p>Paragraph {i} " + " ".join(f"word{j}" for j in range(words)) + "</p>\n"
+        for i in range(count)
+    )
+    return f"<html><head><title>{count} paragraphs</title></head><body>{body}</body></html>"
+
+
+def article(sections=50):
+    parts = []
+    for i in range(sections):
+        parts.append(
+            f"<div class='section'><h2>Section {i}</h2>"
+            f"<p>Some <b>bold</b> text, some <em>emphasis</em> and "
+            f"<a href='/s{i}'>a link</a> in section {i}.</p>"
+            f"<ul><li>First point</li><li>Second <i>point</i></li></ul></div>\n"
+        )
+    return "<html><head><title>Article</title></head><body>" + "".join(parts) + "</body></html>"
+
+
+def keyed_list(count, order=None):
+    order = range(count) if order is None else order
+    items = "".join(f"<li id='item{i}'>Item {i}</li>" for i in order)
+    return f"<html><body><ul id='list'>{items}</ul></body></html>"
+
+
+def sized(target_bytes):
+    # Repeat a mixed block until the document reaches roughly target_bytes
+    block = article(1).split("<body>", 1)[1].rsplit("</body>", 1)[0]
+    repeats = max(1, target_bytes // len(block))
+    return "<html><body>" + block * repeats + "</body></html>"
+
+
+def blog(posts=100):
+    # Shaped like a typical CMS page: nested wrapper divs, navigation lists,
+    # paragraphs with inline markup and links, and a comment form
+    nav = "".join(f"<li class='menu-item'><a href='/c{i}'>Category {i}</a></li>" for i in range(8))
+    parts = [
+        "<html><head><title>Blog</title><style>body { margin: 0 }</style></head><body>",
+        f"<div id='page'><div class='wrapper'><header><div class='inner'><h1>The Blog</h1></div>"
+        f"<nav><div class='menu'><ul>{nav}</ul></div></nav></header><main><div class='content'>",
+    ]
+    for i in range(posts):
+        parts.append(
+            f"<article class='post'><div class='post-inner'><div class='entry-header'><h2>"
+            f"<a href='/p{i}'>Post {i}</a></h2></div><div class='entry-meta'><span>Posted on "
+            f"<time>2024-01-{i % 28 + 1:02d}</time> by <a href='/u{i % 5}'>author{i % 5}</a></span></div>"
+            f"<div class='entry-content'><div><p>This is <strong>post {i}</strong>, with some "
+            f"<em>emphasis</em>, a bit of <code>code</code> and <a href='/p{i}#more'>a link</a>.</p>"
+            f"<p>A second paragraph of post {i} that is <span class='hl'>plain</span> text.</p>"
+            f"<ul><li><span>First point</span></li><li>Second <b>point</b></li></ul></div></div>"
+            f"</div></article>\n"
+        )
+    parts.append(
+        "</div></main><footer><div class='inner'><form action='/comment' method='post'>"
+        "<div><input name='email' placeholder='Email'></div><div><input type='submit' value='Send'></div>"
+        "</form><p>&copy; The Blog</p></div></footer></div></div></body></html>"
+    )
+    return "".join(parts)
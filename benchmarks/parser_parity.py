@@ -0,0 +1,143 @@
+"""Check every parser backend against today's build_vdom, then time them.
+
+The reference is build_vdom(BeautifulSoup(html, "html.parser")), which is
+what the "html.parser" backend returns; "fast" must match it on every
+document. lxml and html5lib are not parity backends: they build trees the
+way browsers do (implied <html>/<body>, auto-closed <p>, misnested tags
+repaired), so they must match on the well-formed documents only. They are
+run on the malformed ones too, comparing what ends up in the body, and
+the cases where they differ are listed.
+
+Then every document is loaded twice in a headless browser from a local
+server, streamed and whole; both must end with the same tree (equal
+subtree_hash), and re-applying the page must skip it as unchanged.
+Exits non-zero on any mismatch.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+import parser
+import transport
+from browser import SimpleBrowser
+from local_server import LocalServer
+from suite import load
+from vdom import subtree_hash
+import headless
+import pages
+
+# Documents exercising the tree-shaping rules; well-formed ones are marked True
+CASES = [
+    ("plain", "<p>Hello <b>world</b></p>", False),
+    ("script and style dropped", "<div>a<script>var x = '<p>';</script>b<style>p {}</style>c</div>", False),
+    ("empty text dropped", "<ul>\n  <li> one </li>\n\n  <li>\t</li>\n</ul>", False),
+    ("void elements", "<p>a<br>b<img src=x.png>c<input name=q></p><br/><hr></hr>", False),
+    ("self-closing non-void", "<div/><span/>text", False),
+    ("stray end tags", "</b><p>x</i>y</p></div>z", False),
+    ("unclosed tags", "<div><p>one<p>two<span>three", False),
+    ("misnested", "<b><i>x</b>y</i>", False),
+    ("comments and doctype", "<!DOCTYPE html><!-- note --><p>a<!---->b</p>", False),
+    ("cdata and pi", "<?php echo 1 ?><p><![CDATA[raw]]></p>", False),
+    ("entities", "<p>AT&amp;T &lt;tag&gt; &#169; &#x263A; caf&eacute; a&b</p>", False),
+    ("attributes", "<a href='/x' class='one  two' rel='nofollow noopener' id=k data-x=\"1\" disabled>l</a>", False),
+    ("duplicate attributes", "<p id=a id=b>x</p>", False),
+    ("uppercase", "<DIV ID=Top><P CLASS=Lead>Hi</P></DIV>", False),
+    ("form", "<form action='/s' method=post><input type=text name=q placeholder=Search>"
+             "<input type=submit value=Go></form>", False),
+    ("table", "<html><head><title>t</title></head><body><table><tbody><tr><td headers='a b'>1</td>"
+              "<th>2</th></tr></tbody></table></body></html>", True),
+    ("article", pages.article(20), True),
+    ("paragraphs", pages.paragraphs(200), True),
+]
+# Spec-style tree builders; only expected to match on well-formed documents
+SPEC_BACKENDS = ("lxml", "html5lib")
+# Only loaded streamed vs whole: wrappers that simplify drops, at different depths
+STREAM_CASES = [
+    ("sized", pages.sized(100 * 1024)),
+    ("blog", pages.blog(40)),
+    ("wrapper then sibling", "<body><div><div><p>1</p><p>2</p></div><p>3</p></div>tail</body>"),
+    ("long wrapper then sibling", "<body><div>" + "<div><p>x</p><p>y</p></div>" * 400 + "</div><p>after</p></body>"),
+    ("inline runs in containers", "<body><div>intro <b>bold</b> tail<p>p</p>more <i>it</i></div>text</body>"),
+]
+
+
+def dump(node):
+    return (node.tag, node.attrs, node.key, [dump(child) for child in node.children])
+
+
+def body(tree):
+    # Children of the first <body> in a dumped tree, else of its root
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node[0] == "body":
+            return node[3]
+        stack.extend(reversed(node[3]))
+    return tree[3]
+
+
+def check():
+    failures = 0
+    differing = []
+    backends = [backend for backend in parser.available_backends() if backend != "html.parser"]  # The reference
+    for backend in backends:
+        for name, html, well_formed in CASES:
+            expected = dump(parser.build_vdom(BeautifulSoup(html, "html.parser")))
+            actual = dump(parser.parse_html(html, backend))
+            if backend in SPEC_BACKENDS:
+                # These add a document-level root of their own, and wrap fragments in
+                # <html><body>: compare from <html> down, or what ends up in the body
+                expected, actual = (expected[3], actual[3]) if well_formed else (body(expected), body(actual))
+            if actual == expected:
+                continue
+            if backend in SPEC_BACKENDS and not well_formed:
+                differing.append(f"{backend}: {name}")
+                continue
+            failures += 1
+            print(f"MISMATCH {backend}: {name}")
+    print(f"parity: {failures} mismatches across backends {backends} (reference: html.parser)")
+    if differing:
+        print(f"not parity backends, differ on malformed input: {', '.join(differing)}")
+    return failures
+
+
+def check_streaming():
+    failures = 0
+    transport.configure(cache=None)
+    cases = [(name, html) for name, html, *_ in CASES + STREAM_CASES]
+    documents = {f"/{i}": html for i, (_, html) in enumerate(cases)}
+    with LocalServer(documents) as server:
+        for (path, html), (name, _) in zip(documents.items(), cases):
+            hashes = []
+            for streaming in (True, False):
+                browser = SimpleBrowser(toolkit=headless, streaming=streaming)
+                load(browser, server.url(path))
+                hashes.append(subtree_hash(browser.current_vdom))
+                browser.update_dom(html)
+                if browser.last_diff_stats.get("skipped") != 1:
+                    failures += 1
+                    print(f"NOT SKIPPED {'streamed' if streaming else 'whole'}: {name}")
+                browser.parent.destroy()
+            if hashes[0] != hashes[1]:
+                failures += 1
+                print(f"MISMATCH streamed vs whole: {name}")
+    print(f"streaming: {failures} mismatches across {len(documents)} documents")
+    return failures
+
+
+def bench():
+    html = pages.sized(2 * 1024 * 1024)
+    print(f"\nparse of {len(html) / 1024 / 1024:.1f} MB document")
+    for backend in parser.available_backends():
+        start = time.perf_counter()
+        parser.parse_html(html, backend)
+        print(f"  {backend:<12}{(time.perf_counter() - start) * 1000:>9.0f} ms")
+
+
+if __name__ == "__main__":
+    failed = check() + check_streaming()
+    bench()
+    sys.exit(1 if failed else 0)
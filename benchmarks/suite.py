@@ -0,0 +1,226 @@
+"""Offline end-to-end benchmark suite with regression checks.
+
+Serves a corpus of pages from a local HTTP server and drives the whole
+pipeline for each one: fetch, parse_html, the first render, an update to a
+slightly changed version of the page (diff_vdom + apply_diffs, or a remount
+for the virtual and canvas backends) and a complete load_url navigation.
+Each stage is timed over several runs (the median is reported), and the peak
+memory of parse + render is taken with tracemalloc.
+
+Pages come from benchmarks/corpus/ (small, hand-written ones) plus larger
+ones generated by pages.py, up to a ~4MB document.
+
+By default the headless toolkit is used, so no display is needed and the
+numbers measure the browser rather than the X server. --tk renders with
+real Tk; --xvfb starts a virtual display for it.
+
+Results are compared against a baseline JSON file (written on the first run
+or with --save-baseline; it is machine specific and not checked in). The
+script exits with status 1 if any stage is slower, or uses more memory, than
+the baseline by more than --threshold.
+
+    python benchmarks/suite.py [--runs 5] [--threshold 0.25] [--backends widgets,canvas]
+                               [--pages small,news] [--tk] [--xvfb] [--save-baseline]
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser import SimpleBrowser, RENDER_BACKENDS
+from history import VDomCache
+from transport import get_transport
+from local_server import LocalServer
+import headless
+import pages
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(HERE, "corpus")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+STAGES = ("fetch", "parse", "render", "diff", "update", "load")
+# Differences below these are noise whatever the relative change
+FLOOR_MS = 2.0
+FLOOR_MB = 1.0
+LOAD_TIMEOUT = 120.0
+
+
+def corpus():
+    # Ordered small to huge
+    documents = {}
+    for name in ("small", "form", "docs", "news"):
+        with open(os.path.join(CORPUS_DIR, name + ".html"), encoding="utf-8") as f:
+            documents[name] = f.read()
+    documents["blog"] = pages.blog(500)
+    documents["large"] = pages.paragraphs(20000)
+    documents["huge"] = pages.sized(4 * 1024 * 1024)
+    return documents
+
+
+def changed(html):
+    # The same page with one block added at the top and one paragraph edited midway
+    html = html.replace("<body>", "<body><p>Updated a moment ago</p>", 1)
+    middle = html.find("</p>", len(html) // 2)
+    if middle != -1:
+        html = html[:middle] + " (edited)" + html[middle:]
+    return html
+
+
+def settle(browser):
+    # Finish everything the page queued: scheduled slices, idle callbacks, geometry
+    browser.render_scheduler.flush()
+    browser.parent.update_idletasks()
+
+
+def reset(browser):
+    browser._clear_content()
+    browser.current_vdom = None
+    browser.vdom_cache = VDomCache()  # Every load must really parse
+    settle(browser)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def load(browser, url):
+    browser.url_entry.delete(0, "end")
+    browser.url_entry.insert(0, url)
+    browser.load_url()
+    deadline = time.perf_counter() + LOAD_TIMEOUT
+    while browser.pending_nav is not None or browser.current_vdom is None or browser.render_scheduler.active:
+        if time.perf_counter() > deadline:
+            raise TimeoutError(url)
+        browser.parent.update()
+        time.sleep(0.0005)
+    settle(browser)
+
+
+def run_page(browser, url, html, runs):
+    times = {stage: [] for stage in STAGES}
+    new_html = changed(html)
+    for _ in range(runs):
+        reset(browser)
+        gc.collect()
+        elapsed, response = timed(lambda: get_transport().get(url))
+        times["fetch"].append(elapsed)
+        elapsed, vdom = timed(lambda: browser.parse_html(response.text))
+        times["parse"].append(elapsed)
+        elapsed, _ = timed(lambda: (browser._show_page(url, vdom), settle(browser)))
+        times["render"].append(elapsed)
+
+        new_vdom = browser.parse_html(new_html)
+        elapsed, _ = timed(lambda: browser.diff_vdom(vdom, new_vdom))
+        times["diff"].append(elapsed)
+        elapsed, _ = timed(lambda: (browser.update_vdom(new_vdom), settle(browser)))
+        times["update"].append(elapsed)
+
+        reset(browser)
+        gc.collect()
+        elapsed, _ = timed(lambda: load(browser, url))
+        times["load"].append(elapsed)
+    result = {stage: statistics.median(values) for stage, values in times.items()}
+
+    # Memory in a separate pass: tracing slows everything down
+    reset(browser)
+    gc.collect()
+    tracemalloc.start()
+    vdom = browser.parse_html(html)
+    browser._show_page(url, vdom)
+    settle(browser)
+    result["peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    reset(browser)
+    return result
+
+
+def regressions(results, baseline, threshold):
+    found = []
+    for key, value in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        floor = FLOOR_MB if key.endswith("peak_mb") else FLOOR_MS
+        if value > base * (1 + threshold) and value - base > floor:
+            found.append((key, base, value))
+    return found
+
+
+def start_xvfb():
+    if shutil.which("Xvfb") is None:
+        sys.exit("Xvfb not found")
+    display = ":97"
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    args.add_argument("--runs", type=int, default=5)
+    args.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args.add_argument("--backends", default=",".join(RENDER_BACKENDS))
+    args.add_argument("--pages", default=None, help="comma separated corpus names (default: all)")
+    args.add_argument("--baseline", default=BASELINE_PATH)
+    args.add_argument("--save-baseline", action="store_true")
+    args.add_argument("--tk", action="store_true", help="render with real Tk instead of headless")
+    args.add_argument("--xvfb", action="store_true", help="run real Tk on a virtual X display")
+    options = args.parse_args()
+
+    xvfb = start_xvfb() if options.xvfb else None
+    toolkit = None if options.tk or options.xvfb else headless
+    toolkit_name = "tk" if toolkit is None else "headless"
+    documents = corpus()
+    if options.pages:
+        documents = {name: documents[name] for name in options.pages.split(",")}
+
+    results = {}
+    try:
+        with LocalServer({f"/{name}.html": html for name, html in documents.items()}) as server:
+            print(f"{'backend':<9}{'page':<7}{'KB':>7}" + "".join(f"{s + ' ms':>11}" for s in STAGES) + f"{'peak MB':>9}")
+            for backend in options.backends.split(","):
+                browser = SimpleBrowser(toolkit=toolkit, render_backend=backend)
+                for name, html in documents.items():
+                    result = run_page(browser, server.url(f"/{name}.html"), html, options.runs)
+                    for stage, value in result.items():
+                        results[f"{toolkit_name}/{backend}/{name}/{stage}"] = value
+                    print(f"{backend:<9}{name:<7}{len(html) // 1024:>7}"
+                          + "".join(f"{result[s]:>11.1f}" for s in STAGES) + f"{result['peak_mb']:>9.1f}",
+                          flush=True)
+                browser.parent.destroy()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+    if options.save_baseline or not baseline:
+        baseline.update(results)
+        with open(options.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print(f"\nBaseline written to {options.baseline}")
+        return 0
+
+    found = regressions(results, baseline, options.threshold)
+    for key, base, value in found:
+        print(f"REGRESSION {key}: {base:.1f} -> {value:.1f} (+{value / base - 1:.0%})")
+    if not found:
+        print(f"\nNo regressions beyond {options.threshold:.0%} of {options.baseline}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,56 @@
 import tkinter as tk
-from tkinter import ttk
-import requests
-from bs4 import BeautifulSoup
-from vdom import VNode
+from vdom import subtree_hash
+import parser
+import reconciler
 import urllib.parse
-# from parser import parse_vdom
+import time
+import queue
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+from metrics import InputLatencyMonitor
+from transport import get_transport
+from history import History, VDomCache, content_key, content_hasher
+from virtual import VirtualView
+from canvas_renderer import CanvasRenderer
+from scheduler import RenderScheduler
+from simplify import simplify, inline_runs, INLINE_TAG, BLOCK_CONTAINERS
+from renderer import create_inline_text
+from tracing import Tracer, TraceHud, count_nodes, format_breakdown
+from prefetch import Prefetcher
+from images import ImageLoader, image_box, MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT
+from parse_pool import get_parse_pool
+from find import FindBar
+import styles
+
+# How often the Tk loop checks whether a background navigation has finished
+POLL_INTERVAL_MS = 15
+# Bytes read per step when streaming a response into the incremental parser
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Tags render_vdom draws itself; everything else becomes a generic container Frame
+RENDERED_TAGS = {"text", "h1", "h2", "h3", "h4", "h5", "h6", "form", "input", "button", "a", "img", INLINE_TAG}
+# Tags drawn as one widget from their whole subtree; any change inside replaces them
+ATOMIC_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6", "input", "button", "a", "img", INLINE_TAG}
+# How a page is drawn: a widget per node, only the visible widgets, or canvas items
+RENDER_BACKENDS = ("widgets", "virtual", "canvas")
+# Visible links are prefetched once scrolling has paused this long, at most this many at a time
+VISIBLE_PREFETCH_DELAY_MS = 250
+VISIBLE_PREFETCH_LIMIT = 4
+
+
+class NavigationCancelled(Exception):
+    pass
+
 
 class SimpleBrowser:
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, parser_backend=parser.DEFAULT_BACKEND, streaming=True,
+                 render_backend="widgets", toolkit=None, trace=False, prefetch=False,
+                 parse_processes=False):
+        # Widget classes come from `toolkit`: tkinter, or e.g. the headless module
+        self.toolkit = toolkit if toolkit is not None else tk
         if parent is None:
             # Create our own root window if none is provided
-            self.root = tk.Tk()
+            self.root = self.toolkit.Tk()
             self.root.title("Prowser")
             self.root.geometry("800x600")
             self.root.config(bg="white")
@@ -19,7 +59,7 @@ class SimpleBrowser:
             # Use the provided parent
             self.parent = parent
             # Check if parent is a Tk instance to set title
-            if isinstance(parent, tk.Tk):
+            if isinstance(parent, self.toolkit.Tk):
                 parent.title("Prowser")
                 parent.geometry("800x600")
                 parent.config(bg="white")
@@ -27,31 +67,71 @@ class SimpleBrowser:
         self.script_functions = {}
         self.widget_map = {}
         self.current_vdom = None  # Initialize current_vdom attribute
+        self.last_diff_stats = {}
+        self.parser_backend = parser_backend  # See parser.available_backends()
+        # "widgets" builds every widget up front, "virtual" only those in view,
+        # "canvas" paints text on the canvas and only makes widgets for controls
+        if render_backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend: {render_backend}")
+        self.render_backend = render_backend
+        # Parse in worker processes instead of on the navigation threads (see parse_pool)
+        self.parse_pool = get_parse_pool() if parse_processes else None
+        # Paint pages progressively while they download (needs the "fast" backend, parsed in-process)
+        self.streaming = (streaming and parser_backend == "fast" and render_backend == "widgets"
+                          and self.parse_pool is None)
+        self.streamed_root = None
+
+        # Network fetches and parsing run on worker threads so the Tk loop never blocks.
+        # nav_id identifies the latest navigation; results of older ones are discarded.
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prowser-nav")
+        self.nav_id = 0
+        self.pending_nav = None
+
+        # Back/forward list and the built trees of recently shown pages
+        self.history = History()
+        self.vdom_cache = VDomCache()
+
+        # Spans for each stage of a navigation (see tracing); off unless trace=True or F12.
+        # trace_span is the open root span of the navigation in flight.
+        self.tracer = Tracer(enabled=trace)
+        self.trace_span = None
+        self.trace_hud = TraceHud(self)
+
+        # Ctrl+F: find in page over a text index of the current tree
+        self.find_bar = FindBar(self)
+
+        # Speculative fetch + parse of hovered and visible links (see prefetch)
+        self.prefetcher = Prefetcher(self.fetch_and_parse) if prefetch else None
+        self.prefetch_job = None
+
+        # <img> subresources: fetched and decoded concurrently, swapped in when ready
+        self.images = ImageLoader(self.parent, self.toolkit)
 
         # URL bar and fetch button
-        self.url_frame = tk.Frame(self.parent, bg="white")
-        self.url_entry = tk.Entry(self.url_frame, width=50)
+        self.url_frame = self.toolkit.Frame(self.parent, bg="white")
+        self.back_btn = self.toolkit.Button(self.url_frame, text="◀", command=self.go_back)
+        self.forward_btn = self.toolkit.Button(self.url_frame, text="▶", command=self.go_forward)
+        self.back_btn.pack(side=self.toolkit.LEFT)
+        self.forward_btn.pack(side=self.toolkit.LEFT)
+        self.url_entry = self.toolkit.Entry(self.url_frame, width=50)
         self.url_entry.bind("<Return>", lambda event: self.load_url())
-        self.fetch_btn = tk.Button(self.url_frame, text="Go", command=self.load_url)
-        self.url_entry.pack(side=tk.LEFT, padx=5)
-        self.fetch_btn.pack(side=tk.LEFT)
+        self.fetch_btn = self.toolkit.Button(self.url_frame, text="Go", command=self.load_url)
+        self.url_entry.pack(side=self.toolkit.LEFT, padx=5)
+        self.fetch_btn.pack(side=self.toolkit.LEFT)
         self.url_frame.pack(pady=10)
 
         self.root.option_add("*Font", "Arial 12")
         self.root.option_add("*Label.Font", "Arial 12")
         self.root.option_add("*Button.Font", "Arial 12")
+        styles.bind(self.parent, self.toolkit.font.Font)
 
         # Content area (scrollable)
-        self.content_canvas = tk.Canvas(self.parent, bg="white", highlightthickness=0)
-        self.scrollbar = tk.Scrollbar(self.parent, orient="vertical", command=self.content_canvas.yview)
-        self.scrollable_frame = tk.Frame(self.content_canvas, bg="white")
+        self.content_canvas = self.toolkit.Canvas(self.parent, bg="white", highlightthickness=0)
+        self.scrollbar = self.toolkit.Scrollbar(self.parent, orient="vertical", command=self._on_scrollbar)
+        self.scrollable_frame = self.toolkit.Frame(self.content_canvas, bg="white")
 
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.content_canvas.configure(
-                scrollregion=self.content_canvas.bbox("all")
-            )
-        )
+        self.scrollable_frame.bind("<Configure>", self._on_frame_configure)
+        self.content_canvas.bind("<Configure>", lambda e: self._viewport_resized())
 
         self.content_window = self.content_canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
         self.content_canvas.configure(yscrollcommand=self.scrollbar.set)
@@ -60,6 +140,16 @@ class SimpleBrowser:
         self.scrollbar.pack(side="right", fill="y")
 
         self.content_frame = self.scrollable_frame  # For compatibility with existing code
+        # Draws whole pages for the non-widget backends; None for "widgets"
+        self.page_view = None
+        if render_backend == "virtual":
+            self.page_view = VirtualView(self)
+        elif render_backend == "canvas":
+            self.page_view = CanvasRenderer(self)
+        # Widget pages are built a slice at a time; scrollregion is recomputed once per slice
+        self.scrollregion_job = None
+        self.render_scheduler = RenderScheduler(self.parent, self._render_unit, on_slice=self._schedule_scrollregion,
+                                                tracer=self.tracer)
 
         # Bind mouse wheel for scrolling (cross-platform)
         self.content_canvas.bind_all("<MouseWheel>", self._on_mousewheel)      # Windows/macOS
@@ -68,126 +158,277 @@ class SimpleBrowser:
 
         self.content_canvas.bind_all("<Up>", self._on_arrow)
         self.content_canvas.bind_all("<Down>", self._on_arrow)
+        self.content_canvas.bind_all("<Alt-Left>", lambda e: self.go_back())
+        self.content_canvas.bind_all("<Alt-Right>", lambda e: self.go_forward())
+        self.content_canvas.bind_all("<F12>", lambda e: self.toggle_trace_hud())
+        self.content_canvas.bind_all("<Control-f>", lambda e: self.find_bar.show())
+
+        # Tracks how long input would have waited for the event loop; its timer
+        # only runs once started (e.g. by the benchmarks)
+        self.input_latency = InputLatencyMonitor(self.parent)
 
     def load_link(self, url):
         if url.startswith("#"):
             return  # Ignore anchor links
 
+        absolute_url = self._resolve(url)
+        self.url_entry.delete(0, self.toolkit.END)
+        self.url_entry.insert(0, absolute_url)
+        self.load_url()
+
+    def _resolve(self, url):
         # Resolve relative URLs against the current base URL
         current_url = self.url_entry.get()
         if not current_url.startswith(("http://", "https://")):
             current_url = "http://" + current_url
+        return urllib.parse.urljoin(current_url, url)
 
-        absolute_url = urllib.parse.urljoin(current_url, url)
-        self.url_entry.delete(0, tk.END)
-        self.url_entry.insert(0, absolute_url)
-        self.load_url()
+    def prefetch_link(self, url, urgent=True):
+        # Hovered links are urgent; visible ones are fetched when there is room.
+        # True if a new prefetch was queued.
+        if self.prefetcher is None or url.startswith("#"):
+            return False
+        return self.prefetcher.hint(self._resolve(url), self._resolve(""), urgent)
 
     def load_url(self):
         url = self.url_entry.get()
         if not url.startswith(("http://", "https://")):
             url = "http://" + url
+        self.navigate(url)
+
+    def navigate(self, url, push_history=True):
+        nav_id = self._begin_navigation()
+        trace = self._begin_trace("load_url", url=url)
+        cancelled = lambda: nav_id != self.nav_id
+        finish = lambda f: self._finish_load(f, push_history)
+        prefetched = self.prefetcher.take(url) if self.prefetcher else None
+        if prefetched is not None:
+            self.trace_span.set(prefetched=True)
+            self._when_done(prefetched, nav_id, finish)
+        elif self.streaming:
+            events = queue.Queue()
+            future = self.executor.submit(self.fetch_and_parse_streaming, url, cancelled, events.put, trace)
+            self._when_done(future, nav_id, finish, progress=lambda: self._drain_stream(events))
+        else:
+            future = self.executor.submit(self.fetch_and_parse, url, cancelled, trace)
+            self._when_done(future, nav_id, finish)
+
+    def _finish_load(self, future, push_history=True):
         try:
-            for widget in self.content_frame.winfo_children():
-                widget.destroy()
-            self.widget_map.clear()
-            new_vdom = self.fetch_and_parse(url)
-            self.current_vdom = new_vdom
-            self.render_vdom(new_vdom, self.content_frame)
-            # Reset scroll to top after rendering
-            self.content_canvas.yview_moveto(0.0)
+            final_url, new_vdom, key = future.result()
+            current = self.history.current
+            if push_history and not (current and current.url == final_url):
+                self.history.push(final_url, key)
+            else:
+                self.history.replace(final_url, key)  # Reload, or back/forward that missed the cache
+            if self.streamed_root is not None:
+                # Painted while it streamed in: fix up wherever that differs from the page
+                self.current_vdom, self.streamed_root = self.streamed_root, None
+                self.update_vdom(new_vdom)
+                self._page_drawn()
+            else:
+                self._show_page(final_url, new_vdom)
         except Exception as e:
-            error_label = tk.Label(self.content_frame, text=f"Error: {str(e)}", fg="red")
+            self._clear_content()
+            error_label = self.toolkit.Label(self.content_frame, text=f"Error: {str(e)}", fg="red")
             error_label.pack(pady=20)
+            self._end_trace(error=str(e))
+
+    def _clear_content(self):
+        self.streamed_root = None
+        self.render_scheduler.cancel()
+        self.images.cancel()
+        if self.page_view:
+            self.page_view.unmount()
+        for widget in self.content_frame.winfo_children():
+            widget.destroy()
+        self.widget_map.clear()
+
+    def _show_page(self, url, vdom):
+        # Ends the navigation's trace once the page is fully drawn
+        trace = self._trace_id()
+        self._clear_content()
+        # Use final URL after redirects
+        self.url_entry.delete(0, self.toolkit.END)
+        self.url_entry.insert(0, url)
+        self.current_vdom = vdom
+        if self.page_view:
+            with self.tracer.span("render", trace=trace, backend=self.render_backend) as span:
+                self.page_view.mount(vdom, self._is_container)
+                if span.recording:
+                    span.set(nodes=count_nodes(vdom), widgets=len(self.widget_map))
+            self._page_drawn()
+            return
+        self.render_scheduler.start(vdom, self.content_frame, on_done=self._page_drawn, trace=trace)
+        # Reset scroll to top after rendering
+        self.content_canvas.yview_moveto(0.0)
+
+    def go_back(self):
+        self._go_to_entry(self.history.back())
+
+    def go_forward(self):
+        self._go_to_entry(self.history.forward())
+
+    def _go_to_entry(self, entry):
+        if entry is None:
+            return
+        # A recently shown page is still built: skip the network and the parse
+        vdom = self.vdom_cache.get(entry.key, skipped_fetch=True) if entry.key else None
+        if vdom is not None:
+            self._begin_navigation()  # Abandon whatever was loading
+            self._begin_trace("history", url=entry.url, cached=True)
+            self._show_page(entry.url, vdom)
+        else:
+            self.navigate(entry.url, push_history=False)
+
+    def _begin_navigation(self):
+        # Supersede any in-flight navigation: cancel it if it hasn't started yet,
+        # otherwise its result is dropped when it lands
+        self.nav_id += 1
+        if self.pending_nav is not None:
+            self.pending_nav.cancel()
+            self.pending_nav = None
+        return self.nav_id
+
+    def _page_drawn(self):
+        self._end_trace()
+        self._schedule_visible_prefetch()
+        self.find_bar.page_changed()
+
+    def _begin_trace(self, name, **args):
+        # Root span of a navigation; whatever was still open was abandoned
+        self._end_trace(cancelled=True)
+        self.trace_span = self.tracer.span(name, trace=self.tracer.new_trace(), **args)
+        return self.trace_span.trace
+
+    def _end_trace(self, **args):
+        span, self.trace_span = self.trace_span, None
+        if span is None or not span.recording:
+            return
+        span.end(**args)
+        if self.trace_hud.visible and not args.get("cancelled"):
+            self.trace_hud.show(format_breakdown(self.tracer.breakdown(span.trace)))
+
+    def _trace_id(self):
+        return self.trace_span.trace if self.trace_span else None
+
+    def toggle_trace_hud(self):
+        # The HUD needs spans to show, so it turns tracing on with it
+        self.trace_hud.toggle()
+        self.tracer.enabled = self.tracer.enabled or self.trace_hud.visible
+
+    def _when_done(self, future, nav_id, callback, progress=None):
+        # Poll from the Tk loop; Tk widgets must only be touched on the main thread.
+        # `progress` is run on every poll to apply partial results.
+        self.pending_nav = future
+
+        def poll():
+            if nav_id != self.nav_id:
+                return  # Superseded by a newer navigation
+            done = future.done()
+            if progress:
+                progress()
+            if not done:
+                self.parent.after(POLL_INTERVAL_MS, poll)
+                return
+            self.pending_nav = None
+            callback(future)
+
+        self.parent.after(POLL_INTERVAL_MS, poll)
+
+    def _drain_stream(self, events):
+        # Paint whatever the streaming parser has finished since the last poll
+        while True:
+            try:
+                batch = events.get_nowait()
+            except queue.Empty:
+                return
+            with self.tracer.span("paint streamed", trace=self._trace_id(), events=len(batch)):
+                for kind, parent_node, node in batch:
+                    if kind == "start":
+                        self._clear_content()
+                        self.url_entry.delete(0, self.toolkit.END)
+                        self.url_entry.insert(0, node)  # Final URL after redirects
+                        self.content_canvas.yview_moveto(0.0)
+                        continue
+                    parent = self.widget_map.get(parent_node, self.content_frame)
+                    if kind == "open":
+                        self._create_container(node, parent)
+                        if parent_node is None:
+                            self.streamed_root = node
+                    else:
+                        self.render_vdom(node, parent)
 
     def update_dom(self, html):
         # Step 3: Parse HTML into a new virtual DOM
-        new_vdom = self.parse_html(html)
+        with self.tracer.span("update_dom", trace=self.tracer.new_trace(), bytes=len(html)):
+            self.update_vdom(self.parse_html(html))
+
+    def update_vdom(self, new_vdom):
         # Step 4: Diff old and new VDOM, then reconcile
+        self.render_scheduler.flush()  # The differ needs every widget of the old tree
         if self.current_vdom:
-            diffs = self.diff_vdom(self.current_vdom, new_vdom)
-            self.apply_diffs(diffs)
+            if subtree_hash(self.current_vdom) == subtree_hash(new_vdom):
+                self.last_diff_stats = {"visited": 0, "skipped": 1}
+                return  # Same page: keep the tree the widgets belong to
+            if self.page_view:
+                # Few or no widgets to patch; redrawing is cheaper than diffing
+                with self.tracer.span("render", backend=self.render_backend):
+                    self.page_view.mount(new_vdom, self._is_container, keep_position=True)
+                self.current_vdom = new_vdom
+                self.find_bar.page_changed()
+                return
+            with self.tracer.span("diff_vdom") as span:
+                diffs = self.diff_vdom(self.current_vdom, new_vdom)
+                span.set(ops=len(diffs), **self.last_diff_stats)
+            with self.tracer.span("apply_diffs", ops=len(diffs)) as span:
+                self.apply_diffs(diffs)
+                span.set(widgets=len(self.widget_map))
+        elif self.page_view:
+            with self.tracer.span("render", backend=self.render_backend):
+                self.page_view.mount(new_vdom, self._is_container)
         else:
-            self.render_vdom(new_vdom, self.content_frame)
+            self.render_scheduler.start(new_vdom, self.content_frame, trace=self.tracer.current_trace())
         self.current_vdom = new_vdom
+        self.find_bar.page_changed()
 
     def parse_html(self, html):
-        # Parse HTML into a virtual DOM tree using BeautifulSoup
-        soup = BeautifulSoup(html, "html.parser")
-        return self.build_vdom(soup)
+        # Parse HTML into a virtual DOM tree with the selected backend, simplified for
+        # rendering (see simplify). Runs on worker threads, before the tree is current.
+        if self.parse_pool is not None:
+            with self.tracer.span("parse_html", backend=self.parser_backend, chars=len(html), process=True):
+                return self.parse_pool.parse(html, self.parser_backend, self._is_container)
+        with self.tracer.span("parse_html", backend=self.parser_backend, chars=len(html)):
+            vdom = parser.parse_html(html, self.parser_backend)
+        with self.tracer.span("simplify") as span:
+            vdom = simplify(vdom, self._is_container)
+            if span.recording:
+                span.set(nodes=count_nodes(vdom))
+        return vdom
 
     def build_vdom(self, soup_node):
-        if isinstance(soup_node, str):
-            content = soup_node.strip()
-            return VNode("text", {"content": content}, []) if content else None
-        
-        if not hasattr(soup_node, "name") or soup_node.name in ["script", "style"]:
-            return None
-
-        # Handle special cases for form elements
-        attrs = dict(soup_node.attrs)
-        children = []
-        
-        # Process children recursively
-        for child in soup_node.children:
-            child_vdom = self.build_vdom(child)
-            if child_vdom:
-                children.append(child_vdom)
-
-        # Special handling for form structure
-        if soup_node.name == "form":
-            return VNode("form", attrs, children)
-        
-        return VNode(soup_node.name, attrs, children)
+        return parser.build_vdom(soup_node)
 
     def diff_vdom(self, old_node, new_node):
-        diffs = []
-        if old_node.tag != new_node.tag or old_node.key != new_node.key:
-            # Node type/key changed → replace
-            diffs.append(("replace", old_node, new_node))
-        else:
-            # Check for attribute changes
-            attr_diff = {}
-            for key in set(old_node.attrs) | set(new_node.attrs):
-                old_val = old_node.attrs.get(key)
-                new_val = new_node.attrs.get(key)
-                if old_val != new_val:
-                    attr_diff[key] = new_val
-            if attr_diff:
-                diffs.append(("attrs", old_node, attr_diff))
-            
-            # Diff children (include index)
-            max_children = max(len(old_node.children), len(new_node.children))
-            for i in range(max_children):
-                old_child = old_node.children[i] if i < len(old_node.children) else None
-                new_child = new_node.children[i] if i < len(new_node.children) else None
-
-                if not old_child and new_child:
-                    # Add action: (parent, new_child, index)
-                    diffs.append(("add", old_node, new_child, i))
-                elif old_child and not new_child:
-                    # Remove action: (parent, old_child, index)
-                    diffs.append(("remove", old_node, old_child, i))
-                elif old_child and new_child:
-                    diffs.extend(self.diff_vdom(old_child, new_child))
-        return diffs
+        # Keyed diff; see reconciler for the operations it emits.
+        # last_diff_stats counts node pairs visited and unchanged subtrees skipped.
+        self.last_diff_stats = {}
+        return reconciler.diff(old_node, new_node, ATOMIC_TAGS, self.last_diff_stats)
 
     def render_vdom(self, vdom, parent):
         try:
 
             if vdom.tag == "text":
                 content = vdom.attrs.get("content", "")
-                widget = tk.Label(parent, text=content)
+                widget = self.toolkit.Label(parent, text=content)
                 widget.pack(anchor="w")
                 self.widget_map[vdom] = widget
 
             elif vdom.tag in ["h1", "h2", "h3", "h4", "h5", "h6"]:
-                sizes = {"h1": 24, "h2": 20, "h3": 18, "h4": 16, "h5": 14, "h6": 12}
-                font_size = sizes.get(vdom.tag, 12)
-                widget = tk.Label(
+                widget = self.toolkit.Label(
                     parent,
                     text="".join(child.attrs.get("content", "") for child in vdom.children if child.tag == "text"),
-                    font=("Arial", font_size, "bold"),
+                    font=styles.header_font(vdom.tag),
                     bg="white",
                     anchor="w",
                     justify="left",
@@ -197,8 +438,8 @@ class SimpleBrowser:
                 self.widget_map[vdom] = widget
 
             elif vdom.tag == "form":
-                form_frame = tk.Frame(parent, bg="white")
-                form_frame.pack(fill=tk.X, padx=5, pady=10)
+                form_frame = self.toolkit.Frame(parent, bg="white")
+                form_frame.pack(fill=self.toolkit.X, padx=5, pady=10)
                 self.widget_map[vdom] = form_frame
                 
                 # Store form metadata
@@ -219,22 +460,22 @@ class SimpleBrowser:
                 parent_form = self.find_parent_form(parent)
                 
                 if input_type == "submit":
-                    widget = tk.Button(
+                    widget = self.toolkit.Button(
                         parent,
                         text=vdom.attrs.get("value", "Submit"),
                         command=lambda f=parent_form: self.handle_form_submit(f)
                     )
                     widget.pack(pady=5)
                 else:
-                    frame = tk.Frame(parent, bg="white")
-                    frame.pack(fill=tk.X, pady=2)
+                    frame = self.toolkit.Frame(parent, bg="white")
+                    frame.pack(fill=self.toolkit.X, pady=2)
                     
                     label_text = vdom.attrs.get("placeholder", "")
                     if label_text:
-                        tk.Label(frame, text=label_text, bg="white").pack(side=tk.LEFT, padx=5)
+                        self.toolkit.Label(frame, text=label_text, bg="white").pack(side=self.toolkit.LEFT, padx=5)
                     
-                    entry = tk.Entry(frame)
-                    entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
+                    entry = self.toolkit.Entry(frame)
+                    entry.pack(side=self.toolkit.LEFT, expand=True, fill=self.toolkit.X)
                     
                     # Store input reference in form data
                     if parent_form:
@@ -245,7 +486,7 @@ class SimpleBrowser:
 
                 self.widget_map[vdom] = widget
             elif vdom.tag == "button":
-                widget = tk.Button(
+                widget = self.toolkit.Button(
                     parent,
                     text=vdom.attrs.get("content", ""),
                     command=lambda: self.handle_event(vdom.attrs.get("onclick")),
@@ -253,22 +494,29 @@ class SimpleBrowser:
                 widget.pack(pady=5)
                 self.widget_map[vdom] = widget
 
+            elif vdom.tag == INLINE_TAG:
+                widget = create_inline_text(parent, vdom, self.load_link, bg=parent.cget("bg"), toolkit=self.toolkit,
+                                            on_hover=self.prefetch_link)
+                self.widget_map[vdom] = widget
+
+            elif vdom.tag == "img":
+                self._create_image(vdom, parent)
+
             elif vdom.tag == "a":
                 url = vdom.attrs.get("href", "#")
                 text = ""
                 for child in vdom.children:
                     if child.tag == "text":
                         text += child.attrs.get("content", "")
-                widget = tk.Label(parent, text=text, fg="blue", cursor="hand2", underline=True)
+                widget = self.toolkit.Label(parent, text=text, fg="blue", cursor="hand2", underline=True)
                 widget.pack(anchor="w")
                 widget.bind("<Button-1>", lambda e, link=url: self.load_link(link))
+                widget.bind("<Enter>", lambda e, link=url: self.prefetch_link(link))
                 self.widget_map[vdom] = widget
                 
             else:
                 # Generic container for unknown tags
-                frame = tk.Frame(parent)
-                frame.pack(fill=tk.X, padx=5, pady=5)
-                self.widget_map[vdom] = frame
+                frame = self._create_container(vdom, parent)
                 for child in vdom.children:
                     self.render_vdom(child, frame)
 
@@ -276,6 +524,47 @@ class SimpleBrowser:
             print(f"Rendering error for VNode {vdom}: {str(e)}")
             raise
     
+    def _render_unit(self, vdom, parent):
+        # One step of the render scheduler: a generic container's children are
+        # scheduled separately, anything else is rendered whole
+        if vdom.tag in RENDERED_TAGS:
+            self.render_vdom(vdom, parent)
+            return None
+        return self._create_container(vdom, parent)
+
+    @staticmethod
+    def _is_container(tag):
+        return tag not in RENDERED_TAGS
+
+    def _create_image(self, vdom, parent):
+        # A placeholder of the final size when the page gives one, replaced by the image once loaded
+        max_width, max_height, sized = image_box(vdom.attrs, MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT)
+        if sized:
+            blank = self.toolkit.PhotoImage(width=max_width, height=max_height)
+            widget = self.toolkit.Label(parent, image=blank, bg="#eeeeee", borderwidth=0)
+            widget.image = blank
+        else:
+            widget = self.toolkit.Label(parent, text=vdom.attrs.get("alt") or "[image]", fg="gray",
+                                        bg=parent.cget("bg"))
+        widget.pack(anchor="w", pady=2)
+        self.widget_map[vdom] = widget
+        src = vdom.attrs.get("src")
+        if src:
+            def show(photo):
+                if widget.winfo_exists():
+                    widget.config(image=photo, text="", bg=parent.cget("bg"))
+                    widget.image = photo  # Tk drops images Python no longer references
+                    if self.page_view:
+                        self.page_view.content_changed()
+            self.images.request(self._resolve(src), max_width, max_height, show)
+        return widget
+
+    def _create_container(self, vdom, parent):
+        frame = self.toolkit.Frame(parent)
+        frame.pack(fill=self.toolkit.X, padx=5, pady=5)
+        self.widget_map[vdom] = frame
+        return frame
+
     def find_parent_form(self, widget):
         while widget:
             if hasattr(widget, 'form_data'):
@@ -288,7 +577,8 @@ class SimpleBrowser:
         data = {}
 
         for name, entry in form_data["inputs"].items():
-            data[name] = entry.get()
+            if entry.winfo_exists():  # Inputs removed by a DOM update leave dead entries
+                data[name] = entry.get()
 
         # Resolve relative action URL
         current_url = self.url_entry.get()
@@ -298,29 +588,58 @@ class SimpleBrowser:
         else:
             action_url = urllib.parse.urljoin(current_url, action_url)
 
-        try:
-            if form_data["method"] == "GET":
-                response = requests.get(action_url, params=data)
-            else:
-                response = requests.post(action_url, data=data)
+        nav_id = self._begin_navigation()
+        trace = self._begin_trace("handle_form_submit", method=form_data["method"], url=action_url)
+        future = self.executor.submit(self._submit_form, form_data["method"], action_url, data, trace)
+        self._when_done(future, nav_id, self._finish_form_submit)
+
+    def _submit_form(self, method, action_url, data, trace=None):
+        # Runs on a worker thread: network and parsing only, no Tk calls
+        with self.tracer.span("submit", trace=trace):
+            transport = get_transport()
+            start = time.perf_counter()
+            with self.tracer.span("fetch", method=method) as span:
+                if method == "GET":
+                    response = transport.get(action_url, params=data)
+                else:
+                    response = transport.post(action_url, data=data)
+                self._trace_response(span, response)
 
-            if response.status_code == 200:
-                self.url_entry.delete(0, tk.END)
-                self.url_entry.insert(0, response.url)
-                self.update_dom(response.text)
+            if response.status_code != 200:
+                return None
+            return self._build_page(response, time.perf_counter() - start)
+
+    def _finish_form_submit(self, future):
+        try:
+            result = future.result()
+            if result:
+                final_url, new_vdom, key = result
+                self.history.push(final_url, key)
+                self.url_entry.delete(0, self.toolkit.END)
+                self.url_entry.insert(0, final_url)
+                with self.tracer.span("update", trace=self._trace_id()):
+                    self.update_vdom(new_vdom)
+            self._end_trace()
 
         except Exception as e:
-            error_label = tk.Label(self.content_frame, text=f"Form Error: {str(e)}", fg="red")
+            error_label = self.toolkit.Label(self.content_frame, text=f"Form Error: {str(e)}", fg="red")
             error_label.pack(pady=10)
+            self._end_trace(error=str(e))
 
     def apply_diffs(self, diffs):
+        retained = []
         for diff in diffs:
             action, *payload = diff  # Unpack dynamically
             if action == "replace":
-                old_node, new_node = payload
-                old_widget = self.widget_map.pop(old_node)
-                old_widget.destroy()
-                self.render_vdom(new_node, old_widget.master)
+                parent_node, old_node, new_node = payload
+                parent_widget = self._parent_widget(parent_node)
+                old_widget = self._outer_widget(old_node, parent_widget)
+                self.render_vdom(new_node, parent_widget)
+                if old_widget is not None:
+                    self._outer_widget(new_node, parent_widget).pack_configure(before=old_widget)
+                    old_widget.destroy()
+                self.widget_map.pop(old_node, None)
+                self._clean_widget_map(old_node)
             elif action == "attrs":
                 old_node, attr_diff = payload
                 widget = self.widget_map.get(old_node)
@@ -328,18 +647,60 @@ class SimpleBrowser:
                     for key, value in attr_diff.items():
                         if key == "content":
                             widget.config(text=value)
-            elif action == "add":
-                parent_node, new_child, index = payload
+                        elif key in ("action", "method") and hasattr(widget, "form_data"):
+                            widget.form_data[key] = (value or "").upper() if key == "method" else (value or "")
+            elif action == "insert":
+                parent_node, new_child, index, before = payload
                 parent_widget = self.widget_map.get(parent_node)
                 if parent_widget:
                     self.render_vdom(new_child, parent_widget)
+                    self._place(new_child, before, parent_widget)
+            elif action == "move":
+                parent_node, old_child, index, before = payload
+                parent_widget = self.widget_map.get(parent_node)
+                if parent_widget:
+                    self._place(old_child, before, parent_widget)
             elif action == "remove":
                 parent_node, old_child, index = payload
-                widget = self.widget_map.pop(old_child, None)
+                widget = self._outer_widget(old_child, self._parent_widget(parent_node))
+                self.widget_map.pop(old_child, None)
                 if widget:
                     widget.destroy()
                     self._clean_widget_map(old_child)
-                    
+            elif action == "retain":
+                retained.append(payload)
+
+        # Kept widgets now belong to the nodes of the new tree
+        for old_node, new_node in retained:
+            widget = self.widget_map.pop(old_node, None)
+            if widget is not None:
+                self.widget_map[new_node] = widget
+
+    def _parent_widget(self, parent_node):
+        if parent_node is None:
+            return self.content_frame
+        return self.widget_map.get(parent_node)
+
+    def _outer_widget(self, node, parent_widget):
+        # The widget actually packed into parent_widget for node (inputs sit inside a Frame)
+        widget = self.widget_map.get(node)
+        while widget is not None and widget.master is not parent_widget:
+            widget = widget.master
+        return widget
+
+    def _place(self, node, before, parent_widget):
+        # Repack node's widget in front of `before`'s, or last when before is None
+        widget = self._outer_widget(node, parent_widget)
+        if widget is None:
+            return
+        anchor = self._outer_widget(before, parent_widget) if before is not None else None
+        if anchor is not None:
+            widget.pack_configure(before=anchor)
+        else:
+            slaves = parent_widget.pack_slaves()
+            if slaves and slaves[-1] is not widget:
+                widget.pack_configure(after=slaves[-1])
+
     def _clean_widget_map(self, node):
         """Recursively remove all children of a node from widget_map"""
         for child in node.children:
@@ -354,29 +715,195 @@ class SimpleBrowser:
     def register_script(self, name, func):
         self.script_functions[name] = func
 
-    def fetch_and_parse(self, url):
+    def fetch_and_parse(self, url, cancelled=None, trace=None):
+        # Runs on a worker thread. Returns (final_url, vdom, cache_key) for the main thread to apply.
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            # Use final URL after redirects
-            self.url_entry.delete(0, tk.END)
-            self.url_entry.insert(0, response.url)
-            return self.parse_html(response.text)
+            with self.tracer.span("fetch_and_parse", trace=trace):
+                start = time.perf_counter()
+                with self.tracer.span("fetch", url=url) as span:
+                    response = get_transport().get(url)
+                    self._trace_response(span, response)
+                response.raise_for_status()
+                if cancelled and cancelled():
+                    raise NavigationCancelled(url)  # Don't waste a parse on a superseded load
+                return self._build_page(response, time.perf_counter() - start)
+        except NavigationCancelled:
+            raise
         except Exception as e:
             raise Exception(f"Failed to fetch {url}: {str(e)}") 
         
+    def fetch_and_parse_streaming(self, url, cancelled, emit, trace=None):
+        # Worker thread: feed the body to the incremental parser as it arrives and
+        # emit() finished pieces for the main thread to paint. Returns like fetch_and_parse.
+        with self.tracer.span("fetch_and_parse", trace=trace, streaming=True):
+            try:
+                start = time.perf_counter()
+                with self.tracer.span("fetch headers", url=url) as span:
+                    response = get_transport().get(url, stream=True)
+                    self._trace_response(span, response, body=False)
+                response.raise_for_status()
+                if getattr(response, "from_cache", False):
+                    # Body is already local; build (or reuse) the whole tree at once
+                    return self._build_page(response, time.perf_counter() - start)
+
+                # Only block containers are opened early, so paragraphs arrive whole and simplified
+                builder = parser.StreamingVDomBuilder(lambda tag: tag in BLOCK_CONTAINERS, self._is_container)
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                emit([("start", None, response.url)])
+                hasher = content_hasher()
+                parse_seconds = 0.0
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    if cancelled():
+                        response.close()
+                        raise NavigationCancelled(url)
+                    parse_start = time.perf_counter()
+                    with self.tracer.span("parse chunk", bytes=len(chunk)) as span:
+                        events = builder.feed_events(decoder.decode(chunk))
+                        span.set(events=len(events))
+                    parse_seconds += time.perf_counter() - parse_start
+                    if events:
+                        emit(events)
+                with self.tracer.span("parse finish") as span:
+                    builder.feed(decoder.decode(b"", final=True))
+                    vdom = builder.finish()
+                    if span.recording:
+                        span.set(nodes=count_nodes(vdom))
+                # The same tree as a whole-page load; _finish_load reconciles what was drawn with it
+                parse_start = time.perf_counter()
+                with self.tracer.span("simplify"):
+                    vdom = simplify(vdom, self._is_container)
+                parse_seconds += time.perf_counter() - parse_start
+                events = builder.take_events()
+                if events:
+                    emit(events)
+
+                key = (response.url, hasher.hexdigest())
+                fetch_seconds = time.perf_counter() - start - parse_seconds
+                self.vdom_cache.put(key, vdom, fetch_seconds, parse_seconds)
+                return response.url, vdom, key
+            except NavigationCancelled:
+                raise
+            except Exception as e:
+                raise Exception(f"Failed to fetch {url}: {str(e)}")
+
+    def _build_page(self, response, fetch_seconds):
+        # Same final URL and same bytes as a recent page: reuse its tree instead of parsing
+        key = content_key(response.url, response.content)
+        vdom = self.vdom_cache.get(key)
+        if vdom is None:
+            start = time.perf_counter()
+            with self.tracer.span("parse", bytes=len(response.content)):
+                vdom = self.parse_html(response.text)
+            self.vdom_cache.put(key, vdom, fetch_seconds, time.perf_counter() - start)
+        else:
+            self.tracer.span("vdom cache hit").end()
+        return response.url, vdom, key
+
+    @staticmethod
+    def _trace_response(span, response, body=True):
+        # requests reports the time until the response headers arrived as `elapsed`;
+        # DNS and connect aren't reported separately. A streamed body hasn't been read yet.
+        if span.recording:
+            elapsed = getattr(response, "elapsed", None)
+            span.set(status=response.status_code, from_cache=getattr(response, "from_cache", False),
+                     ttfb_ms=round(elapsed.total_seconds() * 1000, 2) if elapsed is not None else None)
+            if body:
+                span.set(bytes=len(response.content))
+
     def _on_mousewheel(self, event):
         # Windows and macOS
         if event.num == 4 or event.delta > 0:
             self.content_canvas.yview_scroll(-1, "units")
         elif event.num == 5 or event.delta < 0:
             self.content_canvas.yview_scroll(1, "units")
+        self._viewport_changed()
 
     def _on_arrow(self, event):
         if event.keysym == "Up":
             self.content_canvas.yview_scroll(-1, "units")
         elif event.keysym == "Down":
             self.content_canvas.yview_scroll(1, "units")
+        self._viewport_changed()
+
+    def _on_scrollbar(self, *args):
+        self.content_canvas.yview(*args)
+        self._viewport_changed()
+
+    def _on_frame_configure(self, event):
+        # Page views size the scroll region themselves
+        if self.render_backend == "widgets":
+            self._schedule_scrollregion()
+
+    def _schedule_scrollregion(self):
+        # Coalesce: bbox("all") walks every item, so compute it at most once per idle pass
+        if self.scrollregion_job is None:
+            self.scrollregion_job = self.parent.after_idle(self._update_scrollregion)
+
+    def _update_scrollregion(self):
+        self.scrollregion_job = None
+        self.content_canvas.configure(scrollregion=self.content_canvas.bbox("all"))
+
+    def _viewport_changed(self):
+        if self.page_view:
+            self.page_view.update()
+        self._schedule_visible_prefetch()
+
+    def _schedule_visible_prefetch(self):
+        # Debounced: wait until scrolling pauses
+        if self.prefetcher is None:
+            return
+        if self.prefetch_job is not None:
+            self.parent.after_cancel(self.prefetch_job)
+        self.prefetch_job = self.parent.after(VISIBLE_PREFETCH_DELAY_MS, self._prefetch_visible)
+
+    def _prefetch_visible(self):
+        self.prefetch_job = None
+        started = 0
+        for url in self.visible_links():
+            if started == VISIBLE_PREFETCH_LIMIT:
+                break
+            started += self.prefetch_link(url, urgent=False)
+
+    def visible_links(self):
+        """hrefs of the links in the viewport, top to bottom."""
+        if self.page_view:
+            return self.page_view.visible_links()
+        top = self.content_canvas.winfo_rooty()
+        bottom = top + self.content_canvas.winfo_height()
+        found = []
+        for node, widget in list(self.widget_map.items()):
+            if node.tag == "a":
+                hrefs = [node.attrs.get("href", "#")]
+            elif node.tag == INLINE_TAG:
+                hrefs = [href for _, _, href in inline_runs(node) if href is not None]
+            else:
+                continue
+            y = widget.winfo_rooty()
+            if hrefs and y < bottom and y + widget.winfo_height() > top:
+                found.extend((y, href) for href in hrefs)
+        found.sort(key=lambda item: item[0])
+        return list(dict.fromkeys(href for _, href in found))
+
+    def reveal(self, node):
+        """Scroll what draws `node` into view, unless it is already."""
+        if self.page_view:
+            self.page_view.reveal(node)
+        else:
+            widget = self.widget_map.get(node)
+            if widget is None:
+                return
+            y = widget.winfo_rooty() - self.content_frame.winfo_rooty()
+            top = self.content_canvas.canvasy(0)
+            height = self.content_canvas.winfo_height()
+            if top <= y and y + min(widget.winfo_height(), height) <= top + height:
+                return
+            self.content_canvas.yview_moveto(max(0, y - height // 3) / max(1, self.content_frame.winfo_height()))
+        self._viewport_changed()
+
+    def _viewport_resized(self):
+        if self.page_view:
+            self.page_view.resize()
 
 # Example usage:
 def on_button_click():
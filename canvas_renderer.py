@@ -0,0 +1,389 @@
+import styles
+from find import group_spans, HIGHLIGHT_BG, CURRENT_BG
+from images import image_box, MAX_IMAGE_WIDTH, MAX_IMAGE_HEIGHT
+from simplify import inline_runs, run_style, INLINE_TAG
+
+MARGIN = 10
+# Container nesting adds the same padding as the eager Frames (padx=5, pady=5)
+CONTAINER_PAD = 5
+HEADER_WRAP = 700
+LINE_GAP = 2
+FORM_PAD = 10
+RESIZE_DELAY_MS = 100
+
+
+class CanvasForm:
+    """Stands in for a form Frame: handle_form_submit only needs form_data."""
+
+    master = None
+
+    def __init__(self, action, method):
+        self.form_data = {"action": action, "method": method, "inputs": {}}
+
+
+class CanvasRenderer:
+    """Paints the page as text and rectangle items on the content canvas.
+
+    Layout wraps text into line boxes and produces a display list of
+    ("text" | "rect" | "window" | "image", node, coords, options) commands;
+    paint() turns it into canvas items. Only inputs and buttons are real
+    widgets; laying out the same tree again (on resize) keeps them, and
+    what was typed into them, and only moves their window items. Links
+    share one tag binding and look up their URL by item id.
+    Images are requested when painted; one that turns out to have a
+    different size than was reserved for it triggers another layout.
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.canvas = browser.content_canvas
+        self.toolkit = browser.toolkit
+        self.vdom = None
+        self.is_container = None
+        self.display_list = []
+        self.items = {}       # node -> canvas item ids drawn for it
+        self.link_urls = {}   # canvas item id -> href
+        self.controls = {}    # node -> input or button widget, kept across relayouts
+        self.windows = {}     # node -> canvas window item of its control
+        self.photos = []
+        self.layout_id = 0
+        self.width = 0
+        self.height = 0
+        self.resize_job = None
+        self.highlights = ([], -1)  # Find-in-page (matches, current), drawn again after a relayout
+        self.text_items = None      # node -> [(item, coords, options)] of its text, built on demand
+        self.canvas.tag_bind("link", "<Button-1>", self._on_link_click)
+        self.canvas.tag_bind("link", "<Enter>", self._on_link_enter)
+        self.canvas.tag_bind("link", "<Leave>", lambda e: self.canvas.config(cursor=""))
+
+    def mount(self, vdom, is_container, keep_position=False):
+        top = self.canvas.yview()[0] if keep_position else 0.0
+        if vdom is self.vdom:
+            highlights = self.highlights
+            self._clear_layout()
+        else:
+            highlights = ([], -1)
+            self.unmount()
+        styles.bind(self.canvas, self.toolkit.font.Font)
+        self.vdom = vdom
+        self.is_container = is_container
+        self.width = self.canvas.winfo_width()
+        self.height = self.layout(vdom, MARGIN, MARGIN, None) + MARGIN
+        self.paint()
+        self.canvas.configure(scrollregion=(0, 0, self.width, self.height))
+        self.canvas.yview_moveto(top)
+        self.highlight(*highlights)
+
+    def unmount(self):
+        self._clear_layout()
+        self.canvas.delete("control")
+        widget_map = self.browser.widget_map
+        for node, widget in self.controls.items():
+            widget.destroy()
+            if widget_map.get(node) is widget:
+                del widget_map[node]
+        self.controls.clear()
+        self.windows.clear()
+        self.vdom = None
+
+    def _clear_layout(self):
+        self.canvas.delete("page")
+        self.photos = []
+        self.layout_id += 1  # Images still loading for the old layout are dropped
+        self.display_list = []
+        self.text_items = None
+        self.items.clear()
+        self.link_urls.clear()
+
+    def update(self):
+        pass  # Everything is on the canvas already; scrolling needs no work
+
+    def content_changed(self):
+        pass  # Nothing here is drawn by widgets that change size
+
+    def resize(self):
+        # Re-wrap once the window stops changing width
+        if self.vdom is None or self.canvas.winfo_width() == self.width:
+            return
+        self._schedule_relayout()
+
+    def _schedule_relayout(self):
+        if self.resize_job is not None:
+            self.canvas.after_cancel(self.resize_job)
+        self.resize_job = self.canvas.after(RESIZE_DELAY_MS, self._relayout)
+
+    def _relayout(self):
+        self.resize_job = None
+        if self.vdom is not None:
+            self.mount(self.vdom, self.is_container, keep_position=True)
+
+    # Layout
+
+    def run_font(self, run_styles):
+        bold, italic, mono, underline, strike = run_style(run_styles)
+        return styles.font(
+            weight="bold" if bold else "normal",
+            family=styles.MONO_FAMILY if mono else styles.DEFAULT_FAMILY,
+            slant="italic" if italic else "roman",
+            underline=underline,
+            overstrike=strike,
+        )
+
+    def layout_text(self, node, text, x, y, font, max_width, fill="black", link=None):
+        linespace = styles.linespace(font)
+        for line in styles.wrap(font, text, max(max_width, 50)):
+            options = {"text": line, "font": font, "fill": fill, "anchor": "nw",
+                       "tags": ("page", "link") if link is not None else ("page",)}
+            self.display_list.append(("text", node, (x, y), options, link))
+            y += linespace
+        return y + LINE_GAP
+
+    def layout_inline(self, node, x, y, max_width):
+        # Flow runs of different styles across shared line boxes; each piece of a
+        # run on one line becomes one text item
+        right = x + max(max_width, 50)
+        line = []  # (x, words, font, href) pieces of the current line
+        cursor = x
+
+        def finish_line(y):
+            height = 0
+            for piece_x, words, font, href in line:
+                options = {"text": " ".join(words), "font": font, "fill": "blue" if href else "black", "anchor": "nw",
+                           "tags": ("page", "link") if href is not None else ("page",)}
+                self.display_list.append(("text", node, (piece_x, y), options, href))
+                height = max(height, styles.linespace(font))
+            line.clear()
+            return y + (height or styles.linespace(styles.font()))
+
+        for text, run_styles, href in inline_runs(node):
+            font = self.run_font(run_styles)
+            space = styles.measure(font, " ")
+            for n, paragraph in enumerate(text.split("\n")):
+                if n:
+                    y, cursor = finish_line(y), x
+                piece = None
+                for i, word in enumerate(paragraph.split(" ")):
+                    width = styles.measure(font, word)
+                    lead = space if i and cursor > x else 0
+                    if cursor > x and cursor + lead + width > right:
+                        y, cursor, piece, lead = finish_line(y), x, None, 0
+                    if piece is None:
+                        piece = (cursor + lead, [], font, href)
+                        line.append(piece)
+                    piece[1].append(word)  # Joined with spaces, which `lead` accounted for
+                    cursor += lead + width
+        return finish_line(y) + LINE_GAP
+
+    def layout(self, node, x, y, form):
+        # Returns the y just below what node occupies
+        right = self.width - MARGIN
+        tag = node.tag
+        if tag == "text":
+            return self.layout_text(node, node.attrs.get("content", ""), x, y, styles.font(), right - x)
+
+        if tag == INLINE_TAG:
+            return self.layout_inline(node, x, y, right - x)
+
+        if tag in styles.HEADER_SIZES:
+            font = styles.header_font(tag)
+            text = "".join(c.attrs.get("content", "") for c in node.children if c.tag == "text")
+            return self.layout_text(node, text, x, y + 10, font, min(HEADER_WRAP, right - x)) + 5
+
+        if tag == "a":
+            text = "".join(c.attrs.get("content", "") for c in node.children if c.tag == "text")
+            url = node.attrs.get("href", "#")
+            return self.layout_text(node, text, x, y, styles.font(underline=True), right - x, "blue", url)
+
+        if tag == "form":
+            form = CanvasForm(node.attrs.get("action", ""), node.attrs.get("method", "get").upper())
+            top = y + FORM_PAD
+            bottom = top
+            for child in node.children:
+                bottom = self.layout(child, x + CONTAINER_PAD, bottom, form)
+            self.display_list.append(("rect", node, (x, top - 2, right, bottom + 2), {"outline": "#dddddd", "tags": ("page",)}, None))
+            return bottom + FORM_PAD
+
+        if tag == "input":
+            return self.layout_input(node, x, y, right, form)
+
+        if tag == "img":
+            return self.layout_image(node, x, y, right - x)
+
+        if tag == "button":
+            widget = self.controls.get(node)
+            if widget is None:
+                widget = self.toolkit.Button(
+                    self.canvas,
+                    text=node.attrs.get("content", ""),
+                    command=lambda: self.browser.handle_event(node.attrs.get("onclick")),
+                )
+            return self.place_widget(node, widget, x, y)
+
+        # Generic container
+        if not node.children:
+            return y
+        y += CONTAINER_PAD
+        for child in node.children:
+            y = self.layout(child, x + CONTAINER_PAD, y, form)
+        return y + CONTAINER_PAD
+
+    def layout_input(self, node, x, y, right, form):
+        if node.attrs.get("type", "text") == "submit":
+            command = lambda f=form: self.browser.handle_form_submit(f) if f else None
+            widget = self.controls.get(node)
+            if widget is None:
+                widget = self.toolkit.Button(self.canvas, text=node.attrs.get("value", "Submit"), command=command)
+            else:
+                widget.configure(command=command)  # This layout's form
+            return self.place_widget(node, widget, x, y)
+
+        label_text = node.attrs.get("placeholder", "")
+        entry_x = x
+        if label_text:
+            font = styles.font()
+            self.display_list.append(("text", node, (x, y + 4), {"text": label_text, "font": font, "anchor": "nw", "tags": ("page",)}, None))
+            entry_x = x + styles.measure(font, label_text) + 10
+        entry = self.controls.get(node) or self.toolkit.Entry(self.canvas)
+        if form is not None:
+            form.form_data["inputs"][node.attrs.get("name", f"input_{id(entry)}")] = entry
+        return self.place_widget(node, entry, entry_x, y, max(50, right - entry_x))
+
+    def layout_image(self, node, x, y, max_width):
+        box_width, box_height, sized = image_box(node.attrs, min(MAX_IMAGE_WIDTH, max(max_width, 50)), MAX_IMAGE_HEIGHT)
+        src = node.attrs.get("src")
+        url = self.browser._resolve(src) if src else None
+        size = self.browser.images.cached_size(url, box_width, box_height) if url else None
+        if size is None and sized:
+            size = (box_width, box_height)
+        if url is not None:
+            self.display_list.append(("image", node, (x, y), {"url": url, "box": (box_width, box_height), "size": size}, None))
+        if size is None:
+            # Size unknown until it loads: alt text for now
+            return self.layout_text(node, node.attrs.get("alt") or "[image]", x, y, styles.font(), max_width, "gray")
+        self.display_list.append(("rect", node, (x, y, x + size[0], y + size[1]), {"fill": "#eeeeee", "outline": "", "tags": ("page",)}, None))
+        return y + size[1] + 4
+
+    def place_widget(self, node, widget, x, y, width=None):
+        self.controls[node] = widget
+        self.browser.widget_map[node] = widget
+        options = {"window": widget, "anchor": "nw", "tags": ("control",)}
+        if width is not None:
+            options["width"] = width
+        self.display_list.append(("window", node, (x, y), options, None))
+        return y + widget.winfo_reqheight() + 5
+
+    # Painting
+
+    def paint(self):
+        create = {"text": self.canvas.create_text, "rect": self.canvas.create_rectangle}
+        for kind, node, coords, options, link in self.display_list:
+            if kind == "image":
+                self.browser.images.request(options["url"], *options["box"], self._image_ready(coords, options["size"]))
+                continue
+            if kind == "window":
+                item = self.windows.get(node)
+                if item is None:
+                    item = self.windows[node] = self.canvas.create_window(*coords, **options)
+                else:
+                    # Laid out again: move the control rather than recreate it
+                    self.canvas.coords(item, *coords)
+                    if "width" in options:
+                        self.canvas.itemconfigure(item, width=options["width"])
+            else:
+                item = create[kind](*coords, **options)
+            self.items.setdefault(node, []).append(item)
+            if link is not None:
+                self.link_urls[item] = link
+
+    def _image_ready(self, coords, size):
+        layout_id = self.layout_id
+
+        def show(photo):
+            if layout_id != self.layout_id:
+                return
+            if (photo.width(), photo.height()) != size:
+                self._schedule_relayout()  # It will come from the image cache this time
+                return
+            self.canvas.create_image(*coords, image=photo, anchor="nw", tags=("page",))
+            self.photos.append(photo)
+        return show
+
+    # Find in page
+
+    def highlight(self, matches, current):
+        """Draw find-in-page matches behind their text; replaces the previous ones."""
+        self.canvas.delete("find")
+        self.highlights = (matches, current)
+        if not matches:
+            return
+        text_of = self.browser.find_bar.index.text_of
+        for block, (spans, current_span) in group_spans(matches, current).items():
+            items = self._text_items().get(block)
+            if not items:
+                continue
+            # Lines and inline pieces are substrings of the block's text, in order
+            text = text_of(block)
+            pieces = []
+            cursor = 0
+            for item, coords, options in items:
+                offset = text.find(options["text"], cursor)
+                if offset < 0:
+                    break
+                pieces.append((offset, item, coords, options))
+                cursor = offset + len(options["text"])
+            for start, end in spans:
+                fill = CURRENT_BG if (start, end) == current_span else HIGHLIGHT_BG
+                for offset, item, (x, y), options in pieces:
+                    line, font = options["text"], options["font"]
+                    first, last = max(start, offset) - offset, min(end, offset + len(line)) - offset
+                    if first >= last:
+                        continue
+                    rect = self.canvas.create_rectangle(
+                        x + styles.measure(font, line[:first]), y, x + styles.measure(font, line[:last]),
+                        y + styles.linespace(font), fill=fill, outline="", tags=("page", "find"))
+                    self.canvas.tag_lower(rect, item)
+
+    def reveal(self, node):
+        """Scroll the first line drawn for `node` into view, unless it is already."""
+        items = self._text_items().get(node)
+        if not items:
+            return
+        y = items[0][1][1]
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        if top <= y < top + height - styles.linespace(items[0][2]["font"]):
+            return
+        self.canvas.yview_moveto(max(0, y - height // 3) / max(1, self.height))
+
+    def _text_items(self):
+        if self.text_items is None:
+            # paint() appended each node's items in display list order
+            self.text_items = {}
+            seen = {}
+            for kind, node, coords, options, link in self.display_list:
+                if kind == "image":
+                    continue
+                n = seen.get(node, 0)
+                seen[node] = n + 1
+                if kind == "text":
+                    self.text_items.setdefault(node, []).append((self.items[node][n], coords, options))
+        return self.text_items
+
+    def _on_link_click(self, event):
+        current = self.canvas.find_withtag("current")
+        if current and current[0] in self.link_urls:
+            self.browser.load_link(self.link_urls[current[0]])
+
+    def _on_link_enter(self, event):
+        self.canvas.config(cursor="hand2")
+        current = self.canvas.find_withtag("current")
+        if current and current[0] in self.link_urls:
+            self.browser.prefetch_link(self.link_urls[current[0]])
+
+    def visible_links(self):
+        # Straight from the display list: no canvas round trips
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        links = [link for kind, node, coords, options, link in self.display_list
+                 if link is not None and top <= coords[1] < bottom]
+        return list(dict.fromkeys(links))
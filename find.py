@@ -0,0 +1,371 @@
+"""Find in page, backed by a text index over the VNode tree.
+
+TextIndex joins the text of every block of the page (the nodes drawn as
+one unit: text labels, headers, links and inline runs, as they appear on
+screen) into one lower-cased string, with newlines between blocks so no
+match spans two of them. Block start offsets map a match back to its
+block, and offsets within the block to the TextNode it starts in, so a
+query is a str.find loop over one string instead of a walk over widgets.
+
+The index is kept as flat arrays in document order with subtree sizes (as
+in wire). After apply_diffs, update() copies the runs of units that
+belong to subtrees the differ kept, walks only the new nodes, and looks
+up blocks whose content is unchanged by subtree hash (vdom.subtree_hash).
+This also covers page views that draw an updated page from scratch.
+While typing, a query that extends the previous one only re-checks the
+previous matches.
+
+FindBar is the Ctrl+F bar. Matches are highlighted through widget_map
+(label backgrounds, character ranges in inline Text widgets) or by the
+page view (page_view.highlight), and the current one is scrolled into view.
+"""
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import accumulate
+
+from simplify import inline_runs, INLINE_TAG
+from vdom import subtree_hash
+
+# Like Firefox, stop counting after this many matches ("1000+")
+MAX_MATCHES = 1000
+HIGHLIGHT_BG = "#ffff66"
+CURRENT_BG = "#ff9632"
+HEADER_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+
+# start/end: offsets in the block's text as drawn; node: the TextNode the match starts in
+Match = namedtuple("Match", "block start end node")
+
+
+def text_leaves(node):
+    """TextNodes under `node`, in document order."""
+    leaves = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag == "text":
+            leaves.append(node)
+        else:
+            stack.extend(reversed(node.children))
+    return leaves
+
+
+def block_text(node):
+    """(text as drawn, offsets, TextNodes) for a block; ("", [], []) if it shows no text.
+
+    offsets[i] is where the i-th TextNode's text starts in the drawn text.
+    """
+    tag = node.tag
+    if tag == "text":
+        return node.content, [0], [node]
+    if tag == INLINE_TAG:
+        # The renderers draw inline_runs(), which separates leaves with spaces
+        texts = [text for text, _, _ in inline_runs(node)]
+        leaves = text_leaves(node)
+    elif tag in HEADER_TAGS or tag == "a":
+        # Drawn from their direct text children only
+        leaves = [child for child in node.children if child.tag == "text"]
+        texts = [leaf.content for leaf in leaves]
+    else:
+        return "", [], []
+    offsets = [0, *accumulate(map(len, texts))][:len(leaves)]
+    return "".join(texts), offsets, leaves
+
+
+class TextIndex:
+    """The text of a page's blocks, searchable as one string (see the module docstring)."""
+
+    def __init__(self, is_container):
+        self.is_container = is_container
+        self.root = None
+        # One unit per block and per container walked through, in document order;
+        # sizes[i] is the number of units in the subtree of nodes[i]
+        self.nodes = []
+        self.sizes = []
+        self.digests = []  # subtree hashes of blocks (None for containers)
+        self.texts = []    # blocks' text as drawn ("" for containers)
+        self.folded = []   # lower-cased texts
+        self.starts = []   # offset of each unit in self.text
+        self.text = ""
+        self.leaves = {}   # block -> block_text(block), for the blocks matches were found in
+        self.query = ""
+        self.positions = []  # every occurrence of self.query (overlapping), or capped
+        self.capped = False
+        self.stats = {"kept": 0, "by_hash": 0, "extracted": 0}
+
+    def update(self, root):
+        """Index the tree under `root`, reusing what is known from the previous tree."""
+        if root is self.root:
+            return
+        old_nodes, old_sizes, old_digests, old_texts, old_folded = (
+            self.nodes, self.sizes, self.digests, self.texts, self.folded)
+        position = dict(zip(old_nodes, range(len(old_nodes))))
+        by_hash = None
+        nodes, sizes, digests, texts, folded = [], [], [], [], []
+
+        def copy(start, end):
+            nodes.extend(old_nodes[start:end])
+            sizes.extend(old_sizes[start:end])
+            digests.extend(old_digests[start:end])
+            texts.extend(old_texts[start:end])
+            folded.extend(old_folded[start:end])
+            self.stats["kept"] += end - start
+
+        # Old units to copy, gathered so that runs of kept siblings are copied at once
+        run_start = run_end = 0
+        # Ints on the stack mark where a container's units end
+        stack = [root] if root is not None else []
+        while stack:
+            node = stack.pop()
+            i = None if node.__class__ is int else position.get(node)
+            if i is not None:
+                # A subtree the differ kept from the previous tree: copy its units
+                if i != run_end:
+                    copy(run_start, run_end)
+                    run_start = i
+                run_end = i + old_sizes[i]
+                continue
+            if run_end:
+                copy(run_start, run_end)
+                run_start = run_end = 0
+            if node.__class__ is int:
+                sizes[node] = len(nodes) - node
+                continue
+            index = len(nodes)
+            nodes.append(node)
+            sizes.append(1)
+            if node.tag == "form" or self.is_container(node.tag):
+                # Forms draw each child on its own, too
+                digests.append(None)
+                texts.append("")
+                folded.append("")
+                stack.append(index)
+                stack.extend(reversed(node.children))
+                continue
+            # A new node, but maybe equal to a block of the previous tree (a page view redrawn)
+            digest = subtree_hash(node)
+            if by_hash is None:
+                by_hash = dict(zip(old_digests, range(len(old_digests))))
+            i = by_hash.get(digest)
+            if i is not None:
+                text, lowered = old_texts[i], old_folded[i]
+                self.stats["by_hash"] += 1
+            else:
+                text = block_text(node)[0]
+                lowered = text.lower()
+                if len(lowered) != len(text):
+                    lowered = text  # Offsets must stay put; match this block case-sensitively
+                self.stats["extracted"] += 1
+            digests.append(digest)
+            texts.append(text)
+            folded.append(lowered)
+        if run_end:
+            copy(run_start, run_end)
+        self.root = root
+        self.nodes, self.sizes, self.digests, self.texts, self.folded = nodes, sizes, digests, texts, folded
+        self.starts = [0, *accumulate(map((1).__add__, map(len, folded)))]
+        self.text = "\n".join(folded)
+        self.leaves = {}
+        self.query, self.positions, self.capped = "", [], False
+
+    def text_of(self, block):
+        # The block's text as drawn (match offsets refer to it)
+        return self._leaves(block)[0]
+
+    def _leaves(self, block):
+        entry = self.leaves.get(block)
+        if entry is None:
+            entry = self.leaves[block] = block_text(block)
+        return entry
+
+    def search(self, query):
+        """Non-overlapping matches of `query` (case-insensitive), at most MAX_MATCHES."""
+        query = query.lower()
+        if not query or "\n" in query:
+            return []
+        text = self.text
+        if self.query and query.startswith(self.query) and not self.capped:
+            # Typing on: every occurrence of the longer query starts at one of the shorter one
+            positions = [p for p in self.positions if text.startswith(query, p)]
+        else:
+            positions = []
+            find = text.find
+            p = find(query)
+            while p != -1 and len(positions) < MAX_MATCHES:
+                positions.append(p)
+                p = find(query, p + 1)
+            self.capped = p != -1
+        self.query, self.positions = query, positions
+
+        matches = []
+        end = -1
+        for p in positions:
+            if p < end:
+                continue
+            end = p + len(query)
+            i = bisect_right(self.starts, p) - 1
+            block = self.nodes[i]
+            start = p - self.starts[i]
+            _, offsets, leaves = self._leaves(block)
+            node = leaves[bisect_right(offsets, start) - 1]
+            matches.append(Match(block, start, start + len(query), node))
+        return matches
+
+
+def mark_widget(toolkit, widget, spans, current=None):
+    """Highlight `spans` ((start, end) in the block's text) in a block's widget.
+
+    Inline Text widgets get the character ranges tagged; labels can only be
+    highlighted whole. `current` is the span of the current match, if it is here.
+    """
+    if isinstance(widget, toolkit.Text):
+        widget.tag_configure("find", background=HIGHLIGHT_BG)
+        widget.tag_configure("find_current", background=CURRENT_BG)
+        for start, end in spans:
+            widget.tag_add("find", f"1.0+{start}c", f"1.0+{end}c")
+        if current is not None:
+            widget.tag_add("find_current", f"1.0+{current[0]}c", f"1.0+{current[1]}c")
+            widget.tag_raise("find_current")
+        return
+    if not hasattr(widget, "find_bg"):
+        widget.find_bg = widget.cget("bg")
+    widget.config(bg=CURRENT_BG if current is not None else HIGHLIGHT_BG)
+
+
+def unmark_widget(toolkit, widget):
+    if not widget.winfo_exists():
+        return
+    if isinstance(widget, toolkit.Text):
+        widget.tag_remove("find", "1.0", "end")
+        widget.tag_remove("find_current", "1.0", "end")
+    elif hasattr(widget, "find_bg"):
+        widget.config(bg=widget.find_bg)
+        del widget.find_bg
+
+
+def group_spans(matches, current):
+    """{block: ([(start, end)], current span or None)} for highlighting block by block."""
+    groups = {}
+    for i, match in enumerate(matches):
+        spans, current_span = groups.get(match.block, ([], None))
+        spans.append((match.start, match.end))
+        groups[match.block] = (spans, (match.start, match.end) if i == current else current_span)
+    return groups
+
+
+class FindBar:
+    """The Ctrl+F bar: search as you type, Enter / Shift+Enter for next / previous, Escape to close."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.index = TextIndex(browser._is_container)
+        self.frame = None
+        self.entry = None
+        self.count_label = None
+        self.matches = []
+        self.current = -1
+        self.marked = []  # Widgets highlighted through widget_map
+        self.last_query_ms = 0.0
+
+    @property
+    def visible(self):
+        return self.frame is not None
+
+    def show(self):
+        toolkit = self.browser.toolkit
+        if self.frame is None:
+            self.frame = toolkit.Frame(self.browser.parent, bg="#eeeeee", relief="solid", borderwidth=1)
+            self.entry = toolkit.Entry(self.frame, width=24)
+            self.count_label = toolkit.Label(self.frame, text="", bg="#eeeeee", width=9)
+            previous = toolkit.Button(self.frame, text="▲", command=self.previous)
+            following = toolkit.Button(self.frame, text="▼", command=self.next)
+            close = toolkit.Button(self.frame, text="✕", command=self.hide)
+            for widget in (self.entry, self.count_label, previous, following, close):
+                widget.pack(side=toolkit.LEFT, padx=2, pady=2)
+            self.entry.bind("<KeyRelease>", lambda e: self._on_type())
+            self.entry.bind("<Return>", lambda e: self.next())
+            self.entry.bind("<Shift-Return>", lambda e: self.previous())
+            self.entry.bind("<Escape>", lambda e: self.hide())
+            self.frame.place(relx=1.0, rely=1.0, x=-20, y=-20, anchor="se")
+        self.frame.lift()
+        self.entry.focus_set()
+
+    def hide(self):
+        self._clear_highlight()
+        if self.frame is not None:
+            self.frame.destroy()
+            self.frame = self.entry = self.count_label = None
+        self.matches, self.current = [], -1
+
+    def _on_type(self):
+        query = self.entry.get()
+        if query != self.index.query or not self.matches:
+            self.search(query)
+
+    def search(self, query, scroll=True):
+        """Find `query` in the current page, highlight the matches and show the first one."""
+        start = time.perf_counter()
+        previous = self.matches[self.current] if 0 <= self.current < len(self.matches) else None
+        ordinal = self.current
+        self.index.update(self.browser.current_vdom)
+        self.matches = self.index.search(query)
+        self.last_query_ms = (time.perf_counter() - start) * 1000
+        # Stay on the same match while it still matches (typing on); after a page
+        # update whose blocks are new nodes, on the same ordinal
+        self.current = 0 if self.matches else -1
+        if previous is not None:
+            for i, match in enumerate(self.matches):
+                if match.block is previous.block and match.start == previous.start:
+                    self.current = i
+                    break
+            else:
+                if not scroll and self.matches:
+                    self.current = min(ordinal, len(self.matches) - 1)
+        self._show_current(scroll)
+
+    def next(self):
+        self._step(1)
+
+    def previous(self):
+        self._step(-1)
+
+    def _step(self, delta):
+        if self.matches:
+            self.current = (self.current + delta) % len(self.matches)
+            self._show_current(True)
+
+    def page_changed(self):
+        # The page was updated or replaced: search it again, without scrolling
+        if self.visible and self.entry.get():
+            self.search(self.entry.get(), scroll=False)
+
+    def _show_current(self, scroll):
+        if self.count_label is not None:
+            if not self.matches:
+                text = "No results" if self.entry.get() else ""
+            else:
+                text = f"{self.current + 1}/{len(self.matches)}{'+' if self.index.capped else ''}"
+            self.count_label.config(text=text)
+        if scroll and self.matches:
+            self.browser.reveal(self.matches[self.current].block)
+        self._highlight()
+
+    def _highlight(self):
+        view = self.browser.page_view
+        if view is not None:
+            view.highlight(self.matches, self.current)  # Replaces what it highlighted before
+            return
+        self._clear_highlight()
+        toolkit, widget_map = self.browser.toolkit, self.browser.widget_map
+        for block, (spans, current) in group_spans(self.matches, self.current).items():
+            widget = widget_map.get(block)
+            if widget is not None:
+                mark_widget(toolkit, widget, spans, current)
+                self.marked.append(widget)
+
+    def _clear_highlight(self):
+        for widget in self.marked:
+            unmark_widget(self.browser.toolkit, widget)
+        self.marked = []
+        if self.browser.page_view is not None:
+            self.browser.page_view.highlight([], -1)
@@ -0,0 +1,599 @@
+"""A display-free stand-in for the parts of tkinter the browser uses.
+
+Pass this module as the toolkit to run the whole pipeline without a
+display: SimpleBrowser(toolkit=headless). Widgets keep their options, pack
+order and children like Tk does and report deterministic sizes. Canvas
+items, fonts (text widths from a per-character estimate) and the after /
+after_idle event loop are emulated. Nothing is drawn. Every operation is
+counted in the root's `ops` Counter (e.g. "create:Label", "pack",
+"destroy", "canvas:create_text"), so benchmarks can report the work a page
+caused.
+
+Call root.update() to run due timers and idle callbacks, as with Tk.
+"""
+import base64
+import heapq
+import itertools
+import struct
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+END = "end"
+X = "x"
+Y = "y"
+BOTH = "both"
+LEFT = "left"
+RIGHT = "right"
+TOP = "top"
+BOTTOM = "bottom"
+W = "w"
+NW = "nw"
+WORD = "word"
+NORMAL = "normal"
+DISABLED = "disabled"
+INSERT = "insert"
+
+TclError = RuntimeError
+
+DEFAULT_WIDTH = 800
+DEFAULT_HEIGHT = 600
+SCROLL_UNIT_PX = 20
+UPDATE_ROUNDS = 10000  # Guards update() against callbacks that always reschedule themselves
+
+
+class Font:
+    _ids = itertools.count(1)
+
+    def __init__(self, root=None, family="Arial", size=12, weight="normal", slant="roman",
+                 underline=False, overstrike=False, **options):
+        self.name = f"headless{next(Font._ids)}"
+        self.options = dict(family=family, size=size, weight=weight, slant=slant,
+                            underline=underline, overstrike=overstrike, **options)
+        size = abs(size)
+        narrow = 0.6 if family.lower().startswith("courier") else 0.5
+        self.char_width = size * (narrow + (0.05 if weight == "bold" else 0.0))
+        self.linespace = int(size * 1.55)
+
+    def __str__(self):
+        return self.name
+
+    def measure(self, text, displayof=None):
+        return int(len(text) * self.char_width + 0.5)
+
+    def metrics(self, *options, **kw):
+        values = {"ascent": self.linespace * 4 // 5, "descent": self.linespace // 5,
+                  "linespace": self.linespace, "fixed": 0}
+        return values[options[0]] if options else values
+
+    def actual(self, option=None, displayof=None):
+        return self.options[option] if option else dict(self.options)
+
+    def cget(self, option):
+        return self.options[option]
+
+
+class font:
+    # Mirrors the tkinter.font module
+    Font = Font
+    NORMAL = "normal"
+    BOLD = "bold"
+    ITALIC = "italic"
+    ROMAN = "roman"
+
+    @staticmethod
+    def families(root=None, displayof=None):
+        return ("Arial", "Courier")
+
+
+class Misc:
+    """Base for every headless widget: options, pack geometry and the event loop."""
+
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.options = dict(options)
+        self.children_list = []
+        self.packed = False
+        self.pack_options = {}
+        self.bindings = {}
+        self.destroyed = False
+        if master is None:
+            self._root = self
+        else:
+            self._root = master._root
+            master.children_list.append(self)
+        self._root.ops["create:" + type(self).__name__] += 1
+
+    # Identity of the "interpreter", as compared by styles.bind()
+    @property
+    def tk(self):
+        return self._root
+
+    def __getitem__(self, option):
+        return self.options.get(option)
+
+    def __setitem__(self, option, value):
+        self.configure(**{option: value})
+
+    def configure(self, cnf=None, **options):
+        if cnf:
+            options.update(cnf)
+        self.options.update(options)
+        self._root.ops["configure"] += 1
+
+    config = configure
+
+    def cget(self, option):
+        return self.options.get(option)
+
+    def destroy(self):
+        if self.destroyed:
+            return
+        for child in list(self.children_list):
+            child.destroy()
+        if self.master is not None and self in self.master.children_list:
+            self.master.children_list.remove(self)
+        self.destroyed = True
+        self._root.ops["destroy"] += 1
+
+    # Geometry
+
+    def pack(self, **options):
+        self.packed = True
+        self.pack_options.update(options)
+        self._root.ops["pack"] += 1
+
+    def pack_configure(self, before=None, after=None, **options):
+        self.pack(**options)
+        siblings = self.master.children_list
+        siblings.remove(self)
+        if before is not None:
+            siblings.insert(siblings.index(before), self)
+        elif after is not None:
+            siblings.insert(siblings.index(after) + 1, self)
+        else:
+            siblings.append(self)
+
+    def pack_forget(self):
+        self.packed = False
+
+    def place(self, **options):
+        self.pack_options = dict(options, placed=True)
+        self._root.ops["place"] += 1
+
+    def lift(self, above=None):
+        pass
+
+    def pack_slaves(self):
+        return [child for child in self.children_list if child.packed]
+
+    def winfo_children(self):
+        return list(self.children_list)
+
+    def winfo_exists(self):
+        return not self.destroyed
+
+    def winfo_ismapped(self):
+        return self.packed and not self.destroyed
+
+    def winfo_reqwidth(self):
+        return 100
+
+    def winfo_reqheight(self):
+        return 20
+
+    def winfo_width(self):
+        return self.winfo_reqwidth()
+
+    def winfo_height(self):
+        return self.winfo_reqheight()
+
+    def winfo_rooty(self):
+        return 0
+
+    def winfo_toplevel(self):
+        return self._root
+
+    # Events
+
+    def bind(self, sequence=None, func=None, add=None):
+        handlers = self.bindings.setdefault(sequence, [])
+        if not add:
+            handlers.clear()
+        handlers.append(func)
+
+    def event_generate(self, sequence, **kw):
+        # Runs the handlers bound to `sequence`, like a real event would
+        for handler in self.bindings.get(sequence, []):
+            handler(SimpleNamespace(widget=self, **kw))
+
+    def bind_all(self, sequence=None, func=None, add=None):
+        self._root.bind(sequence, func, add)
+
+    def unbind(self, sequence, funcid=None):
+        self.bindings.pop(sequence, None)
+
+    def focus_set(self):
+        pass
+
+    def after(self, ms, func=None, *args):
+        return self._root._schedule(ms, func, args)
+
+    def after_idle(self, func, *args):
+        return self._root._schedule(None, func, args)
+
+    def after_cancel(self, job):
+        self._root._timers_cancelled.add(job)
+
+    def update(self):
+        self._root._run(idle_only=False)
+
+    def update_idletasks(self):
+        self._root._run(idle_only=True)
+
+    def option_add(self, pattern, value, priority=None):
+        pass
+
+
+def _pady(options):
+    pady = options.get("pady", 0)
+    return sum(pady) if isinstance(pady, tuple) else 2 * pady
+
+
+class Tk(Misc):
+    def __init__(self, *args, **options):
+        self.ops = Counter()
+        self._timers = []  # heap of (due, seq, job, func, args)
+        self._idle = []
+        self._timers_cancelled = set()
+        self._seq = itertools.count()
+        self.size = (DEFAULT_WIDTH, DEFAULT_HEIGHT)
+        super().__init__(None, **options)
+
+    def title(self, text=None):
+        self.options["title"] = text
+
+    def geometry(self, spec=None):
+        if spec:
+            width, height = spec.split("+")[0].split("x")
+            self.size = (int(width), int(height))
+
+    def winfo_width(self):
+        return self.size[0]
+
+    def winfo_height(self):
+        return self.size[1]
+
+    def mainloop(self, n=0):
+        while not self.destroyed and (self._timers or self._idle):
+            self.update()
+            time.sleep(0.001)
+
+    def quit(self):
+        self.destroy()
+
+    def _schedule(self, ms, func, args):
+        job = f"after#{next(self._seq)}"
+        if func is None:
+            time.sleep((ms or 0) / 1000.0)  # after(ms) without a callback just waits, like Tk
+            return job
+        if ms is None:
+            self._idle.append((job, func, args))
+        else:
+            heapq.heappush(self._timers, (time.perf_counter() + ms / 1000.0, next(self._seq), job, func, args))
+        return job
+
+    def _run(self, idle_only):
+        for _ in range(UPDATE_ROUNDS):
+            ran = False
+            if not idle_only:
+                now = time.perf_counter()
+                while self._timers and self._timers[0][0] <= now:
+                    _, _, job, func, args = heapq.heappop(self._timers)
+                    if job not in self._timers_cancelled:
+                        func(*args)
+                        ran = True
+            idle, self._idle = self._idle, []
+            for job, func, args in idle:
+                if job not in self._timers_cancelled:
+                    func(*args)
+                    ran = True
+            if not ran:
+                return
+
+
+class Toplevel(Misc):
+    pass
+
+
+class Frame(Misc):
+    def winfo_reqheight(self):
+        height = self.options.get("height")
+        if height:
+            return height
+        return max(1, sum(child.winfo_reqheight() + _pady(child.pack_options)
+                          for child in self.children_list if child.packed))
+
+    def winfo_reqwidth(self):
+        widths = [child.winfo_reqwidth() for child in self.children_list if child.packed]
+        return max(widths, default=1)
+
+
+class Label(Misc):
+    def winfo_reqheight(self):
+        image = self.options.get("image")
+        if image:
+            return image.height() + 2 * self.options.get("borderwidth", 2)
+        text = str(self.options.get("text", ""))
+        return (text.count("\n") + 1) * 19 + 4
+
+    def winfo_reqwidth(self):
+        text = str(self.options.get("text", ""))
+        return max(len(line) for line in text.split("\n")) * 7 + 4
+
+
+class Button(Label):
+    def winfo_reqheight(self):
+        return 30
+
+    def invoke(self):
+        command = self.options.get("command")
+        return command() if command else None
+
+
+class Entry(Misc):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.value = ""
+
+    def winfo_reqheight(self):
+        return 24
+
+    def get(self):
+        return self.value
+
+    def insert(self, index, text):
+        position = len(self.value) if index == END else int(index)
+        self.value = self.value[:position] + text + self.value[position:]
+
+    def delete(self, first, last=None):
+        start = len(self.value) if first == END else int(first)
+        stop = start + 1 if last is None else len(self.value) if last == END else int(last)
+        self.value = self.value[:start] + self.value[stop:]
+
+
+class Text(Misc):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.chunks = []
+        self.length = 0
+        self.tags = {}      # tag -> options
+        self.tag_bindings = {}
+        self.runs = []      # (start offset, end offset, tags) of each insert
+        self.tag_ranges = {}  # tag -> index pairs it was added to
+
+    def winfo_reqheight(self):
+        return int(self.options.get("height", 24)) * 19
+
+    def insert(self, index, text, *tags):
+        self.chunks.append(text)
+        self.runs.append((self.length, self.length + len(text), tags[0] if tags else ()))
+        self.length += len(text)
+
+    def get(self, start="1.0", end=END):
+        return "".join(self.chunks)
+
+    def delete(self, start, end=None):
+        self.chunks = []
+        self.length = 0
+        self.runs = []
+
+    def tag_configure(self, tag, **options):
+        self.tags.setdefault(tag, {}).update(options)
+
+    tag_config = tag_configure
+
+    def tag_bind(self, tag, sequence, func, add=None):
+        handlers = self.tag_bindings.setdefault((tag, sequence), [])
+        if not add:
+            handlers.clear()
+        handlers.append(func)
+
+    def tag_add(self, tag, *indices):
+        self.tags.setdefault(tag, {})
+        self.tag_ranges.setdefault(tag, []).append(indices)
+
+    def tag_remove(self, tag, *indices):
+        self.tag_ranges.pop(tag, None)  # Only whole-text removal is emulated
+
+    def tag_raise(self, tag, above=None):
+        pass
+
+    def see(self, index):
+        pass
+
+
+class Scrollbar(Misc):
+    def set(self, first, last):
+        self.options["position"] = (float(first), float(last))
+
+
+class Canvas(Misc):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.items = {}          # id -> [kind, coords, options]
+        self.tag_bindings = {}
+        self.top = 0.0           # y of the visible area's top edge
+        self._ids = itertools.count(1)
+
+    def winfo_width(self):
+        return self._root.winfo_width()
+
+    def winfo_height(self):
+        return self._root.winfo_height() - 50  # Less the URL bar
+
+    def _create(self, kind, coords, options):
+        if len(coords) == 1 and isinstance(coords[0], (tuple, list)):
+            coords = tuple(coords[0])
+        item = next(self._ids)
+        tags = options.get("tags", ())
+        options["tags"] = (tags,) if isinstance(tags, str) else tuple(tags)
+        self.items[item] = [kind, list(coords), options]
+        self._root.ops["canvas:create_" + kind] += 1
+        return item
+
+    def create_window(self, *coords, **options):
+        return self._create("window", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_line(self, *coords, **options):
+        return self._create("line", coords, options)
+
+    def create_image(self, *coords, **options):
+        return self._create("image", coords, options)
+
+    def _matching(self, tag_or_id):
+        if tag_or_id == "all":
+            return list(self.items)
+        if isinstance(tag_or_id, int):
+            return [tag_or_id] if tag_or_id in self.items else []
+        return [item for item, (_, _, options) in self.items.items() if tag_or_id in options["tags"]]
+
+    def delete(self, *tags_or_ids):
+        for tag_or_id in tags_or_ids:
+            for item in self._matching(tag_or_id):
+                del self.items[item]
+                self._root.ops["canvas:delete"] += 1
+
+    def coords(self, item, *coords):
+        if coords:
+            self.items[item][1] = list(coords)
+        return list(self.items[item][1])
+
+    def itemconfigure(self, item, **options):
+        for match in self._matching(item):
+            self.items[match][2].update(options)
+
+    itemconfig = itemconfigure
+
+    def itemcget(self, item, option):
+        return self.items[item][2].get(option)
+
+    def tag_bind(self, tag, sequence=None, func=None, add=None):
+        handlers = self.tag_bindings.setdefault((tag, sequence), [])
+        if not add:
+            handlers.clear()
+        handlers.append(func)
+
+    def tag_lower(self, tag_or_id, below=None):
+        pass  # Stacking order isn't emulated
+
+    def tag_raise(self, tag_or_id, above=None):
+        pass
+
+    def find_withtag(self, tag_or_id):
+        if tag_or_id == "current":
+            return ()
+        return tuple(self._matching(tag_or_id))
+
+    def find_all(self):
+        return tuple(self.items)
+
+    def bbox(self, *tags_or_ids):
+        boxes = []
+        for tag_or_id in tags_or_ids:
+            for item in self._matching(tag_or_id):
+                kind, coords, options = self.items[item]
+                x, y = coords[0], coords[1]
+                if kind == "window":
+                    window = options["window"]
+                    boxes.append((x, y, x + window.winfo_reqwidth(), y + window.winfo_reqheight()))
+                elif kind == "text":
+                    text_font = options.get("font")
+                    width = text_font.measure(options.get("text", "")) if isinstance(text_font, Font) else 0
+                    boxes.append((x, y, x + width, y + 19))
+                else:
+                    boxes.append((x, y, coords[2] if len(coords) > 2 else x, coords[3] if len(coords) > 3 else y))
+        if not boxes:
+            return None
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    # Scrolling
+
+    def _region_height(self):
+        region = self.options.get("scrollregion")
+        if isinstance(region, str):
+            region = [float(v) for v in region.split()]
+        return max(1.0, float(region[3]) - float(region[1])) if region else 1.0
+
+    def _scroll_to(self, top):
+        height = self._region_height()
+        self.top = max(0.0, min(top, height - self.winfo_height()))
+        command = self.options.get("yscrollcommand")
+        if command:
+            command(*self.yview())
+
+    def yview(self, *args):
+        if args and args[0] == "moveto":
+            self.yview_moveto(args[1])
+        elif args and args[0] == "scroll":
+            self.yview_scroll(int(args[1]), args[2])
+        elif not args:
+            height = self._region_height()
+            return (self.top / height, min(1.0, (self.top + self.winfo_height()) / height))
+
+    def yview_moveto(self, fraction):
+        self._scroll_to(float(fraction) * self._region_height())
+
+    def yview_scroll(self, number, what):
+        step = SCROLL_UNIT_PX if what == "units" else self.winfo_height()
+        self._scroll_to(self.top + int(number) * step)
+
+    def canvasy(self, screeny, gridspacing=None):
+        return self.top + screeny
+
+
+class PhotoImage:
+    """Keeps the data it was given; the size comes from the image header."""
+
+    def __init__(self, master=None, width=0, height=0, data=None, format=None, **options):
+        if data is not None and not width:
+            width, height = _image_size(data, format)
+        self._width = width
+        self._height = height
+        self.data = data
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def subsample(self, x, y=""):
+        y = y or x
+        return PhotoImage(width=-(-self._width // x), height=-(-self._height // y), data=self.data)
+
+
+def _image_size(data, format):
+    if format in ("png", "gif"):
+        data = base64.b64decode(data)
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return struct.unpack(">II", data[16:24])
+    if data[:3] == b"GIF":
+        return struct.unpack("<HH", data[6:10])
+    if data[:2] == b"P6":
+        width, height = data.split(None, 3)[1:3]
+        return int(width), int(height)
+    raise TclError("couldn't recognize image data")
+
+
+def walk(widget):
+    """Every live widget under `widget`, depth first (for inspecting a recording)."""
+    for child in widget.children_list:
+        yield child
+        yield from walk(child)
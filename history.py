@@ -0,0 +1,143 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Rough per-node cost of a slotted VNode plus its children list, and per attribute
+NODE_OVERHEAD = 120
+ATTR_OVERHEAD = 100
+
+
+class HistoryEntry:
+    def __init__(self, url, key=None):
+        self.url = url
+        self.key = key  # VDomCache key of the page as it was shown
+
+
+class History:
+    """Back/forward list of visited pages."""
+
+    def __init__(self):
+        self.entries = []
+        self.index = -1
+
+    @property
+    def current(self):
+        return self.entries[self.index] if self.index >= 0 else None
+
+    def push(self, url, key=None):
+        # Visiting a new page drops the forward entries
+        del self.entries[self.index + 1:]
+        self.entries.append(HistoryEntry(url, key))
+        self.index = len(self.entries) - 1
+
+    def replace(self, url, key=None):
+        if self.index < 0:
+            self.push(url, key)
+        else:
+            self.entries[self.index] = HistoryEntry(url, key)
+
+    def can_go_back(self):
+        return self.index > 0
+
+    def can_go_forward(self):
+        return self.index < len(self.entries) - 1
+
+    def back(self):
+        if self.can_go_back():
+            self.index -= 1
+            return self.current
+        return None
+
+    def forward(self):
+        if self.can_go_forward():
+            self.index += 1
+            return self.current
+        return None
+
+
+def content_hasher():
+    return hashlib.sha1()
+
+
+def content_key(url, body):
+    # Same URL and same bytes -> same tree
+    hasher = content_hasher()
+    hasher.update(body)
+    return url, hasher.hexdigest()
+
+
+def tree_size(vnode):
+    """Approximate memory held by a VNode tree, in bytes."""
+    hint = getattr(vnode, "size_hint", None)
+    if hint is not None:
+        return hint  # Decoded lazily (see wire); walking it would build the whole tree
+    size = 0
+    stack = [vnode]
+    while stack:
+        node = stack.pop()
+        size += NODE_OVERHEAD
+        for name, value in node.attrs.items():
+            size += ATTR_OVERHEAD + (len(value) if isinstance(value, str) else 64)
+        stack.extend(node.children)
+    return size
+
+
+class VDomCache:
+    """Bounded LRU of built VNode trees, evicted by approximate tree size.
+
+    Each entry remembers how long the page took to fetch and to parse, so a
+    hit can report the time it saved.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (vdom, size, fetch_seconds, parse_seconds)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+        self.last_saved = 0.0
+
+    def get(self, key, skipped_fetch=False):
+        """Return the cached tree for `key`, or None.
+
+        `skipped_fetch` says the caller also avoided the network (back/forward),
+        so the saved fetch time counts towards the hit too.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            vdom, _, fetch_seconds, parse_seconds = entry
+            self.hits += 1
+            self.last_saved = parse_seconds + (fetch_seconds if skipped_fetch else 0.0)
+            self.time_saved += self.last_saved
+            return vdom
+
+    def put(self, key, vdom, fetch_seconds=0.0, parse_seconds=0.0):
+        size = tree_size(vdom)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (vdom, size, fetch_seconds, parse_seconds)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted[1]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "time_saved_ms": self.time_saved * 1000,
+                "last_saved_ms": self.last_saved * 1000,
+            }
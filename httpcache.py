@@ -0,0 +1,428 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Statuses a cache may store without explicit freshness info (RFC 9110 15.1)
+CACHEABLE_STATUSES = {200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501}
+# Connection-level headers that must not be replayed from the cache; the body
+# is stored already decoded, so its encoding/length headers go too
+UNSTORED_HEADERS = {
+    "connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade",
+    "proxy-authenticate", "proxy-authorization", "content-encoding", "content-length",
+}
+# Headers a 304 must not overwrite on the stored response
+UNUPDATED_HEADERS = UNSTORED_HEADERS | {"content-type", "content-range"}
+HEURISTIC_FRACTION = 0.1        # Of the time since Last-Modified
+MAX_HEURISTIC_LIFETIME = 86400  # Never guess fresher than a day
+
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip().strip('"') if arg else True
+    return directives
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return parts.scheme.lower(), parts.netloc.lower()
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, url, status, headers, body, vary, stored_at):
+        self.url = url            # Final URL after redirects
+        self.status = status
+        self.headers = headers    # Plain dict of response headers
+        self.body = body
+        self.vary = vary          # Request header values the response varies on
+        self.stored_at = stored_at
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items()) + 256
+
+    def header(self, name):
+        name = name.lower()
+        for key, value in self.headers.items():
+            if key.lower() == name:
+                return value
+        return None
+
+    @property
+    def cache_control(self):
+        return parse_cache_control(self.header("Cache-Control"))
+
+    def freshness_lifetime(self):
+        cc = self.cache_control
+        if "max-age" in cc:
+            return _seconds(cc["max-age"]) or 0
+        date = _http_date(self.header("Date")) or self.stored_at
+        expires = self.header("Expires")
+        if expires is not None:
+            expires_at = _http_date(expires)
+            return max(0, expires_at - date) if expires_at else 0
+        last_modified = _http_date(self.header("Last-Modified"))
+        if last_modified and self.status in CACHEABLE_STATUSES:
+            return min(MAX_HEURISTIC_LIFETIME, max(0, (date - last_modified) * HEURISTIC_FRACTION))
+        return 0
+
+    def age(self, now):
+        return (_seconds(self.header("Age")) or 0) + max(0, now - self.stored_at)
+
+    def is_fresh(self, now):
+        cc = self.cache_control
+        if "no-cache" in cc:
+            return False
+        return self.age(now) < self.freshness_lifetime()
+
+    def has_validators(self):
+        return self.header("ETag") is not None or self.header("Last-Modified") is not None
+
+    def matches(self, request_headers):
+        return all(request_headers.get(name) == value for name, value in self.vary.items())
+
+    def freshen(self, response_headers, now):
+        # Apply the headers of a 304 to the stored response
+        lowered = {k.lower(): k for k in self.headers}
+        for name, value in response_headers.items():
+            if name.lower() in UNUPDATED_HEADERS:
+                continue
+            self.headers.pop(lowered.get(name.lower(), name), None)
+            self.headers[name] = value
+        self.stored_at = now
+
+    def to_response(self):
+        response = requests.Response()
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.body
+        response._content_consumed = True
+        response.url = self.url
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = "OK" if self.status == 200 else ""
+        response.from_cache = True
+        return response
+
+    def dump(self):
+        meta = json.dumps({
+            "url": self.url, "status": self.status, "headers": self.headers,
+            "vary": self.vary, "stored_at": self.stored_at,
+        }).encode("utf-8")
+        return struct.pack(">I", len(meta)) + meta + self.body
+
+    @classmethod
+    def load(cls, data):
+        (meta_len,) = struct.unpack(">I", data[:4])
+        meta = json.loads(data[4:4 + meta_len].decode("utf-8"))
+        return cls(meta["url"], meta["status"], meta["headers"], data[4 + meta_len:],
+                   meta["vary"], meta["stored_at"])
+
+
+class MemoryTier:
+    """LRU of CacheEntry objects bounded by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        # key -> (entry, size); the size as inserted, since a 304 changes the entry's headers
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+    def get(self, key):
+        item = self.entries.get(key)
+        if item is None:
+            return None
+        self.entries.move_to_end(key)
+        return item[0]
+
+    def put(self, key, entry):
+        self.remove(key)
+        size = entry.size
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (entry, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def remove(self, key):
+        item = self.entries.pop(key, None)
+        if item is not None:
+            self.bytes -= item[1]
+
+
+class DiskTier:
+    """One file per entry under `directory`, evicted least-recently-used by size."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index = OrderedDict()  # file name -> size, oldest use first
+        self.bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for item in os.scandir(directory):
+            if item.is_file() and item.name.endswith(".entry"):
+                stat = item.stat()
+                files.append((stat.st_mtime, item.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self.index[name] = size
+            self.bytes += size
+
+    def _name(self, key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".entry"
+
+    def get(self, key):
+        name = self._name(key)
+        if name not in self.index:
+            return None
+        try:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                entry = CacheEntry.load(f.read())
+        except (OSError, ValueError, KeyError, struct.error):
+            self._drop(name)
+            return None
+        self.index.move_to_end(name)
+        return entry
+
+    def put(self, key, entry):
+        name = self._name(key)
+        data = entry.dump()
+        if len(data) > self.max_bytes:
+            self.remove(key)
+            return
+        path = os.path.join(self.directory, name)
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self.bytes -= self.index.pop(name, 0)
+        self.index[name] = len(data)
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes and self.index:
+            self._drop(next(iter(self.index)))
+
+    def remove(self, key):
+        name = self._name(key)
+        if name in self.index:
+            self._drop(name)
+
+    def _drop(self, name):
+        self.bytes -= self.index.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "prowser", "http")
+
+
+class HTTPCache:
+    """Private HTTP cache (RFC 9111) for GET requests.
+
+    Fresh entries are served without touching the network; stale entries with
+    an ETag or Last-Modified are revalidated with a conditional request and a
+    304 reuses the stored body. A single variant is kept per URL; a request
+    whose Vary'd headers differ is treated as a miss. Redirected responses are
+    stored under the URL they came from, and a successful unsafe request
+    (POST, PUT, ...) drops the entries for its URL and same-origin targets.
+    """
+
+    def __init__(self, memory_bytes=32 * 1024 * 1024, disk_dir=None, disk_bytes=256 * 1024 * 1024):
+        self.memory = MemoryTier(memory_bytes)
+        self.disk = None
+        if disk_dir is not None:
+            try:
+                self.disk = DiskTier(disk_dir, disk_bytes)
+            except OSError:
+                self.disk = None  # Unwritable cache dir: memory only
+        self.lock = threading.RLock()
+        self.counters = {
+            "hits": 0,            # Served with no network at all
+            "revalidated": 0,     # Conditional request answered with 304
+            "misses": 0,          # Full download
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stores": 0,
+            "bytes_from_cache": 0,
+            "bytes_downloaded": 0,
+        }
+
+    @classmethod
+    def default(cls):
+        return cls(disk_dir=default_cache_dir())
+
+    def lookup(self, key, request_headers):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                tier = "memory_hits"
+            elif self.disk is not None:
+                entry = self.disk.get(key)
+                if entry is not None:
+                    tier = "disk_hits"
+                    self.memory.put(key, entry)
+            if entry is None or not entry.matches(request_headers):
+                return None
+            self.counters[tier] += 1
+            return entry
+
+    def store(self, key, request_headers, response, now):
+        request_cc = parse_cache_control(request_headers.get("Cache-Control"))
+        response_cc = parse_cache_control(response.headers.get("Cache-Control"))
+        vary = response.headers.get("Vary", "")
+        if "no-store" in request_cc or "no-store" in response_cc or vary.strip() == "*":
+            self.remove(key)
+            return None
+        entry = CacheEntry(
+            response.url,
+            response.status_code,
+            {k: v for k, v in response.headers.items() if k.lower() not in UNSTORED_HEADERS},
+            response.content,
+            {name.strip().lower(): request_headers.get(name.strip())
+             for name in vary.split(",") if name.strip()},
+            now,
+        )
+        explicit = "max-age" in response_cc or "expires" in {k.lower() for k in entry.headers}
+        if (entry.status not in CACHEABLE_STATUSES and not explicit) or (
+                not explicit and not entry.has_validators() and not entry.freshness_lifetime()):
+            # Not stored (or nothing to reuse or revalidate); what was stored before is outdated
+            self.remove(key)
+            return None
+        self.put(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.memory.put(key, entry)
+            if self.disk is not None:
+                self.disk.put(key, entry)
+            self.counters["stores"] += 1
+
+    def remove(self, key):
+        with self.lock:
+            self.memory.remove(key)
+            if self.disk is not None:
+                self.disk.remove(key)
+
+    def invalidate(self, url, response):
+        """Drop entries made stale by an unsafe request to `url` (RFC 9111 4.4)."""
+        if response.status_code >= 400:
+            return
+        origin = _origin(url)
+        urls = {url}
+        for hop in (*response.history, response):
+            for name in ("Location", "Content-Location"):
+                target = hop.headers.get(name)
+                if target:
+                    target = urljoin(hop.url or url, target)
+                    if _origin(target) == origin:
+                        urls.add(target)
+        for target in urls:
+            self.remove("GET " + target)
+
+    def get(self, send, url, params=None, headers=None, **kwargs):
+        """GET `url` through the cache; `send(method, url, **kwargs)` does the network I/O."""
+        if params:
+            url = requests.Request("GET", url, params=params).prepare().url
+        request_headers = CaseInsensitiveDict(headers or {})
+        key = "GET " + url
+        now = time.time()
+        request_cc = parse_cache_control(request_headers.get("Cache-Control"))
+        entry = None if "no-store" in request_cc else self.lookup(key, request_headers)
+
+        if entry is not None and "no-cache" not in request_cc and entry.is_fresh(now):
+            self._count("hits", entry)
+            return entry.to_response()
+
+        conditional = CaseInsensitiveDict(request_headers)
+        if entry is not None:
+            if entry.header("ETag"):
+                conditional["If-None-Match"] = entry.header("ETag")
+            if entry.header("Last-Modified"):
+                conditional["If-Modified-Since"] = entry.header("Last-Modified")
+
+        response = send("GET", url, headers=conditional, **kwargs)
+        now = time.time()
+        if response.status_code == 304 and entry is not None and not response.history:
+            entry.freshen(response.headers, now)
+            self.put(key, entry)
+            self._count("revalidated", entry)
+            return entry.to_response()
+
+        if response.history:
+            # Redirected: the final response belongs to its own URL, not to the
+            # redirect we asked for, so never let it answer `url` later
+            self.remove(key)
+            key = "GET " + response.url
+        if kwargs.get("stream"):
+            return self._store_when_read(key, request_headers, response, now)
+        self._count_download(response)
+        self.store(key, request_headers, response, now)
+        return response
+
+    def _store_when_read(self, key, request_headers, response, now):
+        # Streamed body: store it once the caller has iterated all of it
+        iter_content = response.iter_content
+
+        def tee(chunk_size=1, decode_unicode=False):
+            chunks = []
+            for chunk in iter_content(chunk_size, decode_unicode):
+                chunks.append(chunk)
+                yield chunk
+            if not decode_unicode:
+                response._content = b"".join(chunks)
+                self._count_download(response)
+                self.store(key, request_headers, response, now)
+
+        response.iter_content = tee
+        return response
+
+    def _count_download(self, response):
+        with self.lock:
+            self.counters["misses"] += 1
+            self.counters["bytes_downloaded"] += len(response.content)
+
+    def _count(self, counter, entry):
+        with self.lock:
+            self.counters[counter] += 1
+            self.counters["bytes_from_cache"] += len(entry.body)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["memory_bytes"] = self.memory.bytes
+            stats["disk_bytes"] = self.disk.bytes if self.disk is not None else 0
+            return stats
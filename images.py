@@ -0,0 +1,267 @@
+"""Concurrent loading, decoding and caching of <img> subresources.
+
+ImageLoader.request(url, max_width, max_height, callback) is called while
+a page renders; the widget shows a placeholder and callback(photo) swaps
+the image in once it is ready. All images of a page are fetched at once
+on a pool of worker threads, at most PER_HOST per host.
+
+With Pillow installed, images are decoded and downscaled to fit on the
+workers (large ones in a process pool, so big decodes don't hold the GIL)
+and handed to Tk as raw PPM. Without it, Tk decodes PNG and GIF itself on
+the main thread and downscales by an integer factor; JPEG needs Pillow.
+
+Decoded images (and their PhotoImages) are kept in an LRU keyed by
+(url, max_width, max_height), bounded by pixel memory.
+"""
+import base64
+import io
+import math
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+import urllib.parse
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from parse_pool import START_METHOD
+from transport import get_transport
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+PER_HOST = 4
+MAX_WORKERS = 8
+DECODE_PROCESSES = 2
+# Images bigger than this (encoded bytes or pixels) are decoded in the process pool
+PROCESS_DECODE_BYTES = 256 * 1024
+PROCESS_DECODE_PIXELS = 1024 * 1024
+CACHE_PIXEL_BYTES = 64 * 1024 * 1024
+POLL_INTERVAL_MS = 15
+# Images are downscaled to fit this box unless the page asks for a smaller size
+MAX_IMAGE_WIDTH = 760
+MAX_IMAGE_HEIGHT = 2000
+
+# format: Tk image format name; data: what PhotoImage(data=...) takes;
+# subsample: integer factor still to apply on the main thread
+DecodedImage = namedtuple("DecodedImage", "format data width height subsample")
+
+
+class UnsupportedImage(Exception):
+    pass
+
+
+def sniff(data):
+    """(format, width, height) from an image's header, or (None, 0, 0)."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        width, height = struct.unpack("<HH", data[6:10])
+        return "gif", width, height
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 <= len(data):
+            if data[i] != 0xFF:
+                break
+            marker = data[i + 1]
+            length = struct.unpack(">H", data[i + 2:i + 4])[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return "jpeg", width, height
+            i += 2 + length
+    return None, 0, 0
+
+
+def image_box(attrs, max_width, max_height):
+    """(box width, box height, sized) for an <img>: its width/height attributes
+    where given (capped at the maximum), and whether the page gave both."""
+    def pixels(name, limit):
+        value = (attrs.get(name) or "").strip().lower()
+        if value.endswith("px"):
+            value = value[:-2]
+        return min(limit, int(value)) if value.isdigit() and int(value) > 0 else None
+
+    width, height = pixels("width", max_width), pixels("height", max_height)
+    return width or max_width, height or max_height, width is not None and height is not None
+
+
+def decode_with_pillow(data, max_width, max_height):
+    # Runs on a worker thread or in a worker process
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (max_width, max_height))  # JPEG can decode at reduced size directly
+    image.thumbnail((max_width, max_height))
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, "white")
+        background.alpha_composite(image)
+        image = background
+    image = image.convert("RGB")
+    out = io.BytesIO()
+    image.save(out, "PPM")
+    return DecodedImage("ppm", out.getvalue(), image.width, image.height, 1)
+
+
+def prepare_for_tk(data, kind, width, height, max_width, max_height):
+    # No Pillow: Tk decodes PNG/GIF; work out how much to subsample it by
+    if kind not in ("png", "gif"):
+        raise UnsupportedImage(kind or "unknown format")
+    factor = max(1, math.ceil(max(width / max_width, height / max_height)))
+    return DecodedImage(kind, base64.b64encode(data), -(-width // factor), -(-height // factor), factor)
+
+
+class ImageCache:
+    """LRU of decoded images and their PhotoImages, bounded by pixel memory."""
+
+    def __init__(self, max_bytes=CACHE_PIXEL_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (DecodedImage, PhotoImage)
+        self.size = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, decoded, photo):
+        if key in self.entries:
+            self.size -= self._cost(self.entries.pop(key)[0])
+        self.entries[key] = (decoded, photo)
+        self.size += self._cost(decoded)
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, (old, _) = self.entries.popitem(last=False)
+            self.size -= self._cost(old)
+
+    @staticmethod
+    def _cost(decoded):
+        return decoded.width * decoded.height * 4  # What Tk holds per pixel
+
+
+class ImageLoader:
+    """Fetches and decodes a page's images concurrently; see the module docstring."""
+
+    def __init__(self, widget, toolkit, per_host=PER_HOST, max_workers=MAX_WORKERS):
+        self.widget = widget
+        self.toolkit = toolkit
+        self.per_host = per_host
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prowser-img")
+        self.decoder = None  # Process pool, started on the first large image
+        self.decoder_lock = threading.Lock()
+        self.cache = ImageCache()
+        self.results = queue.Queue()  # (key, host, DecodedImage or exception)
+        self.waiting = {}             # key -> callbacks for the current page
+        self.queue = deque()          # keys waiting for their host to have a free slot
+        self.active = Counter()       # host -> fetches in flight
+        self.loading = set()          # keys being fetched, also for pages since left
+        self.poll_job = None
+        self.started = None
+        self.stats = Counter()
+        self.page_complete_ms = None
+
+    @property
+    def idle(self):
+        return not self.waiting
+
+    def cached_size(self, url, max_width, max_height):
+        # Size the image will be shown at, if it is already decoded
+        cached = self.cache.get((url, max_width, max_height))
+        return (cached[0].width, cached[0].height) if cached is not None else None
+
+    def request(self, url, max_width, max_height, callback):
+        # Main thread. Calls callback(photo) now if cached, otherwise once loaded.
+        key = (url, max_width, max_height)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            callback(cached[1])
+            return
+        if key in self.waiting:
+            self.waiting[key].append(callback)
+            return
+        if not self.waiting:
+            self.started = time.perf_counter()
+            self.page_complete_ms = None
+        self.waiting[key] = [callback]
+        if key not in self.loading:  # Otherwise a previous page's fetch will deliver it
+            self.queue.append(key)
+            self._start_ready()
+        if self.poll_job is None:
+            self.poll_job = self.widget.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self):
+        # A new page: forget the old page's callbacks. Fetches already running finish
+        # into the cache, or for the new page if it asks for the same image.
+        self.waiting.clear()
+        self.queue.clear()
+
+    def _start_ready(self):
+        for key in list(self.queue):
+            host = urllib.parse.urlsplit(key[0]).netloc
+            if self.active[host] >= self.per_host:
+                continue
+            self.queue.remove(key)
+            self.active[host] += 1
+            self.loading.add(key)
+            self.stats["fetched"] += 1
+            self.executor.submit(self._load, key, host)
+
+    def _load(self, key, host):
+        # Worker thread: network, sniffing and (with Pillow) decoding
+        url, max_width, max_height = key
+        try:
+            response = get_transport().get(url)
+            response.raise_for_status()
+            data = response.content
+            kind, width, height = sniff(data)
+            if Image is None:
+                result = prepare_for_tk(data, kind, width, height, max_width, max_height)
+            elif len(data) > PROCESS_DECODE_BYTES or width * height > PROCESS_DECODE_PIXELS:
+                result = self._decoder().submit(decode_with_pillow, data, max_width, max_height).result()
+            else:
+                result = decode_with_pillow(data, max_width, max_height)
+        except Exception as e:
+            result = e
+        self.results.put((key, host, result))
+
+    def _decoder(self):
+        # Started from a worker thread while others run, so never by forking (see parse_pool)
+        with self.decoder_lock:
+            if self.decoder is None:
+                self.decoder = ProcessPoolExecutor(max_workers=DECODE_PROCESSES,
+                                                   mp_context=multiprocessing.get_context(START_METHOD))
+            return self.decoder
+
+    def _poll(self):
+        # Main thread: turn finished images into PhotoImages and swap them in
+        self.poll_job = None
+        while True:
+            try:
+                key, host, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.active[host] -= 1
+            self.loading.discard(key)
+            photo = None
+            if isinstance(result, Exception):
+                self.stats["failed"] += 1
+            else:
+                try:
+                    photo = self.toolkit.PhotoImage(data=result.data, format=result.format)
+                    if result.subsample > 1:
+                        photo = photo.subsample(result.subsample)
+                    self.cache.put(key, result, photo)
+                except Exception:
+                    self.stats["failed"] += 1
+            callbacks = self.waiting.pop(key, [])
+            if photo is not None:
+                for callback in callbacks:
+                    callback(photo)
+            if not self.waiting and callbacks:
+                self.page_complete_ms = (time.perf_counter() - self.started) * 1000
+        self._start_ready()
+        if self.waiting or any(self.active.values()):
+            self.poll_job = self.widget.after(POLL_INTERVAL_MS, self._poll)
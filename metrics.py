@@ -0,0 +1,52 @@
+import time
+from collections import deque
+
+
+class InputLatencyMonitor:
+    """Measures how late the Tk event loop services a periodic timer.
+
+    A timer is scheduled every `interval_ms`; the difference between when it
+    was due and when it actually ran is the delay any user input arriving at
+    that moment would have seen. If the main loop is blocked (e.g. by a
+    synchronous fetch or parse) the lag grows with the length of the block.
+    """
+
+    def __init__(self, widget, interval_ms=50, history=1200):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.samples = deque(maxlen=history)
+        self._due = None
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._schedule()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def reset(self):
+        self.samples.clear()
+
+    def _schedule(self):
+        self._due = time.perf_counter() + self.interval_ms / 1000.0
+        self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        lag_ms = max(0.0, (time.perf_counter() - self._due) * 1000.0)
+        self.samples.append(lag_ms)
+        self._schedule()
+
+    def summary(self):
+        if not self.samples:
+            return {"samples": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return {
+            "samples": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered),
+            "p95_ms": p95,
+            "max_ms": ordered[-1],
+        }
@@ -1,8 +1,8 @@
-import requests
+from transport import get_transport
 
 def fetch_url(url):
     try:
-        response = requests.get(url, timeout=10)
+        response = get_transport().get(url)
         response.raise_for_status()
         return {
             "url": response.url,
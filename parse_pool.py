@@ -0,0 +1,79 @@
+"""Parsing in worker processes.
+
+Parsing and simplifying a page is pure-Python work: on a worker thread it
+still holds the GIL, so the Tk loop stalls while a big page parses and
+several pages loading at once parse one after another. ParsePool runs the
+parse in a pool of processes instead; the worker sends the simplified tree
+back in the wire format (see wire) and the caller decodes it lazily.
+
+One pool is shared by all browsers in the process (see get_parse_pool).
+
+Workers are started by a fork server (or spawned where there is none),
+never forked from the browser itself: a fork copies the locks the
+browser's threads happen to hold, and a worker can deadlock on one. The
+price is that a worker's hash seed differs from ours, so the digests it
+sends fail wire's hash check and are dropped; the UI side recomputes them,
+which builds the whole tree, the first time the page is diffed. Starting
+the browser with PYTHONHASHSEED set gives the workers the same seed and
+keeps the digests. bench_parse_pool measures both.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import parser
+import wire
+from simplify import simplify
+
+MAX_PROCESSES = 4
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def parse_to_wire(html, backend, is_container):
+    # Runs in a worker process; is_container must be a module-level function
+    return wire.encode(simplify(parser.parse_html(html, backend), is_container))
+
+
+class ParsePool:
+    def __init__(self, processes=None, start_method=START_METHOD):
+        self.processes = processes or min(MAX_PROCESSES, os.cpu_count() or 1)
+        self.executor = ProcessPoolExecutor(max_workers=self.processes,
+                                            mp_context=multiprocessing.get_context(start_method))
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def parse(self, html, backend, is_container):
+        """Simplified VNode tree of `html`, like simplify(parser.parse_html(...)).
+
+        Blocks the calling thread (without holding the GIL) until a worker
+        has parsed the page.
+        """
+        start = time.perf_counter()
+        data = self.executor.submit(parse_to_wire, html, backend, is_container).result()
+        with self.lock:
+            self.stats["pages"] += 1
+            self.stats["wire_bytes"] += len(data)
+            self.stats["wait_ms"] += (time.perf_counter() - start) * 1000
+        return wire.decode(data)
+
+    def close(self):
+        if sys.version_info >= (3, 9):
+            self.executor.shutdown(cancel_futures=True)
+        else:
+            self.executor.shutdown()  # Also waits for the parses still queued
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_parse_pool():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ParsePool()
+        return _shared
@@ -1,15 +1,396 @@
+import importlib.util
+import sys
+from html.parser import HTMLParser
 from bs4 import BeautifulSoup
-from vdom import VNode
+from simplify import is_inline, is_single_widget, simplify_node, INLINE_TAG
+from vdom import VNode, TextNode, EMPTY_CHILDREN, subtree_hash
+
+# Elements that never make it into the VDOM (their content goes with them)
+DROPPED_TAGS = {"script", "style"}
+
+# Elements without an end tag; closed as soon as they open (same list as bs4)
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+    "menuitem", "meta", "param", "source", "track", "wbr",
+    "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer",
+}
+
+# Attributes whose value is a whitespace-separated list (bs4 stores these as lists)
+LIST_ATTRIBUTES = {
+    "*": {"class", "accesskey", "dropzone"},
+    "a": {"rel", "rev"},
+    "link": {"rel", "rev"},
+    "td": {"headers"},
+    "th": {"headers"},
+    "form": {"accept-charset"},
+    "object": {"archive"},
+    "area": {"rel"},
+    "icon": {"sizes"},
+    "iframe": {"sandbox"},
+    "output": {"for"},
+}
+
+ROOT_TAG = "[document]"
+
+
+def build_vdom(soup_node):
+    """Walk a BeautifulSoup tree into VNodes.
+
+    Text is stripped and empty strings dropped; script/style are skipped.
+    """
+    if isinstance(soup_node, str):
+        content = soup_node.strip()
+        return TextNode(content) if content else None
+
+    if not hasattr(soup_node, "name") or soup_node.name in DROPPED_TAGS:
+        return None
+
+    attrs = dict(soup_node.attrs)
+    children = []
+
+    # Process children recursively
+    for child in soup_node.children:
+        child_vdom = build_vdom(child)
+        if child_vdom:
+            children.append(child_vdom)
+
+    node = VNode(soup_node.name, attrs, children or None)
+    subtree_hash(node)
+    return node
+
 
 def parse_vdom(soup_node):
-    if hasattr(soup_node, 'string') and soup_node.string is not None and not getattr(soup_node, 'name', None):
-        return VNode("text", {"content": soup_node.string.strip()}, [])
-    if hasattr(soup_node, 'name') and soup_node.name is not None:
-        attrs = dict(soup_node.attrs)
-        children = []
-        for child in soup_node.children:
-            child_vdom = parse_vdom(child)
-            if child_vdom:
-                children.append(child_vdom)
-        return VNode(soup_node.name, attrs, children)
-    return None
\ No newline at end of file
+    # Kept for compatibility; same semantics as build_vdom
+    return build_vdom(soup_node)
+
+
+class VDomBuilder(HTMLParser):
+    """Builds VNodes straight from the html.parser tokenizer, in one pass.
+
+    Mirrors how BeautifulSoup's "html.parser" builder shapes the tree, so the
+    result equals build_vdom(BeautifulSoup(html, "html.parser")):
+    end tags close up to the nearest open element of that name (or are
+    ignored), void elements close immediately, comments/doctypes become text.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = VNode(ROOT_TAG, {}, [])
+        self.stack = [self.root]
+        self.open_counts = {}
+        self.closed_voids = {}  # Void elements whose redundant end tag may still follow
+        self.text = []
+
+    def flush_text(self):
+        if self.text:
+            content = "".join(self.text).strip()
+            self.text = []
+            if content:
+                self.stack[-1].children.append(TextNode(content))
+
+    def handle_starttag(self, tag, attrs, self_closing=False):
+        self.flush_text()
+        attr_dict = {}
+        for name, value in attrs:
+            attr_dict[sys.intern(name)] = "" if value is None else value
+        if attr_dict:
+            list_attrs = LIST_ATTRIBUTES["*"] | LIST_ATTRIBUTES.get(tag, set())
+            for name in list_attrs.intersection(attr_dict):
+                attr_dict[name] = attr_dict[name].split()
+        node = VNode(tag, attr_dict, [])
+        self.stack.append(node)
+        self.open_counts[tag] = self.open_counts.get(tag, 0) + 1
+        if self_closing:
+            self.pop()
+        elif tag in VOID_ELEMENTS:
+            self.pop()
+            self.closed_voids[tag] = self.closed_voids.get(tag, 0) + 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if self.closed_voids.get(tag):
+            # "<br>...</br>": the end tag was already applied; bs4 doesn't even break the text run
+            self.closed_voids[tag] -= 1
+            return
+        self.flush_text()
+        if not self.open_counts.get(tag):
+            return  # Stray end tag
+        while self.pop().tag != tag:
+            pass
+
+    def pop(self):
+        node = self.stack.pop()
+        self.open_counts[node.tag] -= 1
+        if not node.children:
+            node.children = EMPTY_CHILDREN  # Don't keep an empty list per leaf
+        subtree_hash(node)
+        if node.tag not in DROPPED_TAGS:
+            self.attach(node)
+        return node
+
+    def attach(self, node):
+        # Add a finished element to its parent
+        self.stack[-1].children.append(node)
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_comment(self, data):
+        # bs4 keeps comments as strings, which build_vdom turns into text
+        self.flush_text()
+        self.text.append(data)
+        self.flush_text()
+
+    def handle_decl(self, decl):
+        self.handle_comment(decl[len("DOCTYPE "):])
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            data = data[len("CDATA["):]
+        self.handle_comment(data)
+
+    def handle_pi(self, data):
+        self.handle_comment(data)
+
+    def finish(self):
+        self.close()
+        self.flush_text()
+        while len(self.stack) > 1:
+            self.pop()
+        return self.root
+
+
+# Pieces drawn inside containers that simplify may still drop, kept back before
+# guessing that it does (see StreamingVDomBuilder)
+MAX_HELD_PIECES = 256
+
+
+class _Container:
+    """A container StreamingVDomBuilder opened early, and how simplify() will draw it."""
+
+    __slots__ = ("parent", "node", "drawn", "items", "run", "held", "speculated")
+
+    def __init__(self, parent, node):
+        self.parent = parent      # _Container of the enclosing container (None for the root)
+        self.node = node
+        self.drawn = None         # Its drawn copy; None while simplify may still drop it
+        self.items = 0            # Children it has after simplify, so far
+        self.run = []             # Inline children whose run hasn't ended yet
+        self.held = []            # Its simplified child, while it may still be dropped
+        self.speculated = False   # Guessed to be dropped: its children go to its parent
+
+
+class StreamingVDomBuilder(VDomBuilder):
+    """VDomBuilder fed in chunks that reports finished pieces as it goes.
+
+    The tree it builds is identical to the non-streaming parse. Alongside,
+    it builds the page as simplify() draws it (`drawn_root`) and reports
+    it as it grows: containers near the top of the document (tags accepted
+    by `is_open`, up to `max_depth` below the root) as soon as they are
+    known to be kept, so they can be shown empty, and complete pieces
+    simplified, with runs of inline content grouped. feed_events() returns,
+    per chunk, a list of
+
+        ("open", parent, node)  - container opened (parent is None for the root)
+        ("node", parent, node)  - complete piece appended to parent
+
+    where parents and opened containers are nodes of the drawn tree.
+    `is_container` is the one given to simplify().
+
+    A wrapper that simplify drops (one child, no id) is not drawn, and
+    what is drawn inside its first child is held back until the wrapper
+    gets a second child or ends. Past MAX_HELD_PIECES the wrapper is
+    guessed to be dropped and the held pieces are reported; if it gets a
+    second child after all, it is drawn late and the drawn tree differs
+    from simplify(tree) there, for the caller to reconcile.
+    """
+
+    def __init__(self, is_open, is_container, max_depth=4):
+        super().__init__()
+        self.is_open = is_open
+        self.is_container = is_container
+        self.max_depth = max_depth
+        root = _Container(None, self.root)
+        root.drawn = self.drawn_root = VNode(ROOT_TAG, {}, [])
+        self.containers = {id(self.root): root}
+        self.copies = {id(self.drawn_root)}  # Drawn containers
+        self.shown = {id(self.drawn_root)}   # Drawn containers reported so far
+        self.unshown = 0                     # Pieces drawn but not reported
+        self.events = [("open", None, self.drawn_root)]
+
+    def feed_events(self, data):
+        self.feed(data)
+        return self.take_events()
+
+    def take_events(self):
+        events, self.events = self.events, []
+        return events
+
+    def flush_text(self):
+        parent = self.stack[-1]
+        count = len(parent.children)
+        super().flush_text()
+        if len(parent.children) > count:
+            self.add_child(parent, parent.children[-1])
+
+    def handle_starttag(self, tag, attrs, self_closing=False):
+        parent = self.containers.get(id(self.stack[-1]))
+        if (parent is not None and len(self.stack) <= self.max_depth and not self_closing
+                and tag not in VOID_ELEMENTS and tag not in DROPPED_TAGS and self.is_open(tag)):
+            super().handle_starttag(tag, attrs)
+            node = self.stack[-1]
+            self.end_run(parent)
+            container = self.containers[id(node)] = _Container(parent, node)
+            self.count(parent)
+            if node.key is not None or not self.is_container(tag):
+                self.draw(container)  # Never dropped
+        else:
+            super().handle_starttag(tag, attrs, self_closing)
+
+    def attach(self, node):
+        parent = self.stack[-1]
+        container = self.containers.pop(id(node), None)
+        if container is not None:
+            self.end_container(container)
+        else:
+            self.add_child(parent, node)
+        parent.children.append(node)
+
+    def finish(self):
+        root = super().finish()
+        self.end_run(self.containers[id(root)])
+        return root
+
+    def add_child(self, parent, node):
+        # A complete child (element or text) of `parent`
+        container = self.containers.get(id(parent))
+        if container is None:
+            return  # Part of a piece that is reported whole
+        if is_inline(node):
+            container.run.append(node)
+        else:
+            self.end_run(container)
+            self.count(container)
+            self.put(container, simplify_node(node, self.is_container))
+
+    def end_run(self, container):
+        # Group the pending inline children into one piece, as simplify_children does
+        if container.run:
+            run, container.run = container.run, []
+            self.count(container)
+            self.put(container, run[0] if len(run) == 1 and is_single_widget(run[0]) else VNode(INLINE_TAG, None, run))
+
+    def end_container(self, container):
+        self.end_run(container)
+        if container.drawn is None and not container.speculated:
+            # Dropped: simplify replaces it by its one child (or keeps it when it has none)
+            self.put(container.parent, container.held[0] if container.items else container.node)
+
+    def count(self, container):
+        container.items += 1
+        if container.items == 2 and container.drawn is None:
+            self.draw(container)
+
+    def draw(self, container):
+        drawn = container.drawn = VNode(container.node.tag, container.node.attrs, [])
+        self.copies.add(id(drawn))
+        held, container.held = container.held, []
+        for piece in held:
+            self.emit(drawn, piece)
+        self.put(container.parent, drawn)
+
+    def put(self, container, piece):
+        # Place a simplified child of `container` (already counted)
+        if container.drawn is not None:
+            self.emit(container.drawn, piece)
+        elif container.speculated:
+            self.emit(self.target(container), piece)
+        else:
+            container.held.append(piece)
+
+    def target(self, container):
+        # Where the children of a container guessed to be dropped go
+        while container.drawn is None:
+            container.speculated = True
+            container = container.parent
+        return container.drawn
+
+    def emit(self, parent, node):
+        parent.children.append(node)
+        if id(parent) in self.shown:
+            self.show(parent, node)
+        else:
+            self.unshown += 1
+            if self.unshown > MAX_HELD_PIECES:
+                self.speculate()
+
+    def show(self, parent, node):
+        # Report `node`, with everything already drawn inside it
+        if id(node) in self.copies:
+            self.shown.add(id(node))
+            self.events.append(("open", parent, node))
+            for child in node.children:
+                self.show(node, child)
+            self.unshown = 0
+        else:
+            self.events.append(("node", parent, node))
+
+    def speculate(self):
+        # Too much held back: guess that the open wrappers holding it are dropped
+        for node in self.stack:
+            container = self.containers.get(id(node))
+            if container is not None and container.held and container.drawn is None:
+                held, container.held = container.held, []
+                for piece in held:
+                    self.emit(self.target(container), piece)
+
+
+# name -> callable(html) returning the root VNode
+BACKENDS = {}
+
+
+def register_backend(name):
+    def register(func):
+        BACKENDS[name] = func
+        return func
+    return register
+
+
+@register_backend("fast")
+def _parse_fast(html):
+    builder = VDomBuilder()
+    builder.feed(html)
+    return builder.finish()
+
+
+@register_backend("html.parser")
+def _parse_html_parser(html):
+    return build_vdom(BeautifulSoup(html, "html.parser"))
+
+
+# Optional bs4 tree builders; registered only when installed
+if importlib.util.find_spec("lxml") is not None:
+    @register_backend("lxml")
+    def _parse_lxml(html):
+        return build_vdom(BeautifulSoup(html, "lxml"))
+
+if importlib.util.find_spec("html5lib") is not None:
+    @register_backend("html5lib")
+    def _parse_html5lib(html):
+        return build_vdom(BeautifulSoup(html, "html5lib"))
+
+DEFAULT_BACKEND = "fast"
+
+
+def available_backends():
+    return sorted(BACKENDS)
+
+
+def parse_html(html, backend=DEFAULT_BACKEND):
+    try:
+        parse = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown parser backend {backend!r}; available: {', '.join(available_backends())}")
+    return parse(html)
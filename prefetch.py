@@ -0,0 +1,159 @@
+"""Speculative fetching of the links the user is likely to follow next.
+
+hint() is called for links the pointer hovers over (urgent) and for links
+that are visible in the viewport. Allowed links are fetched and parsed on
+a separate pool of worker threads, so a click on one of them can show the
+page without waiting for the network; take() hands over the result, or
+the fetch still in flight.
+
+Only same-origin http(s) links are fetched, and only with GET (forms are
+never prefetched). At most `max_per_host` fetches run per host; further
+hints wait in a short queue, hovered links first. Finished pages are kept
+within `memory_budget` bytes (approximate tree size), oldest dropped
+first, and expire after `max_age` seconds. Pages taken recently are not
+fetched again for the same period.
+"""
+import threading
+import time
+import urllib.parse
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from history import tree_size
+
+MAX_PER_HOST = 2
+MAX_WORKERS = 4
+MAX_QUEUED = 16
+MEMORY_BUDGET = 16 * 1024 * 1024
+MAX_AGE_S = 60.0
+RECENT_SIZE = 64
+
+
+def same_origin(url, origin_url):
+    target = urllib.parse.urlsplit(url)
+    origin = urllib.parse.urlsplit(origin_url)
+    return target.scheme in ("http", "https") and (target.scheme, target.netloc) == (origin.scheme, origin.netloc)
+
+
+class PrefetchEntry:
+    __slots__ = ("url", "future", "finished", "size")
+
+    def __init__(self, url, future):
+        self.url = url
+        self.future = future
+        self.finished = None
+        self.size = 0
+
+
+class Prefetcher:
+    """Bounded speculative fetches; `fetch(url)` runs on a worker and returns the page."""
+
+    def __init__(self, fetch, max_per_host=MAX_PER_HOST, memory_budget=MEMORY_BUDGET, max_age=MAX_AGE_S,
+                 max_workers=MAX_WORKERS):
+        self.fetch = fetch
+        self.max_per_host = max_per_host
+        self.memory_budget = memory_budget
+        self.max_age = max_age
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prowser-prefetch")
+        # Futures may finish (and call _done) while the lock is held by the caller that started them
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()  # url -> PrefetchEntry, oldest first
+        self.queue = deque()          # urls waiting for their host to have a free slot
+        self.active = Counter()       # host -> fetches in flight
+        self.used = 0                 # bytes held by finished entries
+        self.recent = OrderedDict()   # url -> when it was taken
+        self.stats = Counter()
+
+    def hint(self, url, origin_url, urgent=False):
+        # True if the url was queued or started
+        url = urllib.parse.urldefrag(url)[0]
+        if not same_origin(url, origin_url):
+            self.stats["rejected"] += 1
+            return False
+        with self.lock:
+            if url in self.entries or url in self.queue or self._taken_recently(url):
+                return False
+            self.stats["hinted"] += 1
+            if urgent:
+                self.queue.appendleft(url)
+            else:
+                self.queue.append(url)
+            while len(self.queue) > MAX_QUEUED:
+                self.queue.pop()  # The least urgent, most recently seen
+                self.stats["dropped"] += 1
+            self._start_ready()
+        return True
+
+    def take(self, url):
+        """Future of a prefetched or in-flight `url`, or None if it wasn't prefetched."""
+        url = urllib.parse.urldefrag(url)[0]
+        with self.lock:
+            if url in self.queue:
+                self.queue.remove(url)
+            self.recent[url] = time.monotonic()
+            self.recent.move_to_end(url)
+            if len(self.recent) > RECENT_SIZE:
+                self.recent.popitem(last=False)
+            entry = self.entries.pop(url, None)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if not entry.future.done():
+                self.stats["waited"] += 1  # Still cheaper than starting over
+                return entry.future
+            self.used -= entry.size
+            if entry.future.exception() is not None or time.monotonic() - entry.finished > self.max_age:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry.future
+
+    def clear(self):
+        with self.lock:
+            self.queue.clear()
+            self.entries.clear()
+            self.recent.clear()
+            self.used = 0
+
+    def _taken_recently(self, url):
+        taken = self.recent.get(url)
+        return taken is not None and time.monotonic() - taken < self.max_age
+
+    def _start_ready(self):
+        # Lock held
+        for url in list(self.queue):
+            host = urllib.parse.urlsplit(url).netloc
+            if self.active[host] >= self.max_per_host:
+                continue
+            self.queue.remove(url)
+            self.active[host] += 1
+            self.stats["started"] += 1
+            future = self.executor.submit(self.fetch, url)
+            entry = self.entries[url] = PrefetchEntry(url, future)
+            future.add_done_callback(lambda f, entry=entry, host=host: self._done(entry, host))
+
+    def _done(self, entry, host):
+        # Worker thread (or the starting thread if the fetch already failed)
+        with self.lock:
+            self.active[host] -= 1
+            if self.entries.get(entry.url) is entry:
+                if entry.future.exception() is not None:
+                    del self.entries[entry.url]
+                    self.stats["failed"] += 1
+                else:
+                    entry.finished = time.monotonic()
+                    entry.size = tree_size(entry.future.result()[1])
+                    self.used += entry.size
+                    self._evict()
+            self._start_ready()
+
+    def _evict(self):
+        # Drop the oldest finished pages until the budget holds
+        for url in list(self.entries):
+            if self.used <= self.memory_budget:
+                return
+            entry = self.entries[url]
+            if entry.finished is not None:
+                del self.entries[url]
+                self.used -= entry.size
+                self.stats["evicted"] += 1
@@ -0,0 +1,150 @@
+"""Keyed VDOM reconciliation.
+
+Children are matched by VNode.key (the id attribute) when they have one and
+otherwise by tag and position among unkeyed siblings of that tag. Matched
+children that keep their relative order (a longest increasing subsequence of
+their old positions) stay put; the rest are moved. Operations:
+
+    ("replace", parent, old, new)           - rebuild old's widget from new
+    ("attrs", old, {name: new_value})       - attribute changes on a kept node
+    ("insert", parent, new, index, before)  - render new into parent's widget
+    ("move", parent, old, index, before)    - repack old's widget
+    ("remove", parent, old, index)          - destroy old's widget
+    ("retain", old, new)                    - old's widget now belongs to new
+
+Subtrees with equal structural hashes (vdom.subtree_hash) are skipped without
+being walked: the old subtree is put into the new tree in place of its equal
+copy, so its widgets stay mapped to the nodes that are now current.
+
+`parent` is always a node of the old tree. `before` is the sibling whose
+widget the node must be packed in front of (None means last); it is an old
+node if that sibling was kept and a new node if it was inserted. Each
+parent's child operations come in reverse index order, so `before` is
+already in place when the operation referring to it is applied.
+"""
+from bisect import bisect_left
+from vdom import subtree_hash
+
+
+def longest_increasing_subsequence(values):
+    """Indices of a longest strictly increasing subsequence, ignoring negative values."""
+    tails = []      # tails[k] = index of the smallest tail of an increasing run of length k + 1
+    tail_values = []
+    previous = [-1] * len(values)
+    for i, value in enumerate(values):
+        if value < 0:
+            continue
+        k = bisect_left(tail_values, value)
+        if k:
+            previous[i] = tails[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_values.append(value)
+        else:
+            tails[k] = i
+            tail_values[k] = value
+    result = set()
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
+def match_keys(children):
+    # Stable identity of each child among its siblings
+    seen = {}
+    keys = []
+    for child in children:
+        base = ("#", child.key) if child.key is not None else (child.tag,)
+        n = seen.get(base, 0)
+        seen[base] = n + 1
+        keys.append(base + (n,))
+    return keys
+
+
+def diff(old_node, new_node, atomic_tags=frozenset(), stats=None):
+    """Operations turning the widgets of `old_node` into those of `new_node`.
+
+    Nodes whose tag is in `atomic_tags` are drawn as a single widget from their
+    whole subtree, so any change inside them replaces the node. When the two
+    trees are equal no operations are returned and the caller should keep
+    `old_node` as the current tree. If `stats` is
+    a dict it receives the number of node pairs "visited" and of unchanged
+    subtrees "skipped".
+    """
+    diffs = []
+    counts = {"visited": 0, "skipped": 0}
+    if subtree_hash(old_node) == subtree_hash(new_node):
+        counts["skipped"] += 1  # Nothing to do; callers should keep the old tree
+    else:
+        diff_node(None, old_node, new_node, atomic_tags, diffs, counts)
+    if stats is not None:
+        stats.update(counts)
+    return diffs
+
+
+def diff_node(parent, old_node, new_node, atomic_tags, diffs, counts):
+    counts["visited"] += 1
+    if old_node.tag != new_node.tag or old_node.key != new_node.key or old_node.tag in atomic_tags:
+        # Callers only get here for subtrees whose hashes differ
+        diffs.append(("replace", parent, old_node, new_node))
+        return
+
+    old_attrs, new_attrs = old_node.attrs, new_node.attrs
+    if old_attrs != new_attrs:
+        attr_diff = {}
+        for key in set(old_attrs) | set(new_attrs):
+            if old_attrs.get(key) != new_attrs.get(key):
+                attr_diff[key] = new_attrs.get(key)
+        diffs.append(("attrs", old_node, attr_diff))
+    diffs.append(("retain", old_node, new_node))
+    diff_children(old_node, new_node, atomic_tags, diffs, counts)
+
+
+def diff_children(old_parent, new_parent, atomic_tags, diffs, counts):
+    old_children, new_children = old_parent.children, new_parent.children
+    if not old_children and not new_children:
+        return
+
+    if len(old_children) == len(new_children) and all(
+        o.tag == n.tag and o.key == n.key for o, n in zip(old_children, new_children)
+    ):
+        # Same shape (the common case for a re-rendered page): no moves, just pairs
+        sources = range(len(new_children))
+    else:
+        sources = keyed_sources(old_parent, old_children, new_children, diffs)
+
+    for i, source in enumerate(sources):
+        if source < 0:
+            continue
+        old_child = old_children[source]
+        if subtree_hash(old_child) == subtree_hash(new_children[i]):
+            counts["skipped"] += 1
+            new_children[i] = old_child  # Share the unchanged subtree (and its widgets)
+        else:
+            diff_node(old_parent, old_child, new_children[i], atomic_tags, diffs, counts)
+
+
+def keyed_sources(old_parent, old_children, new_children, diffs):
+    # Match children and emit remove/insert/move ops. Returns, for each new
+    # child, the index of its old counterpart or -1 if it was inserted.
+    old_index = {key: i for i, key in enumerate(match_keys(old_children))}
+    sources = [old_index.pop(key, -1) for key in match_keys(new_children)]
+
+    # Whatever is left in old_index had no counterpart
+    for i in sorted(old_index.values(), reverse=True):
+        diffs.append(("remove", old_parent, old_children[i], i))
+
+    stable = longest_increasing_subsequence(sources)
+    before = None
+    for i in range(len(new_children) - 1, -1, -1):
+        source = sources[i]
+        if source < 0:
+            diffs.append(("insert", old_parent, new_children[i], i, before))
+            before = new_children[i]
+        else:
+            if i not in stable:
+                diffs.append(("move", old_parent, old_children[source], i, before))
+            before = old_children[source]
+    return sources
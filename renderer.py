@@ -1,20 +1,74 @@
 import tkinter as tk
 from tkinter import ttk
+from simplify import simplify, inline_runs, run_style, INLINE_TAG
+import styles
+
+# Inline text blocks wrap at this many average character widths
+INLINE_WIDTH_CHARS = 80
+
+
+def create_inline_text(parent, vnode, on_link, bg="white", toolkit=tk, on_hover=None):
+    """One read-only tk.Text for an INLINE_TAG node, styled with text tags.
+
+    Links become tagged ranges that call on_link(href) when clicked (and
+    on_hover(href), if given, when the pointer enters them).
+    `toolkit` supplies the Text class (tkinter, or e.g. the headless module).
+    """
+    runs = inline_runs(vnode)
+    lines = "".join(text for text, _, _ in runs).split("\n")
+    width = min(INLINE_WIDTH_CHARS, max(len(line) for line in lines) + 1)
+    height = sum(-(-max(1, len(line)) // width) for line in lines)
+    widget = toolkit.Text(parent, width=width, height=height, wrap="word", bg=bg,
+                     borderwidth=0, highlightthickness=0, cursor="arrow")
+    configured = set()
+    for i, (text, run_styles, href) in enumerate(runs):
+        bold, italic, mono, underline, strike = run_style(run_styles)
+        style = f"style{bold:d}{italic:d}{mono:d}{underline:d}{strike:d}"
+        if style not in configured:
+            font = styles.font(
+                weight="bold" if bold else "normal",
+                family=styles.MONO_FAMILY if mono else styles.DEFAULT_FAMILY,
+                slant="italic" if italic else "roman",
+            )
+            widget.tag_configure(style, font=font, underline=underline, overstrike=strike)
+            configured.add(style)
+        tags = (style,)
+        if href is not None:
+            link = f"link{i}"
+            widget.tag_configure(link, foreground="blue")
+            widget.tag_bind(link, "<Button-1>", lambda e, url=href: on_link(url))
+            widget.tag_bind(link, "<Enter>", lambda e: widget.config(cursor="hand2"))
+            if on_hover is not None:
+                widget.tag_bind(link, "<Enter>", lambda e, url=href: on_hover(url), add="+")
+            widget.tag_bind(link, "<Leave>", lambda e: widget.config(cursor="arrow"))
+            tags += (link,)
+        widget.insert("end", text, tags)
+    widget.config(state="disabled")
+    widget.pack(anchor="w")
+    return widget
+
 
 class TkRenderer:
+    # Tags with their own create_* method; everything else is a generic container
+    RENDERED_TAGS = {"text", "h1", "h2", "h3", "h4", "h5", "h6", "a", "input", "form", INLINE_TAG}
+    # Spacing around headers; fonts come from the shared registry in styles
+    HEADER_PADDING = {"h1": (15, 5), "h2": (12, 4), "h3": (10, 3), "h4": (8, 2), "h5": (6, 2), "h6": (6, 2)}
+    INPUT_WIDTH = 30
+
     def __init__(self, master, script_handler):
         self.master = master
         self.script_handler = script_handler
         self.widget_map = {}
-        self.styles = {
-            "h1": {"font": ("Arial", 24, "bold"), "pady": (15, 5)},
-            "h2": {"font": ("Arial", 20, "bold"), "pady": (12, 4)},
-            "h3": {"font": ("Arial", 16, "bold"), "pady": (10, 3)},
-            "p": {"font": ("Arial", 12), "wraplength": 700},
-            "input": {"font": ("Arial", 12), "width": 30}
-        }
-        
+        styles.bind(master)
+
     def render(self, vnode, parent):
+        # Simplify once for the whole tree, then draw it
+        return self._render(simplify(vnode, self.is_container), parent)
+
+    def is_container(self, tag):
+        return tag not in self.RENDERED_TAGS
+
+    def _render(self, vnode, parent):
         if vnode.tag == "text":
             return self.create_text(vnode, parent)
         elif vnode.tag in ["h1", "h2", "h3", "h4", "h5", "h6"]:
@@ -25,24 +79,40 @@ class TkRenderer:
             return self.create_input(vnode, parent)
         elif vnode.tag == "form":
             return self.create_form(vnode, parent)
+        elif vnode.tag == INLINE_TAG:
+            return create_inline_text(parent, vnode, lambda href: self.script_handler("navigate", href),
+                                      on_hover=lambda href: self.script_handler("prefetch", href))
         else:
             return self.create_container(vnode, parent)
 
+    def create_container(self, vnode, parent):
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.X, padx=5, pady=5)
+        for child in vnode.children:
+            self._render(child, frame)
+        return frame
+
+    def create_form(self, vnode, parent):
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.X, padx=5, pady=10)
+        for child in vnode.children:
+            self._render(child, frame)
+        return frame
+
     def create_text(self, vnode, parent):
         widget = ttk.Label(parent, text=vnode.attrs.get("content", ""))
         widget.pack(anchor="w")
         return widget
 
     def create_header(self, vnode, parent):
-        style = self.styles[vnode.tag]
         text = self.get_child_text(vnode)
         widget = ttk.Label(
             parent,
             text=text,
-            font=style["font"],
+            font=styles.header_font(vnode.tag),
             wraplength=700
         )
-        widget.pack(anchor="w", pady=style["pady"])
+        widget.pack(anchor="w", pady=self.HEADER_PADDING[vnode.tag])
         return widget
 
     def create_input(self, vnode, parent):
@@ -57,8 +127,10 @@ class TkRenderer:
             widget = ttk.Entry(
                 parent,
                 show="*" if input_type == "password" else None,
-                **self.styles["input"]
+                font=styles.font(),
+                width=self.INPUT_WIDTH
             )
+            widget.widget_name = vnode.attrs.get("name", "")  # Read back by handle_form_submit
         widget.pack(pady=5)
         return widget
 
@@ -78,6 +150,7 @@ class TkRenderer:
             cursor="hand2"
         )
         widget.bind("<Button-1>", lambda e: self.script_handler("navigate", vnode.attrs.get("href")))
+        widget.bind("<Enter>", lambda e: self.script_handler("prefetch", vnode.attrs.get("href")))
         widget.pack(anchor="w")
         return widget
 
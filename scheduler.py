@@ -0,0 +1,103 @@
+import time
+
+from tracing import Tracer
+
+# Default work per slice; leaves most of a 60Hz frame for input and repaints
+BUDGET_MS = 8
+# Pause between slices so Tk can run geometry, redraws and queued input
+SLICE_GAP_MS = 1
+
+
+class RenderScheduler:
+    """Renders a VNode tree in time-boxed slices from the Tk event loop.
+
+    The tree is walked depth-first as (node, parent widget) work units.
+    `render_unit(node, parent)` draws one unit and returns the widget its
+    children go into, or None if it drew the whole subtree itself. Each slice
+    runs until the budget is spent, calls `on_slice`, and schedules the next
+    one with after(), so input is handled between slices. Each slice is a
+    "render slice" span of the trace passed to start().
+    """
+
+    def __init__(self, widget, render_unit, budget_ms=BUDGET_MS, on_slice=None, tracer=None):
+        self.widget = widget
+        self.render_unit = render_unit
+        self.budget_ms = budget_ms
+        self.on_slice = on_slice
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.trace = None
+        self.stack = []
+        self.job = None
+        self.on_done = None
+        self.started = 0.0
+        self.units = 0
+        self.slices = []
+        self.stats = {}
+
+    @property
+    def active(self):
+        return bool(self.stack)
+
+    def start(self, vdom, parent, on_done=None, trace=None):
+        self.cancel()
+        self.stack = [(vdom, parent)]
+        self.on_done = on_done
+        self.trace = trace
+        self.started = time.perf_counter()
+        self.units = 0
+        self.slices = []
+        self.job = self.widget.after_idle(self._run_slice)
+
+    def cancel(self):
+        # Drop the remaining work (a new page replaces this one)
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+        self.stack = []
+        self.on_done = None
+
+    def flush(self):
+        # Render everything that is left right now (callers about to diff need the widgets)
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+        if self.stack:
+            self._run_slice(budget=float("inf"))
+
+    def _run_slice(self, budget=None):
+        self.job = None
+        start = time.perf_counter()
+        deadline = start + (self.budget_ms if budget is None else budget) / 1000.0
+        stack = self.stack
+        units = 0
+        with self.tracer.span("render slice", trace=self.trace) as span:
+            while stack:
+                node, parent = stack.pop()
+                container = self.render_unit(node, parent)
+                if container is not None:
+                    stack.extend((child, container) for child in reversed(node.children))
+                units += 1
+                if time.perf_counter() >= deadline:
+                    break
+            span.set(units=units)
+        self.units += units
+        self.slices.append(time.perf_counter() - start)
+        if self.on_slice:
+            self.on_slice()
+        if stack:
+            self.job = self.widget.after(SLICE_GAP_MS, self._run_slice)
+        else:
+            self._finish()
+
+    def _finish(self):
+        slices = self.slices
+        self.stats = {
+            "frames": len(slices),
+            "units": self.units,
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "max_slice_ms": max(slices) * 1000,
+            "mean_slice_ms": sum(slices) / len(slices) * 1000,
+        }
+        on_done, self.on_done = self.on_done, None
+        if on_done:
+            on_done()
@@ -0,0 +1,147 @@
+"""Pre-render simplification of VNode trees.
+
+Cuts the number of widgets a page needs without changing what it says:
+
+- adjacent inline content (text, <b>, <em>, <a>, ...) is grouped under one
+  INLINE_TAG node, drawn as a single tagged text block
+- a generic container left with one child and no id is replaced by that child
+
+Nodes are never modified: changed containers are rebuilt and unchanged
+subtrees are shared, so structural hashes stay valid.
+"""
+from vdom import VNode
+
+INLINE_TAG = "#inline"
+
+# Elements that flow inside a line of text
+INLINE_TAGS = frozenset({
+    "text", "a", "abbr", "b", "big", "cite", "code", "del", "dfn", "em", "font", "i", "ins",
+    "kbd", "label", "mark", "q", "s", "samp", "small", "span", "strike", "strong", "sub",
+    "sup", "time", "tt", "u", "var",
+})
+# Containers that hold blocks rather than text; the streaming parser opens only these
+BLOCK_CONTAINERS = frozenset({
+    "[document]", "html", "body", "div", "section", "article", "main", "header", "footer",
+    "nav", "aside", "ul", "ol", "dl", "table", "thead", "tbody", "tfoot", "tr",
+    "blockquote", "figure", "details", "fieldset",
+})
+
+BOLD_TAGS = frozenset({"b", "strong"})
+ITALIC_TAGS = frozenset({"i", "em", "cite", "dfn", "var"})
+MONO_TAGS = frozenset({"code", "kbd", "samp", "tt"})
+UNDERLINE_TAGS = frozenset({"u", "ins", "a"})
+STRIKE_TAGS = frozenset({"s", "strike", "del"})
+NO_SPACE_BEFORE = frozenset(".,;:!?)]}")
+
+
+def is_inline(node):
+    # Inline elements count only if everything inside them is inline too
+    if node.tag not in INLINE_TAGS:
+        return False
+    stack = list(node.children)
+    while stack:
+        child = stack.pop()
+        if child.tag not in INLINE_TAGS:
+            return False
+        stack.extend(child.children)
+    return True
+
+
+def is_single_widget(node):
+    # Plain text, or a link whose text is all direct children, is one label already
+    return node.tag == "text" or (node.tag == "a" and all(c.tag == "text" for c in node.children))
+
+
+def lays_out_children(tag, is_container):
+    # Generic containers and forms draw each child as its own widget
+    return tag == "form" or is_container(tag)
+
+
+def simplify(vdom, is_container):
+    """Simplified copy of `vdom`; `is_container(tag)` says which tags are generic containers.
+
+    The root itself is kept so the page always has the same top node.
+    """
+    children = simplify_children(vdom, is_container)
+    if children is vdom.children:
+        return vdom
+    return VNode(vdom.tag, vdom.attrs, children or None)
+
+
+def simplify_children(node, is_container):
+    children = node.children
+    if not children or node.tag == INLINE_TAG or not lays_out_children(node.tag, is_container):
+        return children  # Other rendered tags draw their subtree themselves
+
+    simplified = [simplify_node(child, is_container) for child in children]
+    # Judged before simplifying: a collapsed wrapper (e.g. <p>text</p>) stays its own block
+    inline = [is_inline(child) for child in children]
+
+    result = []
+    i = 0
+    while i < len(simplified):
+        if not inline[i]:
+            result.append(simplified[i])
+            i += 1
+            continue
+        end = i
+        while end < len(simplified) and inline[end]:
+            end += 1
+        run = simplified[i:end]
+        if len(run) == 1 and is_single_widget(run[0]):
+            result.extend(run)
+        else:
+            result.append(VNode(INLINE_TAG, None, run))
+        i = end
+
+    if len(result) == len(children) and all(a is b for a, b in zip(result, children)):
+        return children
+    return result
+
+
+def simplify_node(node, is_container):
+    if not lays_out_children(node.tag, is_container) or is_inline(node):
+        return node
+    children = simplify_children(node, is_container)
+    if len(children) == 1 and node.key is None and is_container(node.tag):
+        return children[0]  # Drop the wrapper
+    if children is node.children:
+        return node
+    return VNode(node.tag, node.attrs, children or None)
+
+
+def inline_runs(node):
+    """List of (text, styles, href) for the text leaves under an inline node.
+
+    `styles` is the tuple of enclosing inline tags, outermost first; `href`
+    is the target of the enclosing link, if any. Parsers strip text, so runs
+    after the first get back a separating space unless they start with
+    punctuation.
+    """
+    runs = []
+    for text, styles, href in _leaves(node, (), None):
+        if runs and text[:1] not in NO_SPACE_BEFORE:
+            text = " " + text
+        runs.append((text, styles, href))
+    return runs
+
+
+def _leaves(node, styles, href):
+    for child in node.children:
+        if child.tag == "text":
+            yield child.attrs.get("content", ""), styles, href
+        else:
+            link = child.attrs.get("href", "#") if child.tag == "a" else href
+            yield from _leaves(child, styles + (child.tag,), link)
+
+
+def run_style(styles):
+    """(bold, italic, mono, underline, strike) for a run inside `styles`."""
+    tags = set(styles)
+    return (
+        bool(tags & BOLD_TAGS),
+        bool(tags & ITALIC_TAGS),
+        bool(tags & MONO_TAGS),
+        bool(tags & UNDERLINE_TAGS),
+        bool(tags & STRIKE_TAGS),
+    )
@@ -0,0 +1,123 @@
+"""Process-wide fonts and text measurement shared by the renderers.
+
+Fonts are created once per (family, size, weight, slant, underline,
+overstrike) and reused by every widget and canvas item. Measured text
+widths and wrapped line breaks are kept in LRU caches keyed by font name,
+so re-rendering or re-laying out a page asks Tk for little or nothing.
+
+Tk fonts belong to one interpreter: call bind() with a widget of the
+window being rendered (and the toolkit's Font class) and the registry
+starts over when that changes.
+"""
+import tkinter.font as tkfont
+from functools import lru_cache
+
+DEFAULT_FAMILY = "Arial"
+MONO_FAMILY = "Courier"
+DEFAULT_SIZE = 12
+HEADER_SIZES = {"h1": 24, "h2": 20, "h3": 18, "h4": 16, "h5": 14, "h6": 12}
+MEASURE_CACHE_SIZE = 64 * 1024
+WRAP_CACHE_SIZE = 8 * 1024
+
+_master = None
+_font_class = tkfont.Font
+_fonts = {}       # (family, size, weight, slant, underline, overstrike) -> Font
+_by_name = {}     # Tk font name -> Font
+_linespace = {}   # Tk font name -> pixels
+_counts = {"font_hits": 0, "font_misses": 0}
+
+
+def bind(widget, font_class=tkfont.Font):
+    # Fonts of another (possibly destroyed) interpreter can't be used; start over
+    global _master, _font_class
+    if _master is None or _master.tk is not widget.tk or _font_class is not font_class:
+        reset()
+        _master = widget
+        _font_class = font_class
+
+
+def reset():
+    global _master
+    _master = None
+    _fonts.clear()
+    _by_name.clear()
+    _linespace.clear()
+    _measure.cache_clear()
+    _wrap.cache_clear()
+    _counts.update(font_hits=0, font_misses=0)
+
+
+def font(size=DEFAULT_SIZE, weight="normal", family=DEFAULT_FAMILY, slant="roman", underline=False, overstrike=False):
+    key = (family, size, weight, slant, underline, overstrike)
+    cached = _fonts.get(key)
+    if cached is not None:
+        _counts["font_hits"] += 1
+        return cached
+    _counts["font_misses"] += 1
+    created = _font_class(root=_master, family=family, size=size, weight=weight, slant=slant,
+                          underline=underline, overstrike=overstrike)
+    _fonts[key] = created
+    _by_name[created.name] = created
+    return created
+
+
+def header_font(tag):
+    return font(HEADER_SIZES.get(tag, DEFAULT_SIZE), "bold")
+
+
+def measure(text_font, text):
+    """Width of `text` in pixels."""
+    return _measure(text_font.name, text)
+
+
+def linespace(text_font):
+    height = _linespace.get(text_font.name)
+    if height is None:
+        height = _linespace[text_font.name] = text_font.metrics("linespace")
+    return height
+
+
+def wrap(text_font, text, width):
+    """Lines of `text` broken greedily at spaces to fit `width` pixels.
+
+    Explicit newlines always break. Returns a tuple (shared between callers).
+    """
+    return _wrap(text_font.name, text, width)
+
+
+@lru_cache(maxsize=MEASURE_CACHE_SIZE)
+def _measure(name, text):
+    return _by_name[name].measure(text)
+
+
+@lru_cache(maxsize=WRAP_CACHE_SIZE)
+def _wrap(name, text, width):
+    space = _measure(name, " ")
+    lines = []
+    for paragraph in text.split("\n"):
+        line, line_width = [], 0
+        for word in paragraph.split(" "):
+            word_width = _measure(name, word)
+            if line and line_width + space + word_width > width:
+                lines.append(" ".join(line))
+                line, line_width = [word], word_width
+            else:
+                line_width += (space if line else 0) + word_width
+                line.append(word)
+        lines.append(" ".join(line))
+    return tuple(lines)
+
+
+def stats():
+    measured, wrapped = _measure.cache_info(), _wrap.cache_info()
+    return {
+        "fonts": len(_fonts),
+        "font_hits": _counts["font_hits"],
+        "font_misses": _counts["font_misses"],
+        "measure_hits": measured.hits,
+        "measure_misses": measured.misses,
+        "measure_hit_rate": measured.hits / max(1, measured.hits + measured.misses),
+        "wrap_hits": wrapped.hits,
+        "wrap_misses": wrapped.misses,
+        "wrap_hit_rate": wrapped.hits / max(1, wrapped.hits + wrapped.misses),
+    }
@@ -0,0 +1,221 @@
+"""Lightweight tracing spans, exported as Chrome trace events.
+
+    with tracer.span("parse", bytes=len(html)) as span:
+        vdom = parse(html)
+        if span.recording:
+            span.set(nodes=count_nodes(vdom))
+
+Spans nest by time on each thread, which is how chrome://tracing and
+Perfetto draw them. A span that starts and ends in different callbacks
+(a whole navigation) is created without `with` and closed with end().
+Spans carry a trace id, so the stages of one navigation can be pulled back
+out (breakdown()); spans opened inside a `with` span inherit its id.
+
+While the tracer is disabled, span() returns a shared no-op span, so
+instrumented code pays for one call. Guard expensive arguments with
+`span.recording`.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MAX_EVENTS = 200000
+HUD_MAX_LINES = 24
+
+
+class NullSpan:
+    recording = False
+    trace = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+    def end(self, **args):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "trace", "args", "start", "ended")
+    recording = True
+
+    def __init__(self, tracer, name, trace, args):
+        self.tracer = tracer
+        self.name = name
+        self.trace = trace
+        self.args = args
+        self.ended = False
+        self.start = time.perf_counter_ns()
+
+    def __enter__(self):
+        self.tracer._stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._stack().pop()
+        if exc_type is not None:
+            self.args["error"] = repr(exc)
+        self.end()
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def end(self, **args):
+        if self.ended:
+            return
+        self.ended = True
+        self.args.update(args)
+        self.tracer._record(self, time.perf_counter_ns())
+
+
+class Tracer:
+    def __init__(self, enabled=False, max_events=MAX_EVENTS):
+        self.enabled = enabled
+        # (name, start ns, end ns, thread id, trace id, args); appends are thread-safe
+        self.events = deque(maxlen=max_events)
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def span(self, name, trace=None, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        if trace is None:
+            trace = self.current_trace()
+        return Span(self, name, trace, args)
+
+    def new_trace(self):
+        return next(self._ids) if self.enabled else None
+
+    def current_trace(self):
+        # Trace id of the innermost `with` span open on this thread
+        stack = self._stack()
+        return stack[-1].trace if stack else None
+
+    def clear(self):
+        self.events.clear()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span, end):
+        thread = threading.current_thread()
+        self.thread_names[thread.ident] = thread.name
+        self.events.append((span.name, span.start, end, thread.ident, span.trace, span.args))
+
+    def breakdown(self, trace):
+        """(depth, name, ms, args) for each span of `trace`, in start order.
+
+        Depth is nesting on the span's own thread; spans of other threads
+        are shown one level below the trace's longest (root) span.
+        """
+        events = sorted((e for e in self.events if e[4] == trace), key=lambda e: (e[1], -e[2]))
+        if not events:
+            return []
+        root_thread = max(events, key=lambda e: e[2] - e[1])[3]
+        open_ends = {}  # thread id -> end times of enclosing spans
+        rows = []
+        for name, start, end, thread, _, args in events:
+            stack = open_ends.setdefault(thread, [])
+            while stack and stack[-1] <= start:
+                stack.pop()
+            depth = len(stack) + (0 if thread == root_thread else 1)
+            stack.append(end)
+            rows.append((depth, name, (end - start) / 1e6, args))
+        return rows
+
+    def to_chrome(self):
+        """The recorded spans as a Chrome trace-event JSON object."""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self.thread_names.items()]
+        for name, start, end, tid, trace, args in self.events:
+            event_args = dict(args, trace=trace) if trace is not None else args
+            events.append({
+                "name": name, "ph": "X", "pid": pid, "tid": tid,
+                "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000,
+                "args": {k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in event_args.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome(), f)
+
+
+def count_nodes(vnode):
+    count = 0
+    stack = [vnode]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def format_breakdown(rows, max_lines=HUD_MAX_LINES):
+    """Text lines for a breakdown; runs of same-named siblings become one line."""
+    merged = []
+    for depth, name, ms, args in rows:
+        last = merged[-1] if merged else None
+        if last and last[0] == depth and last[1] == name:
+            last[2] += ms
+            last[3] += 1
+        else:
+            merged.append([depth, name, ms, 1, args])
+    lines = []
+    for depth, name, ms, count, args in merged[:max_lines]:
+        label = "  " * depth + name + (f" x{count}" if count > 1 else "")
+        details = " ".join(f"{key}={args[key]}" for key in ("bytes", "nodes", "ops", "status") if key in args)
+        lines.append(f"{label:<28}{ms:>9.1f} ms  {details}".rstrip())
+    if len(merged) > max_lines:
+        lines.append(f"... {len(merged) - max_lines} more")
+    return lines
+
+
+class TraceHud:
+    """Small overlay in the browser window with the last navigation's breakdown."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.label = None
+
+    @property
+    def visible(self):
+        return self.label is not None
+
+    def toggle(self):
+        if self.visible:
+            self.hide()
+        else:
+            self.show(["Tracing: waiting for the next navigation"])
+
+    def show(self, lines):
+        if self.label is None:
+            self.label = self.browser.toolkit.Label(
+                self.browser.parent, justify="left", anchor="nw", font=("Courier", 9),
+                bg="#ffffe0", relief="solid", borderwidth=1,
+            )
+            self.label.place(relx=1.0, x=-20, y=40, anchor="ne")
+        self.label.config(text="\n".join(lines))
+
+    def hide(self):
+        if self.label is not None:
+            self.label.destroy()
+            self.label = None
@@ -0,0 +1,105 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from httpcache import HTTPCache
+
+# urllib3 transparently decodes brotli bodies when one of these is installed,
+# so only advertise "br" when we can actually read it.
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_TIMEOUT = (5, 10)  # (connect, read) seconds
+DEFAULT_POOL_HOSTS = 16    # Hosts whose connection pools are kept around
+DEFAULT_PER_HOST = 6       # Max simultaneous keep-alive connections per host
+# Requests whose success makes cached GETs of the same resource stale
+UNSAFE_METHODS = {"POST", "PUT", "DELETE", "PATCH"}
+
+
+class Transport:
+    """Pooled HTTP session shared by navigation, forms and network.fetch_url.
+
+    Connections are kept alive and reused per host, so repeated requests to
+    the same site skip the TCP/TLS handshake. When `cache` is given, plain
+    GETs are answered from / revalidated against it first.
+    """
+
+    def __init__(self, pool_hosts=DEFAULT_POOL_HOSTS, per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT,
+                 cache=None):
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
+        })
+        # pool_block makes per_host a hard limit: extra requests wait for a free connection
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=per_host, pool_block=True)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.request(method, url, **kwargs)
+        if self.cache is not None and method.upper() in UNSAFE_METHODS:
+            self.cache.invalidate(url, response)
+        return response
+
+    def get(self, url, **kwargs):
+        if self.cache is None:
+            return self.request("GET", url, **kwargs)
+        # Vary matching needs the headers that will actually be sent
+        headers = dict(self.session.headers)
+        headers.update(kwargs.pop("headers", None) or {})
+        return self.cache.get(self.request, url, headers=headers, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request("POST", url, data=data, **kwargs)
+
+    def stats(self):
+        # Connections opened vs requests sent across the live host pools
+        pools = self.adapter.poolmanager.pools
+        connections = requests_sent = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        return {
+            "hosts": len(pools),
+            "connections": connections,
+            "requests": requests_sent,
+            "reused": max(0, requests_sent - connections),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_transport():
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Transport(cache=HTTPCache.default())
+        return _shared
+
+
+def configure(**kwargs):
+    # Replace the shared transport, e.g. configure(timeout=(3, 30), per_host=2, cache=None)
+    global _shared
+    kwargs.setdefault("cache", HTTPCache.default())
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+        _shared = Transport(**kwargs)
+        return _shared
@@ -1,9 +1,71 @@
-class VNode:
+import sys
+from types import MappingProxyType
+
+# Shared by every node without attributes / children, so leaves cost no extra containers
+EMPTY_ATTRS = MappingProxyType({})
+EMPTY_CHILDREN = ()
+
+
+class Node:
+    """What elements and text leaves share; no storage of its own."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"<VNode {self.tag}>"
+
+
+class VNode(Node):
+    # digest: structural hash of the subtree, see subtree_hash()
+    __slots__ = ("tag", "attrs", "children", "key", "digest")
+
     def __init__(self, tag, attrs=None, children=None):
-        self.tag = tag
-        self.attrs = attrs or {}
-        self.children = children or []
+        self.tag = sys.intern(tag)
+        self.attrs = attrs or EMPTY_ATTRS
+        self.children = children if children is not None else EMPTY_CHILDREN
         self.key = self.attrs.get("id")
-    
-    def __repr__(self):
-        return f"<VNode {self.tag}>"
\ No newline at end of file
+        self.digest = None
+
+
+class TextNode(Node):
+    """A text leaf. Stores only its string and digest; `attrs` is built on access."""
+
+    __slots__ = ("content", "digest")
+
+    tag = "text"
+    key = None
+    children = EMPTY_CHILDREN
+
+    def __init__(self, content):
+        self.content = content
+        self.digest = hash(("text", content))
+
+    @property
+    def attrs(self):
+        return {"content": self.content}
+
+
+def attrs_hash(attrs):
+    if not attrs:
+        return 0
+    # Order-insensitive, like dict equality; list values (class, rel) become tuples
+    return hash(frozenset(
+        (name, tuple(value) if isinstance(value, list) else value) for name, value in attrs.items()
+    ))
+
+
+def subtree_hash(node):
+    """Structural hash of a node and everything below it.
+
+    Computed once (parsers call this as each element closes, so children are
+    already hashed) and cached on the node. Equal hashes mean equal subtrees
+    (barring a 64-bit collision), which lets the differ skip them. Trees must not be mutated after hashing.
+    """
+    digest = node.digest
+    if digest is None:
+        if node.tag == "text":
+            digest = hash(("text", node.attrs.get("content", "")))
+        else:
+            digest = hash((node.tag, attrs_hash(node.attrs), tuple(subtree_hash(c) for c in node.children)))
+        node.digest = digest
+    return digest
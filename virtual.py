@@ -0,0 +1,329 @@
+import styles
+from find import group_spans, mark_widget, unmark_widget
+from images import image_box, MAX_IMAGE_HEIGHT
+from simplify import inline_runs, INLINE_TAG
+
+# Extra height materialized above and below the visible area
+OVERSCAN_PX = 600
+# Horizontal offset per level of container nesting (eager frames use padx=5)
+INDENT_PX = 5
+# Initial height guesses for blocks that haven't been measured yet
+WRAP_WIDTH = 700
+CONTROL_HEIGHT = 34
+# Blocks kept alive (unmapped) when scrolled away so typed input survives
+PARKED_TAGS = {"form", "input"}
+
+
+class FenwickTree:
+    """Prefix sums over block heights with O(log n) update and search."""
+
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] + list(values)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        # Sum of the first `count` values
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def find(self, y):
+        # Index of the block containing offset y (self.size if y is past the end)
+        index = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = index + step
+            if nxt <= self.size and self.tree[nxt] <= y:
+                index = nxt
+                y -= self.tree[nxt]
+            step >>= 1
+        return index
+
+
+def flatten_blocks(vdom, is_container):
+    """Preorder list of (node, depth) for the nodes that are drawn as a unit.
+
+    Generic containers are walked through rather than drawn; their depth
+    becomes the block's indentation.
+    """
+    blocks = []
+    stack = [(vdom, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if is_container(node.tag):
+            stack.extend((child, depth + 1) for child in reversed(node.children))
+        else:
+            blocks.append((node, depth))
+    return blocks
+
+
+class VirtualView:
+    """Renders only the blocks that intersect the canvas viewport.
+
+    The page is flattened into blocks with estimated heights. On every
+    scroll or resize the blocks within the viewport plus OVERSCAN_PX are
+    materialized as canvas windows; blocks that scroll away are released.
+    Plain text and link labels are kept in a pool and reconfigured for the
+    next block instead of being destroyed; forms and inputs are parked so
+    what the user typed survives. Estimates are replaced by the real height
+    once a block has been shown.
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.canvas = browser.content_canvas
+        self.toolkit = browser.toolkit
+        self.blocks = []
+        self.heights = []
+        self.measured = []
+        self.positions = FenwickTree([])
+        self.live = {}   # block index -> (widget, canvas item, pool kind or None)
+        self.pool = {"text": [], "link": []}
+        self.parked = {}  # block index -> holder of a form or input scrolled out of view
+        self.stats = {"created": 0, "reused": 0, "released": 0}
+        self.remeasure_job = None
+        self.highlights = {}     # block node -> find-in-page spans, see highlight()
+        self.marked = []         # Live widgets showing them
+        self.block_index = None  # node -> block index, built by reveal()
+
+    def mount(self, vdom, is_container, keep_position=False):
+        top = self.canvas.yview()[0] if keep_position else 0.0
+        self.unmount()
+        styles.bind(self.canvas, self.toolkit.font.Font)
+        self.blocks = flatten_blocks(vdom, is_container)
+        self.heights = [self.estimate(node) for node, _ in self.blocks]
+        self.measured = [False] * len(self.blocks)
+        self.positions = FenwickTree(self.heights)
+        self.highlights, self.marked, self.block_index = {}, [], None
+        self._update_scrollregion()
+        self.canvas.yview_moveto(top)
+        self.update()
+
+    def unmount(self):
+        for index in list(self.live):
+            self._release(index)
+        for widgets in self.pool.values():
+            for widget in widgets:
+                widget.destroy()
+            widgets.clear()
+        for index, widget in self.parked.items():
+            node = self.blocks[index][0]
+            self.browser.widget_map.pop(node, None)
+            self.browser._clean_widget_map(node)
+            widget.destroy()
+        self.parked.clear()
+        self.blocks = []
+        self.heights = []
+
+    def content_changed(self):
+        # A shown block changed size (an image arrived); measure the live blocks again
+        if self.remeasure_job is None:
+            self.remeasure_job = self.canvas.after_idle(self._remeasure)
+
+    def _remeasure(self):
+        self.remeasure_job = None
+        live = list(self.live)
+        for index in live:
+            self.measured[index] = False
+        if self._measure(live):
+            self.update()
+
+    def widget_count(self):
+        return len(self.live) + len(self.parked) + sum(len(widgets) for widgets in self.pool.values())
+
+    def resize(self):
+        # Holders span the canvas width so forms can fill it
+        width = self.canvas.winfo_width()
+        for index, (widget, item, kind) in self.live.items():
+            if kind is None:
+                self.canvas.itemconfigure(item, width=max(1, width - self.blocks[index][1] * INDENT_PX))
+        if self.blocks:
+            self._update_scrollregion()
+        self.update()
+
+    def estimate(self, node):
+        font = styles.font()
+        linespace = styles.linespace(font)
+        if node.tag == "text":
+            return (linespace + 4) * (node.attrs.get("content", "").count("\n") + 1)
+        if node.tag in styles.HEADER_SIZES:
+            font = styles.header_font(node.tag)
+            text = "".join(c.attrs.get("content", "") for c in node.children if c.tag == "text")
+            lines = max(1, -(-styles.measure(font, text) // WRAP_WIDTH))
+            return lines * (styles.linespace(font) + 4) + 15
+        if node.tag == "a":
+            return linespace + 4
+        if node.tag == INLINE_TAG:
+            text = "".join(text for text, _, _ in inline_runs(node))
+            lines = max(1, -(-styles.measure(font, text) // WRAP_WIDTH)) + text.count("\n")
+            return lines * linespace + 4
+        if node.tag in ("input", "button"):
+            return CONTROL_HEIGHT
+        if node.tag == "img":
+            width, height, sized = image_box(node.attrs, WRAP_WIDTH, MAX_IMAGE_HEIGHT)
+            return (height if sized else linespace) + 8
+        # Forms: their controls are stacked vertically
+        return 20 + sum(self.estimate(child) for child in node.children)
+
+    def update(self):
+        if not self.blocks:
+            return
+        # Materialize until measured heights stop moving blocks in or out of view
+        for _ in range(3):
+            top = self.canvas.canvasy(0) - OVERSCAN_PX
+            bottom = self.canvas.canvasy(self.canvas.winfo_height()) + OVERSCAN_PX
+            first = self.positions.find(max(0, top))
+            last = min(len(self.blocks) - 1, self.positions.find(bottom))
+            wanted = range(first, last + 1)
+            for index in [i for i in self.live if i < first or i > last]:
+                self._release(index)
+            created = [i for i in wanted if i not in self.live]
+            for index in created:
+                self._materialize(index)
+            if not created or not self._measure(created):
+                break
+        self._reposition()
+        if self.highlights or self.marked:
+            self._mark()  # Widgets came and went (labels are pooled): highlight the live ones again
+
+    def visible_links(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        links = []
+        for index in sorted(self.live):
+            y = self.positions.prefix(index)
+            if y >= bottom or y + self.heights[index] <= top:
+                continue
+            node = self.blocks[index][0]
+            if node.tag == "a":
+                links.append(node.attrs.get("href", "#"))
+            elif node.tag == INLINE_TAG:
+                links.extend(href for _, _, href in inline_runs(node) if href is not None)
+        return list(dict.fromkeys(links))
+
+    def highlight(self, matches, current):
+        # Find-in-page matches; only blocks with a live widget show them
+        self.highlights = group_spans(matches, current)
+        self._mark()
+
+    def _mark(self):
+        for widget in self.marked:
+            unmark_widget(self.toolkit, widget)
+        self.marked = []
+        for node, (spans, current) in self.highlights.items():
+            widget = self.browser.widget_map.get(node)
+            if widget is not None:
+                mark_widget(self.toolkit, widget, spans, current)
+                self.marked.append(widget)
+
+    def reveal(self, node):
+        """Scroll the block drawing `node` into view, unless it is already."""
+        if self.block_index is None:
+            self.block_index = {}
+            for index, (block, _) in enumerate(self.blocks):
+                self.block_index[block] = index
+                if block.tag == "form":
+                    # Forms are one block but index their descendants too
+                    stack = list(block.children)
+                    while stack:
+                        descendant = stack.pop()
+                        self.block_index[descendant] = index
+                        stack.extend(descendant.children)
+        index = self.block_index.get(node)
+        if index is None:
+            return
+        y = self.positions.prefix(index)
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        if top <= y and y + min(self.heights[index], height) <= top + height:
+            return
+        total = self.positions.prefix(len(self.heights))
+        self.canvas.yview_moveto(max(0, y - height // 3) / max(1, total))
+
+    def _materialize(self, index):
+        node, depth = self.blocks[index]
+        kind = "text" if node.tag == "text" else "link" if node.tag == "a" else None
+        if kind and self.pool[kind]:
+            widget = self.pool[kind].pop()
+            self.stats["reused"] += 1
+        else:
+            widget = None
+            self.stats["created"] += 1
+
+        if kind == "text":
+            if widget is None:
+                widget = self.toolkit.Label(self.canvas)
+            widget.config(text=node.attrs.get("content", ""))
+        elif kind == "link":
+            if widget is None:
+                widget = self.toolkit.Label(self.canvas, fg="blue", cursor="hand2", underline=True)
+            text = "".join(c.attrs.get("content", "") for c in node.children if c.tag == "text")
+            url = node.attrs.get("href", "#")
+            widget.config(text=text)
+            widget.bind("<Button-1>", lambda e, link=url: self.browser.load_link(link))
+            widget.bind("<Enter>", lambda e, link=url: self.browser.prefetch_link(link))
+        elif index in self.parked:
+            widget = self.parked.pop(index)
+        else:
+            # Anything else is drawn by the regular renderer inside a holder frame
+            widget = self.toolkit.Frame(self.canvas, bg="white")
+            self.browser.render_vdom(node, widget)
+
+        x = depth * INDENT_PX
+        options = {} if kind else {"width": max(1, self.canvas.winfo_width() - x)}
+        item = self.canvas.create_window(x, self.positions.prefix(index), window=widget, anchor="nw", **options)
+        self.live[index] = (widget, item, kind)
+        if kind:
+            self.browser.widget_map[node] = widget
+
+    def _release(self, index):
+        widget, item, kind = self.live.pop(index)
+        self.canvas.delete(item)
+        node = self.blocks[index][0]
+        self.stats["released"] += 1
+        if node.tag in PARKED_TAGS:
+            self.parked[index] = widget  # Keeps its widget_map entries too
+            return
+        self.browser.widget_map.pop(node, None)
+        self.browser._clean_widget_map(node)
+        if kind:
+            self.pool[kind].append(widget)
+        else:
+            widget.destroy()
+
+    def _measure(self, indices):
+        # Replace estimates with real heights; True if anything moved
+        self.canvas.update_idletasks()
+        changed = False
+        for index in indices:
+            if self.measured[index]:
+                continue
+            height = self.live[index][0].winfo_reqheight()
+            self.measured[index] = True
+            if height != self.heights[index]:
+                self.positions.add(index, height - self.heights[index])
+                self.heights[index] = height
+                changed = True
+        if changed:
+            self._update_scrollregion()
+        return changed
+
+    def _reposition(self):
+        for index, (widget, item, kind) in self.live.items():
+            self.canvas.coords(item, self.blocks[index][1] * INDENT_PX, self.positions.prefix(index))
+
+    def _update_scrollregion(self):
+        total = self.positions.prefix(len(self.heights))
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), total))
@@ -0,0 +1,210 @@
+"""Compact binary encoding of VNode trees, for handing parsed pages between processes.
+
+A tree is flattened in document order into a table of the distinct
+strings it uses and a few flat arrays with one entry per node:
+
+    tags        string id of the tag, or of the text (with TEXT_FLAG) for text nodes
+    sizes       number of nodes in the subtree, so a node's siblings can be found
+                without looking at its children
+    attr_start  where the node's attributes start in `names`/`values`
+    digests     subtree_hash() of the node
+
+The strings are stored as one UTF-8 blob plus their lengths, and values of
+list attributes (class, rel, ...) as their space-joined items with
+LIST_FLAG set. Nothing is pickled: decoding only ever creates VNodes,
+strings and lists. Arrays use the machine's byte order; the format is
+meant for processes on the same machine, not for storage.
+
+decode() only maps the arrays and decodes the blob. It returns the root
+node, and each node's children are built the first time they are accessed,
+so subtrees nobody looks at (e.g. ones the differ skips) are never built.
+Digests come from the worker's hash(), which only matches ours if both
+processes share the hash seed (forked workers, or PYTHONHASHSEED set); the
+header carries a check value and the digests are dropped, to be
+recomputed, if it differs.
+"""
+import struct
+import sys
+from array import array
+from itertools import accumulate
+
+from history import NODE_OVERHEAD, ATTR_OVERHEAD
+from vdom import VNode, TextNode, subtree_hash
+
+MAGIC = b"PVDM"
+VERSION = 1
+# magic, version, nodes, text nodes, attributes, strings, blob bytes, hash check
+HEADER = struct.Struct("<4sIIIIIIq")
+HASH_CHECK = "prowser wire hash check"
+TEXT_FLAG = 1 << 31
+LIST_FLAG = 1 << 31
+ID_MASK = LIST_FLAG - 1
+
+
+def encode(root):
+    """The wire encoding of the tree under `root`, as bytes."""
+    subtree_hash(root)  # Fills in every digest below
+    strings = {}
+
+    def string_id(s):
+        i = strings.get(s)
+        if i is None:
+            i = strings[s] = len(strings)
+        return i
+
+    tags, sizes, attr_start, names, values = array("I"), array("I"), array("I"), array("I"), array("I")
+    digests = array("q")
+    text_nodes = 0
+    # Ints on the stack mark where a node's subtree ends
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is int:
+            sizes[node] = len(tags) - node
+            continue
+        index = len(tags)
+        sizes.append(1)
+        digests.append(node.digest)
+        attr_start.append(len(names))
+        if node.tag == "text":
+            tags.append(string_id(node.content) | TEXT_FLAG)
+            text_nodes += 1
+            continue
+        tags.append(string_id(node.tag))
+        for name, value in node.attrs.items():
+            names.append(string_id(name))
+            if isinstance(value, list):
+                values.append(string_id(" ".join(value)) | LIST_FLAG)
+            else:
+                values.append(string_id(value))
+        if node.children:
+            stack.append(index)
+            stack.extend(reversed(node.children))
+    attr_start.append(len(names))
+
+    lengths = array("I", map(len, strings))
+    blob = "".join(strings).encode("utf-8", "surrogatepass")
+    header = HEADER.pack(MAGIC, VERSION, len(tags), text_nodes, len(names), len(strings), len(blob),
+                         hash(HASH_CHECK))
+    return b"".join((header, lengths.tobytes(), blob, tags.tobytes(), sizes.tobytes(), attr_start.tobytes(),
+                     digests.tobytes(), names.tobytes(), values.tobytes()))
+
+
+def decode(data):
+    """Root VNode of an encoded tree; the rest is built on access (see WireNode)."""
+    return WireTree(data).node(0)
+
+
+class WireTree:
+    """The arrays of an encoded tree, and the nodes built from them on demand."""
+
+    def __init__(self, data):
+        view = memoryview(data)
+        magic, version, nodes, text_nodes, attrs, strings, blob_size, check = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not an encoded VNode tree")
+        self.offset = HEADER.size
+        self.view = view
+        lengths = self._array("I", strings)
+        self.text = str(view[self.offset:self.offset + blob_size], "utf-8", "surrogatepass")
+        self.offset += blob_size
+        self.tags = self._array("I", nodes)
+        self.sizes = self._array("I", nodes)
+        self.attr_start = self._array("I", nodes + 1)
+        self.digests = self._array("q", nodes) if check == hash(HASH_CHECK) else None
+        if self.digests is None:
+            self.offset += nodes * 8
+        self.names = self._array("I", attrs)
+        self.values = self._array("I", attrs)
+        del self.view, self.offset
+
+        self.string_offsets = array("I", [0])
+        self.string_offsets.extend(accumulate(lengths))
+        self.strings = [None] * strings
+        # What history.tree_size() would report for the built tree, without building it
+        self.size_hint = nodes * NODE_OVERHEAD + (attrs + text_nodes) * ATTR_OVERHEAD + len(self.text)
+
+    def _array(self, code, count):
+        result = array(code)
+        end = self.offset + count * result.itemsize
+        result.frombytes(self.view[self.offset:end])
+        self.offset = end
+        return result
+
+    def string(self, i):
+        s = self.strings[i]
+        if s is None:
+            s = self.strings[i] = self.text[self.string_offsets[i]:self.string_offsets[i + 1]]
+        return s
+
+    def name(self, i):
+        # Tags and attribute names are interned, as the parsers do
+        s = self.strings[i]
+        if s is None:
+            s = self.strings[i] = sys.intern(self.text[self.string_offsets[i]:self.string_offsets[i + 1]])
+        return s
+
+    def node(self, index):
+        tag = self.tags[index]
+        if tag & TEXT_FLAG:
+            return TextNode(self.string(tag & ID_MASK))
+        return WireNode(self, index)
+
+    def attrs(self, index):
+        start, end = self.attr_start[index], self.attr_start[index + 1]
+        if start == end:
+            return None
+        attrs = {}
+        for i in range(start, end):
+            value = self.values[i]
+            if value & LIST_FLAG:
+                value = self.string(value & ID_MASK)
+                attrs[self.name(self.names[i])] = value.split(" ") if value else []
+            else:
+                attrs[self.name(self.names[i])] = self.string(value)
+        return attrs
+
+    def children(self, index):
+        sizes = self.sizes
+        end = index + sizes[index]
+        child = index + 1
+        children = []
+        while child < end:
+            children.append(self.node(child))
+            child += sizes[child]
+        return children
+
+
+_children_slot = VNode.children  # The storage behind WireNode.children
+
+
+class WireNode(VNode):
+    """An element decoded from the wire format; its children are built on first access."""
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        VNode.__init__(self, tree.name(tree.tags[index]), tree.attrs(index))
+        if tree.sizes[index] > 1:
+            _children_slot.__set__(self, None)  # Not built yet
+        if tree.digests is not None:
+            self.digest = tree.digests[index]
+        self.tree = tree
+        self.index = index
+
+    @property
+    def children(self):
+        children = _children_slot.__get__(self)
+        if children is None:
+            children = self.tree.children(self.index)
+            _children_slot.__set__(self, children)
+        return children
+
+    @children.setter
+    def children(self, children):
+        _children_slot.__set__(self, children)
+
+    @property
+    def size_hint(self):
+        # Approximate size of the whole tree, known only at the root
+        return self.tree.size_hint if self.index == 0 else None